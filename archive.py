@@ -0,0 +1,150 @@
+# archive.py
+# Retention for the tasks table: tasks finished, or past due, longer than
+# PLANNER_ARCHIVE_DAYS ago are moved to archived_tasks (db.archive_batch),
+# so list_tasks and the import dedup lookups only walk live rows.
+# Archived tasks still block re-imports and can be paged through as history.
+#
+#   PLANNER_ARCHIVE_DAYS=30        age before a task is archived (0 = never)
+#   PLANNER_ARCHIVE_INTERVAL=21600 seconds between background runs
+#
+#   python archive.py [--days N]   one run now, then print what it did
+#
+# The command also switches a database created before db.PRAGMAS asked for
+# auto_vacuum=INCREMENTAL. That takes one full VACUUM, which rewrites the
+# file under the write lock, so run it while the app and server are closed;
+# the background job never does it and only releases pages incrementally.
+#
+# A run moves ARCHIVE_BATCH tasks per transaction with a short pause in
+# between, so the GUI or server never waits on it for long, then hands
+# the freed pages back with PRAGMA incremental_vacuum and refreshes the
+# planner statistics. Delete tombstones (for the server's ?since= deltas)
+# older than the same age are dropped too.
+import argparse
+import logging
+import os
+import threading
+import time
+
+import db
+import perf
+
+AGE_DAYS = float(os.getenv("PLANNER_ARCHIVE_DAYS", "30"))
+INTERVAL = float(os.getenv("PLANNER_ARCHIVE_INTERVAL", str(6 * 3600)))
+PAUSE = 0.05          # seconds between two batches
+VACUUM_PAGES = 2000   # pages released per incremental_vacuum step
+
+_AUTO_VACUUM_INCREMENTAL = 2
+
+log = logging.getLogger("planner.archive")
+
+
+def _incremental(c):
+    return c.execute("PRAGMA auto_vacuum").fetchone()[0] == _AUTO_VACUUM_INCREMENTAL
+
+
+def _compact(c):
+    """
+    Return free pages to the filesystem, a bounded step at a time. Without
+    auto_vacuum=INCREMENTAL (see enable_incremental_vacuum) they stay in the
+    file and are reused by later writes.
+    """
+    if not _incremental(c):
+        return
+    while c.execute("PRAGMA freelist_count").fetchone()[0]:
+        c.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES})").fetchall()
+
+
+def enable_incremental_vacuum():
+    """
+    One full VACUUM that applies auto_vacuum=INCREMENTAL to an older
+    database; True if it had to run. Holds the write lock for the whole
+    rewrite, so only the command line calls it.
+    """
+    c = db.conn()
+    if _incremental(c):
+        return False
+    c.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    c.execute("VACUUM")   # needs no open transaction
+    return True
+
+
+@perf.timed("archive.run")
+def run(age_days=None, now=None, batch=db.ARCHIVE_BATCH, pause=PAUSE, stop=None):
+    """
+    One archive pass over every user; returns
+    {"archived": n, "batches": n, "tombstones": n}.
+    `stop` (a threading.Event) ends it between batches.
+    """
+    age_days = AGE_DAYS if age_days is None else age_days
+    stats = {"archived": 0, "batches": 0}
+    if age_days <= 0:
+        return stats
+    cutoff = db.epoch(now) - int(age_days * 86400)
+    stats["tombstones"] = db.prune_tombstones(cutoff)
+    while stop is None or not stop.is_set():
+        moved = db.archive_batch(cutoff, cutoff, batch, now=now)
+        if not moved:
+            break
+        stats["archived"] += moved
+        stats["batches"] += 1
+        if moved < batch:
+            break
+        time.sleep(pause)
+    if stats["archived"]:
+        c = db.conn()
+        _compact(c)
+        c.execute("PRAGMA analysis_limit=1000")
+        c.execute("ANALYZE")
+        c.commit()
+    perf.count("archive.moved", stats["archived"])
+    return stats
+
+
+_worker = None
+
+
+def start(interval=None):
+    """
+    Archive on a daemon thread: shortly after start-up, then every
+    `interval` seconds. Returns the Event that stops it.
+    """
+    global _worker
+    stop = threading.Event()
+    if _worker is not None or AGE_DAYS <= 0:
+        return stop
+    interval = interval or INTERVAL
+
+    def loop():
+        try:
+            delay = 5.0   # let start-up reads go first
+            while not stop.wait(delay):
+                try:
+                    run(stop=stop)
+                except Exception:  # keep archiving on the next round
+                    log.exception("archive run failed")
+                delay = interval
+        finally:
+            db.close()
+
+    _worker = threading.Thread(target=loop, name="planner-archive", daemon=True)
+    _worker.start()
+    return stop
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Move old finished / overdue tasks to the archive.")
+    ap.add_argument("--days", type=float, default=AGE_DAYS,
+                    help=f"archive tasks done or due more than this many days ago (default {AGE_DAYS:g})")
+    args = ap.parse_args()
+    db.init_db()
+    t0 = time.perf_counter()
+    stats = run(age_days=args.days)
+    print(f"archived {stats['archived']} tasks in {stats['batches']} batches "
+          f"({time.perf_counter() - t0:.2f}s)")
+    if enable_incremental_vacuum():
+        print("switched the database to incremental auto-vacuum (one full VACUUM)")
+    db.close_all()
+
+
+if __name__ == "__main__":
+    main()
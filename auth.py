@@ -0,0 +1,151 @@
+# auth.py
+# Password hashing for db.create_user / db.verify_user.
+#
+# Stored hashes are self-describing: "<algorithm>$<params>$<hex digest>", e.g.
+#   pbkdf2_sha256$120000$9f86d0...
+#   scrypt$16384$8$1$2c26b4...
+# so the cost (or the algorithm) can be raised by changing HASH_ALGORITHM /
+# the *_PARAMS below; older hashes keep verifying and are rehashed with the
+# current settings on the user's next successful login. Hashes written before
+# this format (bare hex) are read as pbkdf2_sha256 with 120000 iterations.
+import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_ALGORITHM = os.getenv("PLANNER_HASH_ALGORITHM", "pbkdf2_sha256")
+PBKDF2_PARAMS = (120_000,)        # iterations
+SCRYPT_PARAMS = (2 ** 14, 8, 1)   # n, r, p  (~16 MB per hash)
+LEGACY_PARAMS = ("pbkdf2_sha256", (120_000,))
+UNUSABLE_PASSWORD = "!"           # stored for accounts that cannot log in
+
+# KDFs release the GIL, so a small thread pool runs them in parallel with
+# the UI - and also caps how many cores a burst of logins can occupy.
+HASH_WORKERS = 2
+_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="planner-kdf")
+
+
+class LoginThrottled(Exception):
+    """Too many failed logins for this username; retry after `retry_after` s."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many failed attempts. Try again in {int(retry_after) + 1} s.")
+        self.retry_after = retry_after
+
+
+# --- hashing ---
+
+def _current():
+    if HASH_ALGORITHM == "scrypt":
+        return "scrypt", SCRYPT_PARAMS
+    return "pbkdf2_sha256", PBKDF2_PARAMS
+
+
+def _derive(algorithm, params, password, salt):
+    pw = password.encode("utf-8")
+    if algorithm == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", pw, salt, params[0])
+    if algorithm == "scrypt":
+        n, r, p = params
+        return hashlib.scrypt(pw, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p)
+    raise ValueError(f"unknown password hash algorithm: {algorithm}")
+
+
+def _derive_pooled(algorithm, params, password, salt):
+    """Run the KDF on the hashing pool and wait for it."""
+    return _pool.submit(_derive, algorithm, params, password, salt).result()
+
+
+def _decode(encoded):
+    """'algo$p1$p2$hex' -> (algo, (p1, p2), digest); bare hex is legacy PBKDF2."""
+    if "$" not in encoded:
+        algorithm, params = LEGACY_PARAMS
+        return algorithm, params, bytes.fromhex(encoded)
+    algorithm, *params, digest = encoded.split("$")
+    return algorithm, tuple(int(p) for p in params), bytes.fromhex(digest)
+
+
+def hash_password(password: str, salt: bytes = None):
+    """Hash with the current settings -> (encoded, salt)."""
+    salt = salt or os.urandom(16)
+    algorithm, params = _current()
+    digest = _derive_pooled(algorithm, params, password, salt)
+    return "$".join([algorithm, *map(str, params), digest.hex()]), salt
+
+
+def check_password(password: str, encoded: str, salt: bytes):
+    """-> (matches, needs_rehash). The digest comparison is constant-time."""
+    if encoded == UNUSABLE_PASSWORD:
+        burn_dummy_check(password)
+        return False, False
+    algorithm, params, expected = _decode(encoded)
+    digest = _derive_pooled(algorithm, params, password, salt)
+    ok = hmac.compare_digest(digest, expected)
+    outdated = "$" not in encoded or (algorithm, params) != _current()
+    return ok, ok and outdated
+
+
+_DUMMY = None
+
+def burn_dummy_check(password: str):
+    """Spend the same time as a real check (unknown usernames)."""
+    global _DUMMY
+    if _DUMMY is None:
+        _DUMMY = hash_password("dummy password")
+    check_password(password, *_DUMMY)
+
+
+# --- failed-login limiter ---
+
+class AttemptLimiter:
+    """
+    Per-username failed-login limiter. The first FREE_ATTEMPTS failures are
+    free; after that each further attempt must wait an exponentially growing
+    delay, and attempts made while locked out are rejected *before* any
+    hashing happens, so they cost no CPU. A success clears the record.
+    """
+
+    FREE_ATTEMPTS = 5
+    BASE_DELAY = 2.0      # seconds after the first extra failure
+    MAX_DELAY = 300.0
+    FORGET_AFTER = 3600.0  # idle records are dropped after this long
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fails = {}   # {key: (count, last_failure_time)}
+
+    def check(self, key):
+        """Raise LoginThrottled if `key` is locked out right now."""
+        now = time.monotonic()
+        with self._lock:
+            count, last = self._fails.get(key, (0, 0.0))
+            if now - last > self.FORGET_AFTER:
+                self._fails.pop(key, None)
+                return
+            if count < self.FREE_ATTEMPTS:
+                return
+            delay = min(self.MAX_DELAY, self.BASE_DELAY * 2 ** (count - self.FREE_ATTEMPTS))
+            if now - last < delay:
+                raise LoginThrottled(delay - (now - last))
+
+    def failed(self, key):
+        now = time.monotonic()
+        with self._lock:
+            count, _last = self._fails.get(key, (0, 0.0))
+            self._fails[key] = (count + 1, now)
+            if len(self._fails) > 10_000:
+                self._prune(now)
+
+    def succeeded(self, key):
+        with self._lock:
+            self._fails.pop(key, None)
+
+    def _prune(self, now):
+        for key, (_count, last) in list(self._fails.items()):
+            if now - last > self.FORGET_AFTER:
+                del self._fails[key]
+
+
+limiter = AttemptLimiter()
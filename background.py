@@ -0,0 +1,134 @@
+# background.py
+# Runs network and DB work on worker threads so the Tk event loop never
+# blocks. Tk widgets may only be touched from the Tk thread, so results come
+# back through a thread-safe queue that the Tk thread drains with after().
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Cancelled(Exception):
+    """Raised inside a job once its cancel_event is set."""
+
+
+class Job:
+    """Handle for one background job: progress reporting and cancellation."""
+
+    def __init__(self, executor):
+        self._executor = executor
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self.future is not None:
+            self.future.cancel()  # only helps if it hasn't started yet
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        """Call from the worker at safe points; raises Cancelled if cancelled."""
+        if self.cancel_event.is_set():
+            raise Cancelled()
+
+    def progress(self, *args):
+        """Worker side: forward progress to the job's on_progress on the Tk thread."""
+        self._executor._post(self, "progress", args)
+
+
+class BackgroundExecutor:
+    """
+    Thread pool bound to a Tk root. Callbacks (on_done / on_error /
+    on_progress) always run on the Tk thread. The result queue is only
+    drained while jobs are outstanding, so an idle window does no polling.
+    """
+
+    POLL_MS = 30
+
+    def __init__(self, root, max_workers=3):
+        self._root = root
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="planner-bg")
+        self._queue = queue.Queue()
+        self._callbacks = {}    # {job: (on_done, on_error, on_progress)}
+        self._pending = 0       # touched only on the Tk thread
+        self._drain_id = None
+        self._closed = False
+
+    def run(self, fn, *args, on_done=None, on_error=None):
+        """Run fn(*args) on a worker; on_done(result) / on_error(exc) on Tk."""
+        return self.start_job(lambda job: fn(*args), on_done=on_done, on_error=on_error)
+
+    def start_job(self, fn, on_done=None, on_error=None, on_progress=None):
+        """Run fn(job) on a worker; fn may call job.progress() / job.check()."""
+        if self._closed:
+            raise RuntimeError("executor is shut down")
+        job = Job(self)
+        self._callbacks[job] = (on_done, on_error, on_progress)
+        self._pending += 1
+        job.future = self._pool.submit(self._call, job, fn)
+        job.future.add_done_callback(
+            lambda f: f.cancelled() and self._post(job, "error", Cancelled()))
+        self._schedule_drain()
+        return job
+
+    def _call(self, job, fn):
+        try:
+            result = fn(job)
+        except BaseException as e:
+            self._post(job, "error", e)
+        else:
+            self._post(job, "done", result)
+
+    def _post(self, job, kind, payload):
+        self._queue.put((job, kind, payload))
+
+    def _schedule_drain(self):
+        if self._drain_id is None and not self._closed:
+            self._drain_id = self._root.after(self.POLL_MS, self._drain)
+
+    def _drain(self):
+        self._drain_id = None
+        while True:
+            try:
+                job, kind, payload = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            on_done, on_error, on_progress = self._callbacks.get(job, (None, None, None))
+            if kind == "progress":
+                if on_progress is not None and not job.cancelled:
+                    self._invoke(on_progress, *payload)
+                continue
+            # a finished job
+            if self._callbacks.pop(job, None) is None:
+                continue  # already reported (cancelled before it started)
+            self._pending -= 1
+            if kind == "done":
+                if on_done is not None:
+                    self._invoke(on_done, payload)
+            elif on_error is not None:
+                self._invoke(on_error, payload)
+            else:
+                self._root.report_callback_exception(type(payload), payload,
+                                                     payload.__traceback__)
+        if self._pending:
+            self._schedule_drain()
+
+    def _invoke(self, callback, *args):
+        # a failing callback must not stop the queue from draining
+        try:
+            callback(*args)
+        except Exception as e:
+            self._root.report_callback_exception(type(e), e, e.__traceback__)
+
+    def shutdown(self):
+        """Cancel outstanding jobs and stop the workers (call before destroy())."""
+        self._closed = True
+        for job in list(self._callbacks):
+            job.cancel()
+        if self._drain_id is not None:
+            self._root.after_cancel(self._drain_id)
+            self._drain_id = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,307 @@
+# batch_sync.py
+# Headless Canvas sync for every user with credentials stored in planner.db,
+# meant for cron / a service timer on a shared deployment.
+#
+#   python batch_sync.py [run] [--workers 8] [--per-host 8] [--retries 2]
+#                        [--users alice,bob] [--full] [--every SECONDS] [--log FILE]
+#   python batch_sync.py set USERNAME BASE_URL   token from CANVAS_TOKEN, else prompted
+#   python batch_sync.py remove USERNAME
+#   python batch_sync.py list
+#
+# Users are synced concurrently on a bounded thread pool (the work is network
+# bound; pages are parsed while other requests wait). Each user gets their
+# own CanvasClient, and all clients talking to one Canvas host share a
+# semaphore, so that host never sees more than --per-host requests at once.
+# A user whose sync fails on a network error, a timeout, a 5xx or a locked
+# database is retried with backoff; a 401/403/404 is reported at once.
+# Every DB write of the run goes through one writer thread (DBWriter), so
+# the workers never contend for SQLite's write lock.
+# Each run ends with a throughput / latency summary (and, with --log, one
+# JSON line appended to that file).
+import argparse
+import getpass
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+import db
+import perf
+from canvas_import import sync_user
+from canvas_sync import CanvasClient, SyncCancelled
+
+WORKERS = 8           # users synced at the same time
+PER_HOST = 8          # requests in flight per Canvas host, over all users
+PAGE_WORKERS = 2      # parallel page fetches within one user's sync
+RETRIES = 2           # extra attempts for a user whose sync failed transiently
+RETRY_DELAY = 2.0     # seconds before the first retry, doubling after
+WRITE_QUEUE = 64      # writes waiting for the writer thread
+
+
+class DBWriter:
+    """
+    Runs DB writes on a single thread, in the order they were submitted.
+    Calling it blocks until the write is done and returns its result (or
+    raises its exception); the bounded queue holds fast fetchers back.
+    """
+
+    def __init__(self, maxsize=WRITE_QUEUE):
+        self._queue = queue.Queue(maxsize)
+        self.wait_ms = perf.Histogram()    # time a write sat in the queue
+        self.write_ms = perf.Histogram()   # time the write itself took
+        self._thread = threading.Thread(target=self._loop, name="planner-db-writer",
+                                        daemon=True)
+        self._thread.start()
+
+    def __call__(self, fn, *args):
+        future = Future()
+        self._queue.put((fn, args, future, time.perf_counter()))
+        return future.result()
+
+    def _loop(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                fn, args, future, queued = item
+                started = time.perf_counter()
+                self.wait_ms.add((started - queued) * 1000)
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+                self.write_ms.add((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+def _retryable(e):
+    import requests
+    if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(e, requests.HTTPError) and e.response is not None:
+        return e.response.status_code == 429 or e.response.status_code >= 500
+    return isinstance(e, sqlite3.OperationalError)   # e.g. database is locked
+
+
+def _sync_one(user, gate, writer, full, retries, stop):
+    """Sync one user, retrying transient failures. Returns a result dict."""
+    user_id, username, base_url, token = user
+    client = CanvasClient(base_url, token, max_workers=PAGE_WORKERS, gate=gate)
+    result = {"user": username, "attempts": 0, "ms": 0.0}
+    started = time.perf_counter()
+    try:
+        for attempt in range(retries + 1):
+            result["attempts"] += 1
+            try:
+                result["counts"] = sync_user(user_id, client=client, full=full, cancel=stop,
+                                             writer=writer)
+                break
+            except SyncCancelled:
+                result["error"] = "cancelled"
+                break
+            except Exception as e:
+                if attempt == retries or not _retryable(e):
+                    result["error"] = f"{type(e).__name__}: {e}"
+                    break
+                if stop.wait(RETRY_DELAY * 2 ** attempt):
+                    result["error"] = "cancelled"
+                    break
+    finally:
+        client.close()
+        db.close()       # this pool thread's read connection
+        result["ms"] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def run(users=None, workers=WORKERS, per_host=PER_HOST, retries=RETRIES, full=False,
+        stop=None, progress=None):
+    """
+    Sync `users` ([(user_id, username, base_url, token)], default: everyone
+    with stored credentials) and return the run summary (see summarize()).
+    `stop` (a threading.Event) cancels the run between requests.
+    """
+    users = db.all_canvas_credentials() if users is None else users
+    stop = stop or threading.Event()
+    report = progress or (lambda result: None)
+    gates = {}
+    for _uid, _name, base_url, _token in users:
+        host = urlparse(base_url).netloc.lower()
+        gates.setdefault(host, threading.BoundedSemaphore(per_host))
+
+    writer = DBWriter()
+    results = []
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers),
+                                thread_name_prefix="planner-batch") as pool:
+            futures = [
+                pool.submit(_sync_one, u, gates[urlparse(u[2]).netloc.lower()], writer,
+                            full, retries, stop)
+                for u in users
+            ]
+            try:
+                for f in as_completed(futures):
+                    results.append(f.result())
+                    report(results[-1])
+            except KeyboardInterrupt:
+                stop.set()
+                raise
+    finally:
+        writer.close()
+    return summarize(results, time.perf_counter() - started, writer)
+
+
+def summarize(results, seconds, writer):
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0, "not_modified_pages": 0}
+    latency = perf.Histogram()
+    errors = {}
+    for r in results:
+        latency.add(r["ms"])
+        if "error" in r:
+            errors[r["user"]] = r["error"]
+            continue
+        for k in counts:
+            counts[k] += r["counts"].get(k, 0)
+    items = counts["inserted"] + counts["updated"] + counts["unchanged"]
+    return {
+        "ts": time.time(),
+        "users": len(results),
+        "ok": len(results) - len(errors),
+        "failed": len(errors),
+        "retries": sum(r["attempts"] - 1 for r in results),
+        **counts,
+        "items": items,
+        "seconds": round(seconds, 3),
+        "users_per_s": round(len(results) / seconds, 2) if seconds else 0.0,
+        "items_per_s": round(items / seconds, 1) if seconds else 0.0,
+        "user_ms": latency.summary(),
+        "write_ms": writer.write_ms.summary(),
+        "write_wait_ms": writer.wait_ms.summary(),
+        "errors": errors,
+    }
+
+
+def format_summary(s):
+    def pct(h):
+        return f"p50 {h['p50']:.0f} ms  p95 {h['p95']:.0f} ms  max {h['max']:.0f} ms"
+
+    lines = [
+        f"synced {s['ok']}/{s['users']} users in {s['seconds']:.1f}s "
+        f"({s['users_per_s']} users/s, {s['items_per_s']} items/s), {s['retries']} retries",
+        f"  items    : {s['items']} ({s['inserted']} new, {s['updated']} updated, "
+        f"{s['unchanged']} unchanged), {s['not_modified_pages']} pages not modified",
+        f"  per user : {pct(s['user_ms'])}",
+        f"  db writes: {s['write_ms']['count']}, {pct(s['write_ms'])}; "
+        f"queued p95 {s['write_wait_ms']['p95']:.0f} ms",
+    ]
+    lines += [f"  FAILED {user}: {error}" for user, error in sorted(s["errors"].items())]
+    return "\n".join(lines)
+
+
+# ---------- command line ----------
+
+def _user_id(username):
+    uid = db.find_user(username)
+    if uid is None:
+        sys.exit(f"no such user: {username}")
+    return uid
+
+
+def cmd_set(args):
+    token = os.getenv("CANVAS_TOKEN") or getpass.getpass(f"Canvas token for {args.username}: ")
+    if not token.strip():
+        sys.exit("no token given")
+    db.set_canvas_credentials(_user_id(args.username), args.base_url, token.strip())
+    print(f"stored Canvas credentials for {args.username}")
+
+
+def cmd_remove(args):
+    if db.delete_canvas_credentials(_user_id(args.username)):
+        print(f"removed Canvas credentials for {args.username}")
+    else:
+        print(f"{args.username} had no Canvas credentials")
+
+
+def cmd_list(_args):
+    for _uid, username, base_url, _token in db.all_canvas_credentials():
+        print(f"{username:<24} {base_url}")
+
+
+def cmd_run(args):
+    users = db.all_canvas_credentials()
+    if args.users:
+        wanted = set(args.users.split(","))
+        users = [u for u in users if u[1] in wanted]
+    if not users:
+        print("no users with Canvas credentials (see: batch_sync.py set)")
+        return
+    stop = threading.Event()
+
+    def progress(result):
+        if args.verbose:
+            status = result.get("error") or "ok"
+            print(f"  {result['user']:<24} {result['ms']:8.0f} ms  {status}")
+
+    while True:
+        summary = run(users, args.workers, args.per_host, args.retries, args.full, stop, progress)
+        print(format_summary(summary))
+        if args.log:
+            with open(args.log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(summary, separators=(",", ":")) + "\n")
+        if not args.every or stop.wait(args.every):
+            return
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sync every user's Canvas planner, headless.")
+    sub = ap.add_subparsers(dest="command")
+    p = sub.add_parser("run", help="sync users (the default)")
+    # The run options are accepted before or after "run"; the subparser's
+    # copies default to SUPPRESS so they never undo what came before it.
+    for parser, default in ((ap, lambda d: d), (p, lambda d: argparse.SUPPRESS)):
+        parser.add_argument("--workers", type=int, default=default(WORKERS),
+                            help="users at a time")
+        parser.add_argument("--per-host", type=int, default=default(PER_HOST),
+                            help="concurrent requests per Canvas host")
+        parser.add_argument("--retries", type=int, default=default(RETRIES))
+        parser.add_argument("--users", default=default(None),
+                            help="comma-separated usernames (default: all)")
+        parser.add_argument("--full", action="store_true", default=default(False),
+                            help="ignore stored ETags")
+        parser.add_argument("--every", type=float, default=default(None),
+                            help="repeat every N seconds")
+        parser.add_argument("--log", default=default(None),
+                            help="append each run's summary as a JSON line")
+        parser.add_argument("-v", "--verbose", action="store_true", default=default(False),
+                            help="one line per user")
+    p = sub.add_parser("set", help="store a user's Canvas URL and token")
+    p.add_argument("username")
+    p.add_argument("base_url")
+    p = sub.add_parser("remove", help="forget a user's Canvas credentials")
+    p.add_argument("username")
+    sub.add_parser("list", help="users with Canvas credentials")
+    args = ap.parse_args()
+
+    db.init_db()
+    commands = {"set": cmd_set, "remove": cmd_remove, "list": cmd_list}
+    try:
+        commands.get(args.command, cmd_run)(args)
+    except KeyboardInterrupt:
+        print("interrupted")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_dueparse.py
+# Per-call cost of the due-date parser, before (the original
+# PlannerWindow._parse_due_datetime) and after (dueparse.parse_due).
+#
+#   python benchmarks/bench_dueparse.py [--n 20000]
+import argparse
+import datetime
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dueparse
+
+
+def legacy_parse_due(due_str: str):
+    """The pre-dueparse implementation, kept verbatim for comparison."""
+    s = due_str.strip()
+    local_tz = datetime.datetime.now().astimezone().tzinfo
+    if s.endswith("Z"):
+        try:
+            aware_utc = datetime.datetime.fromisoformat(s.replace("Z", "+00:00"))
+            local_dt = aware_utc.astimezone(local_tz)
+            return local_dt.replace(tzinfo=None)
+        except Exception:
+            pass
+    try:
+        dt = datetime.datetime.fromisoformat(s)
+        if dt.tzinfo is not None:
+            local_dt = dt.astimezone(local_tz)
+            return local_dt.replace(tzinfo=None)
+    except Exception:
+        pass
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y"):
+        try:
+            return datetime.datetime.strptime(s, fmt)
+        except Exception:
+            continue
+    return None
+
+
+def sample_dues(n, distinct=300, seed=1):
+    """Realistic mix: mostly Canvas UTC strings, some typed dates, some junk."""
+    rnd = random.Random(seed)
+    base = datetime.datetime(2025, 9, 1, 7, 59)
+    pool = []
+    for i in range(distinct):
+        dt = base + datetime.timedelta(days=rnd.randint(0, 120), hours=rnd.randint(0, 23))
+        kind = rnd.random()
+        if kind < 0.75:
+            pool.append(dt.strftime("%Y-%m-%dT%H:%M:%SZ"))
+        elif kind < 0.85:
+            pool.append(dt.strftime("%Y-%m-%d %H:%M"))
+        elif kind < 0.95:
+            pool.append(dt.strftime("%m/%d/%Y"))
+        else:
+            pool.append("No due date")
+    return [rnd.choice(pool) for _ in range(n)]
+
+
+def per_call_us(fn, dues, repeat=5):
+    def run():
+        for s in dues:
+            fn(s)
+    best = min(timeit.repeat(run, number=1, repeat=repeat))
+    return best / len(dues) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--n", type=int, default=20000)
+    args = ap.parse_args()
+
+    dues = sample_dues(args.n)
+    mismatches = [s for s in set(dues) if legacy_parse_due(s) != dueparse.parse_due(s)]
+
+    legacy = per_call_us(legacy_parse_due, dues)
+    dueparse.clear_cache()
+    cold = per_call_us(dueparse._parse.__wrapped__, dues)
+    warm = per_call_us(dueparse.parse_due, dues)
+    many = min(timeit.repeat(lambda: dueparse.parse_many(dues), number=1, repeat=5))
+
+    print(f"{len(dues)} due strings ({len(set(dues))} distinct)")
+    print(f"  legacy _parse_due_datetime : {legacy:8.2f} us/call")
+    print(f"  dueparse, uncached         : {cold:8.2f} us/call")
+    print(f"  dueparse.parse_due (LRU)   : {warm:8.2f} us/call")
+    print(f"  dueparse.parse_many        : {many / len(dues) * 1e6:8.2f} us/item")
+    print(f"  speedup (LRU vs legacy)    : {legacy / warm:8.1f}x")
+    if mismatches:
+        # only expected around DST changes: legacy used today's offset
+        print(f"  {len(mismatches)} strings parse differently, e.g. {mismatches[0]!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/bench_startup.py
+# Time-to-first-window for gui.py, plus a `python -X importtime` breakdown of
+# what `import gui` pulls in.
+#
+#   python benchmarks/bench_startup.py [--runs 5] [--top 15] [--max-ms 400]
+#
+# --max-ms makes the script exit non-zero when the median time-to-first-window
+# (or, without a display, the import time) exceeds the budget.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter: import gui, build the login window, paint it.
+FIRST_WINDOW = r"""
+import json, time
+t0 = time.perf_counter()
+import gui
+t_import = time.perf_counter()
+try:
+    w = gui.LoginWindow()
+    w.update()
+    t_paint = time.perf_counter()
+    w.destroy()
+except Exception as e:   # tkinter.TclError without a display
+    t_paint, err = None, str(e)
+else:
+    err = None
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "paint_ms": None if t_paint is None else (t_paint - t_import) * 1000,
+    "error": err,
+}))
+"""
+
+
+def first_window_run():
+    """One cold start; wall time is measured from process spawn."""
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", FIRST_WINDOW], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    wall = (time.perf_counter() - start) * 1000
+    result = json.loads(out.strip().splitlines()[-1])
+    result["wall_ms"] = wall
+    return result
+
+
+def import_breakdown():
+    """Parse `-X importtime` output: [(cumulative_us, self_us, depth, module)]."""
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import gui"],
+                         cwd=ROOT, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(cum_us), int(self_us), depth, name.strip()))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15)
+    ap.add_argument("--max-ms", type=float, default=None)
+    ap.add_argument("--json", help="also write the results to this file")
+    args = ap.parse_args()
+
+    runs = [first_window_run() for _ in range(args.runs)]
+    wall = statistics.median(r["wall_ms"] for r in runs)
+    imp = statistics.median(r["import_ms"] for r in runs)
+    painted = [r["paint_ms"] for r in runs if r["paint_ms"] is not None]
+
+    print(f"cold starts: {args.runs}")
+    print(f"  import gui          : {imp:8.1f} ms (median)")
+    if painted:
+        paint = statistics.median(painted)
+        print(f"  build + paint login : {paint:8.1f} ms (median)")
+        print(f"  time to first window: {wall:8.1f} ms (median, incl. interpreter start)")
+    else:
+        paint = None
+        print(f"  no display ({runs[0]['error']}); window not timed")
+        print(f"  process wall time   : {wall:8.1f} ms (median)")
+
+    rows = import_breakdown()
+    total = sum(r[1] for r in rows)
+    print(f"\n-X importtime: {len(rows)} modules, {total / 1000:.1f} ms self time")
+    print(f"  {'cumulative':>10}  {'self':>8}  module (top {args.top}, depth <= 1)")
+    # depth 0 = imported by the -c script (gui, site), depth 1 = their imports
+    top = sorted((r for r in rows if r[2] <= 1), reverse=True)[:args.top]
+    for cum, self_us, depth, name in top:
+        print(f"  {cum / 1000:8.1f}ms  {self_us / 1000:6.1f}ms  {'  ' * depth}{name}")
+    heavy = [m for m in ("requests", "tkinter.filedialog", "tkinter.colorchooser")
+             if any(r[3] == m for r in rows)]
+    if heavy:
+        print(f"  eagerly imported (should be lazy): {', '.join(heavy)}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": runs, "median_wall_ms": wall, "median_import_ms": imp,
+                       "median_paint_ms": paint,
+                       "imports": [dict(zip(("cumulative_us", "self_us", "depth", "module"), r))
+                                   for r in rows]}, f, indent=2)
+
+    budget_metric = wall if painted else imp
+    if args.max_ms is not None and budget_metric > args.max_ms:
+        print(f"\nREGRESSION: {budget_metric:.1f} ms > budget {args.max_ms:.1f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
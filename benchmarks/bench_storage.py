@@ -0,0 +1,96 @@
+# benchmarks/bench_storage.py
+# Run the same task workload against every storage backend (storage.py) and
+# compare them side by side.
+#
+#   python benchmarks/bench_storage.py [--tasks 2000] [--backends sqlite,json]
+#
+# Each backend gets a fresh file in a temp directory; planner.db and
+# tasks.jsonl in the repo are never touched.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+import storage  # noqa: E402
+
+
+def sample_rows(n, seed=0):
+    """n distinct (title, due) rows with a mix of due formats."""
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        m, d = rnd.randint(1, 12), rnd.randint(1, 28)
+        due = rnd.choice((f"{m}/{d}", f"2025-{m:02d}-{d:02d} 23:59",
+                          f"2025-{m:02d}-{d:02d}T23:59:00Z"))
+        rows.append((f"Course {i % 7}: Assignment {i}", due))
+    return rows
+
+
+def open_backend(name, tmp):
+    if name == "sqlite":
+        db.close_all()
+        db.DB_FILE = os.path.join(tmp, "bench.db")
+        db.init_db()
+        uid, _created = db.get_or_create_local_user("bench")
+        return storage.SQLiteStorage(uid)
+    return storage.JSONStorage(os.path.join(tmp, "bench.jsonl"))
+
+
+def timed(results, label, fn, *args):
+    t0 = time.perf_counter()
+    out = fn(*args)
+    results.append((label, (time.perf_counter() - t0) * 1000))
+    return out
+
+
+def workload(s, rows, singles):
+    """Identical operation mix for every backend -> [(label, ms)]."""
+    res = []
+    half = len(rows) // 2
+    timed(res, f"bulk_upsert {half} new", s.bulk_upsert, rows[:half])
+    timed(res, f"bulk_upsert {len(rows)} (half dup)", s.bulk_upsert, rows)
+    timed(res, f"add {singles} one by one",
+          lambda: [s.add(f"Single {i}", "12/31") for i in range(singles)])
+    timed(res, f"add {singles} duplicates",
+          lambda: [s.add(f"Single {i}", "12/31") for i in range(singles)])
+    listed = timed(res, "list all", s.list)
+    ids = [r[0] for r in listed]
+    timed(res, f"complete {singles}", lambda: [s.complete(t) for t in ids[:singles]])
+    timed(res, "due_between (all year)", s.due_between, 0, 2 ** 31)
+    timed(res, "next_due", s.next_due, 0)
+    timed(res, f"delete {singles}", lambda: [s.delete(t) for t in ids[-singles:]])
+    timed(res, "list all (after churn)", s.list)
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare storage backends on one workload.")
+    ap.add_argument("--tasks", type=int, default=2000)
+    ap.add_argument("--singles", type=int, default=50,
+                    help="single-row adds/completes/deletes (each one fsyncs)")
+    ap.add_argument("--backends", default=",".join(storage.BACKENDS))
+    args = ap.parse_args()
+
+    rows = sample_rows(args.tasks)
+    names = [b.strip() for b in args.backends.split(",") if b.strip()]
+    results = {}
+    for name in names:
+        with tempfile.TemporaryDirectory() as tmp:
+            results[name] = workload(open_backend(name, tmp), rows, args.singles)
+            db.close_all()
+
+    labels = [label for label, _ms in results[names[0]]]
+    print(f"{args.tasks} tasks, {args.singles} single-row ops")
+    print(f"  {'operation':<32}" + "".join(f"{n:>12}" for n in names))
+    for i, label in enumerate(labels):
+        print(f"  {label:<32}" + "".join(f"{results[n][i][1]:>10.1f}ms" for n in names))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# benchmarks/bench_suite.py
+# The main benchmark suite: db.py at scale, the due parser, Canvas conversion
+# and one headless iteration of the GUI's 1 Hz tick.
+#
+#   python benchmarks/bench_suite.py [--users 20] [--tasks 500] [--items 2000]
+#                                    [--save results.json]
+#                                    [--baseline old.json] [--threshold 0.25]
+#
+# Every case reports the median (and min) wall time over --repeat runs.
+# With --baseline, the script exits non-zero when any case's per-op median is
+# more than --threshold (0.25 = 25%) slower than in the baseline file. Runs use a
+# temporary database; planner.db is never touched.
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+import dueparse  # noqa: E402
+from canvas_sync import to_local_tasks  # noqa: E402
+from scheduler import DeadlineScheduler  # noqa: E402
+from task_cache import cache  # noqa: E402
+from datagen import planner_items, user_tasks  # noqa: E402
+from bench_dueparse import sample_dues  # noqa: E402
+
+
+def measure(fn, repeat, setup=None):
+    """Run fn() `repeat` times (setup() before each, untimed) -> [ms, ...]."""
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        fn(arg) if setup else fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return times
+
+
+# ---------- cases ----------
+
+def bench_db(args, tmp, results):
+    db.close_all()
+    db.DB_FILE = os.path.join(tmp, "bench.db")
+    db.init_db()
+    users = user_tasks(args.users, args.tasks)
+    uids = []
+    for name, tasks in users:
+        uid, _created = db.get_or_create_local_user(name)
+        db.upsert_tasks(uid, tasks)
+        uids.append(uid)
+
+    results["db.list_tasks"] = (
+        measure(lambda: db.list_tasks(uids[len(uids) // 2]), args.repeat), args.tasks)
+    warm = uids[len(uids) // 2]
+    cache.list_tasks(warm)
+    results["task_cache.list_tasks (hit)"] = (
+        measure(lambda: cache.list_tasks(warm), args.repeat), args.tasks)
+    results["db.search_tasks"] = (
+        measure(lambda: db.search_tasks(uids[len(uids) // 2], "task 1"), args.repeat), 1)
+
+    fresh = iter(range(args.repeat * 2))
+    tasks = users[0][1]
+
+    def new_user():
+        uid, _created = db.get_or_create_local_user(f"fresh{next(fresh)}")
+        return uid
+
+    def insert_all(uid):
+        for title, due in tasks:
+            db.add_task_if_not_exists(uid, title, due)
+        return uid
+
+    results["db.add_task_if_not_exists (new)"] = (
+        measure(insert_all, args.repeat, setup=new_user), len(tasks))
+    results["db.add_task_if_not_exists (duplicate)"] = (
+        measure(insert_all, args.repeat, setup=lambda: insert_all(new_user())), len(tasks))
+    db.close_all()
+
+
+def bench_canvas(args, results):
+    items = planner_items(args.items)
+
+    def convert():
+        dueparse.clear_cache()   # a sync sees mostly new strings
+        to_local_tasks(items)
+
+    results["canvas_sync.to_local_tasks"] = (measure(convert, args.repeat), len(items))
+
+
+def bench_parse(args, results):
+    from gui import PlannerWindow   # the method itself, called unbound
+    dues = sample_dues(args.items)
+    parse = PlannerWindow._parse_due_datetime
+
+    def run():
+        for s in dues:
+            parse(None, s)
+
+    def cold():
+        dueparse.clear_cache()
+        run()
+
+    results["PlannerWindow._parse_due_datetime (cold)"] = (measure(cold, args.repeat), len(dues))
+    results["PlannerWindow._parse_due_datetime (warm)"] = (measure(run, args.repeat), len(dues))
+
+
+class _Label:
+    def config(self, **kw):
+        self.text = kw.get("text")
+
+
+class _HeadlessWindow:
+    """Just enough of PlannerWindow for update_clock_and_countdown()."""
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.clock_label = _Label()
+        self.countdown_label = _Label()
+        self._perf_statements = 0   # read by the tick when PLANNER_PERF=1
+
+    def after(self, ms, fn):
+        return None
+
+    def update_clock_and_countdown(self):   # re-armed via after(); never runs here
+        pass
+
+
+def bench_tick(args, results):
+    from gui import PlannerWindow
+    now = datetime.datetime.now()
+    rows = [(i, f"Task {i}", (now + datetime.timedelta(minutes=7 * i + 5)).strftime("%Y-%m-%d %H:%M"), 0)
+            for i in range(args.tasks)]
+    sched = DeadlineScheduler(dueparse.parse_due)
+    sched.load(rows, now)
+    win = _HeadlessWindow(sched)
+    ticks = 1000
+
+    def run():
+        for _ in range(ticks):
+            PlannerWindow.update_clock_and_countdown(win)
+
+    results["PlannerWindow.update_clock_and_countdown"] = (measure(run, args.repeat), ticks)
+
+
+# ---------- reporting ----------
+
+def summarize(raw):
+    out = {}
+    for name, (times, n) in raw.items():
+        med = statistics.median(times)
+        out[name] = {"median_ms": med, "min_ms": min(times), "n": n,
+                     "per_op_us": med * 1000 / n if n else None}
+    return out
+
+
+def compare(results, baseline, threshold):
+    """
+    -> [(case, old_us, new_us)] for cases whose per-op median is slower than
+    the threshold allows (per-op, so runs with different sizes still compare).
+    """
+    slower = []
+    for name, r in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old and r["per_op_us"] > old["per_op_us"] * (1 + threshold):
+            slower.append((name, old["per_op_us"], r["per_op_us"]))
+    return slower
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Planner benchmark suite.")
+    ap.add_argument("--users", type=int, default=20)
+    ap.add_argument("--tasks", type=int, default=500, help="tasks per user")
+    ap.add_argument("--items", type=int, default=2000, help="Canvas items / due strings")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", help="comma-separated groups: db,canvas,parse,tick")
+    ap.add_argument("--save", help="write the results to this JSON file")
+    ap.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    ap.add_argument("--threshold", type=float, default=0.25,
+                    help="allowed slowdown vs the baseline (0.25 = 25%%)")
+    args = ap.parse_args()
+    groups = set((args.only or "db,canvas,parse,tick").split(","))
+
+    raw = {}
+    if "db" in groups:
+        with tempfile.TemporaryDirectory() as tmp:
+            bench_db(args, tmp, raw)
+    if "canvas" in groups:
+        bench_canvas(args, raw)
+    if "parse" in groups:
+        bench_parse(args, raw)
+    if "tick" in groups:
+        bench_tick(args, raw)
+    results = summarize(raw)
+
+    print(f"{args.users} users x {args.tasks} tasks, {args.items} Canvas items, "
+          f"median of {args.repeat}")
+    for name, r in results.items():
+        print(f"  {name:<44} {r['median_ms']:9.2f} ms  {r['per_op_us']:9.2f} us/op  (n={r['n']})")
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {k: getattr(args, k) for k in ("users", "tasks", "items", "repeat")},
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != report["params"]:
+            print("warning: baseline was run with different parameters")
+        slower = compare(results, baseline, args.threshold)
+        for name, old, new in slower:
+            print(f"REGRESSION: {name}: {old:.2f} -> {new:.2f} us/op "
+                  f"(+{(new / old - 1) * 100:.0f}%, allowed {args.threshold * 100:.0f}%)")
+        if slower:
+            sys.exit(1)
+        print(f"no regressions vs {args.baseline} (threshold {args.threshold * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
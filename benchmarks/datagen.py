@@ -0,0 +1,63 @@
+# benchmarks/datagen.py
+# Deterministic synthetic data for the benchmarks: users with task lists, and
+# Canvas planner items shaped like real /api/v1/planner/items responses.
+import datetime
+import random
+
+from bench_dueparse import sample_dues
+
+COURSES = ["CS 101", "MATH 221", "HIST 110", "CHEM 105", "ENGL 200", "PHYS 150"]
+KINDS = [("assignment", "Homework"), ("quiz", "Quiz"), ("discussion_topic", "Discussion")]
+
+
+def user_tasks(n_users, m_tasks, seed=0):
+    """[(username, [(title, due), ...])] - M distinct tasks for each of N users."""
+    rnd = random.Random(seed)
+    users = []
+    for u in range(n_users):
+        dues = sample_dues(m_tasks, seed=seed + u)
+        tasks = [(f"{rnd.choice(COURSES)}: Task {u}-{i}", dues[i]) for i in range(m_tasks)]
+        users.append((f"user{u}", tasks))
+    return users
+
+
+def planner_items(n, seed=0, start=None):
+    """n planner items: mostly course assignments, some notes and undated items."""
+    rnd = random.Random(seed)
+    start = start or datetime.datetime(2025, 9, 1, 7, 59)
+    items = []
+    for i in range(n):
+        ptype, word = rnd.choice(KINDS)
+        course_id = rnd.randrange(len(COURSES))
+        due = start + datetime.timedelta(days=rnd.randint(0, 90), hours=rnd.randint(0, 23))
+        due_at = due.strftime("%Y-%m-%dT%H:%M:%SZ") if rnd.random() < 0.95 else None
+        updated = (due - datetime.timedelta(days=rnd.randint(1, 30))).strftime("%Y-%m-%dT%H:%M:%SZ")
+        item = {
+            "context_type": "Course",
+            "course_id": 1000 + course_id,
+            "plannable_id": 50000 + i,
+            "planner_override": None,
+            "plannable_type": ptype,
+            "new_activity": rnd.random() < 0.2,
+            "submissions": {"submitted": rnd.random() < 0.3, "excused": False,
+                            "graded": False, "late": False, "missing": False,
+                            "needs_grading": False, "has_feedback": False},
+            "plannable_date": due_at,
+            "plannable": {
+                "id": 50000 + i,
+                "title": f"{word} {i}",
+                "due_at": due_at,
+                "points_possible": rnd.choice([5.0, 10.0, 20.0, 100.0]),
+                "created_at": updated,
+                "updated_at": updated,
+            },
+            "html_url": f"/courses/{1000 + course_id}/assignments/{50000 + i}",
+            "context_name": COURSES[course_id],
+            "context_image": None,
+        }
+        if rnd.random() < 0.05:   # personal planner note: no course context
+            item["context_type"] = "User"
+            item["plannable_type"] = "planner_note"
+            item.pop("context_name")
+        items.append(item)
+    return items
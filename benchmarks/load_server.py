@@ -0,0 +1,161 @@
+# benchmarks/load_server.py
+# Load test for server.py: C simulated students, each logging in and then
+# looping over a realistic mix of requests for a fixed time.
+#
+#   python benchmarks/load_server.py [--clients 50] [--seconds 10] [--workers 16]
+#   python benchmarks/load_server.py --url http://127.0.0.1:8000 ...
+#
+# Without --url an in-process server is started on a free port with a
+# temporary database (planner.db is never touched). The mix per iteration:
+# a conditional task-list poll (usually 304), and now and then an add,
+# a toggle or a delete followed by a full reload.
+import argparse
+import http.client
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class Client:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.token = None
+        self.etag = None
+        self.tasks = []
+
+    def request(self, method, path, body=None, headers=None):
+        h = {"Content-Type": "application/json"}
+        if self.token:
+            h["Authorization"] = f"Bearer {self.token}"
+        h.update(headers or {})
+        c = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            c.request(method, path, json.dumps(body) if body is not None else None, h)
+            r = c.getresponse()
+            data = r.read()
+            return r.status, r.getheader("ETag"), data
+        finally:
+            c.close()
+
+
+def student(client, name, stop, stats, lock, seed):
+    rnd = random.Random(seed)
+    local = Counter()
+    latencies = []
+
+    def call(kind, *args, **kw):
+        t0 = time.perf_counter()
+        status, etag, data = client.request(*args, **kw)
+        latencies.append((kind, (time.perf_counter() - t0) * 1000))
+        local[f"{kind} {status}"] += 1
+        return status, etag, data
+
+    call("register", "POST", "/api/register", {"username": name, "password": "pw-" + name})
+    status, _etag, data = call("login", "POST", "/api/login",
+                               {"username": name, "password": "pw-" + name})
+    if status != 200:
+        with lock:
+            stats["counts"].update(local)
+        return
+    client.token = json.loads(data)["token"]
+
+    n = 0
+    while not stop.is_set():
+        n += 1
+        roll = rnd.random()
+        if roll < 0.10 or not client.tasks:
+            call("add", "POST", "/api/tasks", {"title": f"{name} hw {n}", "due": "2030-01-15 23:59"})
+        elif roll < 0.15:
+            t = rnd.choice(client.tasks)
+            call("toggle", "PATCH", f"/api/tasks/{t['id']}", {"done": not t["done"]})
+        elif roll < 0.18:
+            t = rnd.choice(client.tasks)
+            call("delete", "DELETE", f"/api/tasks/{t['id']}")
+        headers = {"If-None-Match": client.etag} if client.etag else {}
+        status, etag, data = call("list", "GET", "/api/tasks", headers=headers)
+        if status == 200:
+            client.tasks, client.etag = json.loads(data), etag
+
+    with lock:
+        stats["counts"].update(local)
+        stats["latencies"].extend(latencies)
+
+
+def pct(values, p):
+    s = sorted(values)
+    return s[min(len(s) - 1, int(p / 100 * len(s)))] if s else 0.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load-test the planner server.")
+    ap.add_argument("--url", help="existing server (default: start one in-process)")
+    ap.add_argument("--clients", type=int, default=50)
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--workers", type=int, default=16, help="in-process server workers")
+    args = ap.parse_args()
+
+    server = tmp = None
+    if args.url:
+        u = urlparse(args.url)
+        host, port = u.hostname, u.port or 80
+    else:
+        import db
+        import server as server_mod
+        tmp = tempfile.TemporaryDirectory()
+        db.DB_FILE = os.path.join(tmp.name, "load.db")
+        db.init_db()
+        server = server_mod.PlannerServer(("127.0.0.1", 0), workers=args.workers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"counts": Counter(), "latencies": []}
+    run_id = int(time.time())
+    threads = [
+        threading.Thread(target=student, daemon=True,
+                         args=(Client(host, port), f"load{run_id}-{i}", stop, stats, lock, i))
+        for i in range(args.clients)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        tmp.cleanup()
+
+    lat = stats["latencies"]
+    total = len(lat)
+    errors = sum(n for k, n in stats["counts"].items() if k.split()[1][0] == "5")
+    print(f"{args.clients} clients for {elapsed:.1f}s against {host}:{port}"
+          + ("" if args.url else f" ({args.workers} workers)"))
+    print(f"  requests : {total}  ({total / elapsed:.0f} req/s), server errors: {errors}")
+    print(f"  latency  : p50 {pct([ms for _k, ms in lat], 50):.1f} ms  "
+          f"p95 {pct([ms for _k, ms in lat], 95):.1f} ms  p99 {pct([ms for _k, ms in lat], 99):.1f} ms")
+    for kind in ("login", "list", "add", "toggle", "delete"):
+        ms = [m for k, m in lat if k == kind]
+        if ms:
+            print(f"    {kind:<7} n={len(ms):<6} p50 {statistics.median(ms):7.1f} ms  "
+                  f"p95 {pct(ms, 95):7.1f} ms")
+    print("  responses: " + ", ".join(f"{k}: {n}" for k, n in sorted(stats["counts"].items())))
+
+
+if __name__ == "__main__":
+    main()
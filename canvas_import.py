@@ -0,0 +1,101 @@
+# canvas_import.py
+# Glue between canvas_sync (HTTP) and db (storage): one incremental sync of a
+# user's Canvas planner into their task list.
+import datetime
+import threading
+import time
+
+import db
+from canvas_sync import CanvasClient, PageCache, SyncCancelled, default_client, iter_tasks
+
+SYNC_DAYS = 30       # how far ahead the planner window reaches
+REWINDOW_DAYS = 7    # keep the same window (and its page URLs/ETags) this long
+WRITE_CHUNK = db.CANVAS_CHUNK   # rows per storage write while streaming
+
+
+def task_title(t):
+    """Display title for a canvas_sync.PlannerTask: "Course: Title"."""
+    base_title = t.task or "Untitled"
+    return f"{t.course}: {base_title}" if t.course else base_title
+
+
+def to_rows(canvas_tasks):
+    """PlannerTasks -> (canvas_id, updated_at, title, due) rows, lazily."""
+    for t in canvas_tasks:
+        yield (t.canvas_id, t.updated_at, task_title(t), t.due or "No due date")
+
+
+def _sync_window(state, now):
+    """
+    Reuse the stored window while it is fresh: identical start/end dates give
+    identical page URLs, which is what lets the stored ETags match.
+    """
+    if state is not None:
+        start = datetime.datetime.fromisoformat(state[1])
+        end = datetime.datetime.fromisoformat(state[2])
+        if start <= now < start + datetime.timedelta(days=REWINDOW_DAYS):
+            return start, end
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, start + datetime.timedelta(days=SYNC_DAYS)
+
+
+def sync_user(user_id: int, client=None, full=False, cancel=None, progress=None, store=None,
+              writer=None):
+    """
+    Incrementally sync one user's Canvas planner into `store` (a
+    storage.Storage; default: the user's SQLite tasks). The sync cursor and
+    page validators are always kept in SQLite.
+    Without a `client`, the user's stored Canvas credentials are used, or
+    else CANVAS_BASE_URL / CANVAS_TOKEN.
+    Unchanged pages are skipped via conditional requests (304), and only rows
+    whose Canvas id / updated_at changed are written.
+    Items stream from the HTTP pages straight into WRITE_CHUNK-row writes,
+    so memory stays flat however many items the window holds.
+    `cancel` is a threading.Event checked between requests (raises
+    SyncCancelled; chunks already written stay, but the sync cursor is not
+    advanced), `progress(message)` reports status. `writer(fn, *args)`, if
+    given, runs every DB write (batch_sync.py funnels them through one thread).
+    Returns {"inserted", "updated", "unchanged", "not_modified_pages"}.
+    """
+    creds = None if client is not None else db.canvas_credentials(user_id)
+    if creds is not None:
+        client = CanvasClient(*creds)
+    client = client or default_client()
+    run = writer or (lambda fn, *args: fn(*args))
+    report = progress or (lambda message: None)
+    now = datetime.datetime.utcnow()
+    start, end = _sync_window(db.get_sync_state(user_id), now)
+    cache = PageCache(None if full else db.load_page_cache(user_id))
+
+    fetched = [0]
+    lock = threading.Lock()
+
+    def on_page(n):
+        with lock:
+            fetched[0] += n
+            total = fetched[0]
+        report(f"Fetched {total} Canvas items...")
+
+    write = store.upsert_canvas if store is not None else (
+        lambda rows: db.upsert_canvas_tasks(user_id, rows))
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    report("Contacting Canvas...")
+    items = client.iter_planner_items(start, end, cache=cache, cancel=cancel, on_page=on_page)
+    try:
+        for chunk in db.chunked(to_rows(iter_tasks(items)), WRITE_CHUNK):
+            if cancel is not None and cancel.is_set():
+                raise SyncCancelled()
+            for k, n in run(write, chunk).items():
+                counts[k] += n
+    finally:
+        items.close()
+        if creds is not None:
+            client.close()
+    if cancel is not None and cancel.is_set():
+        raise SyncCancelled()
+
+    run(db.save_sync_state, user_id, int(time.time()), start.isoformat(), end.isoformat(),
+        cache.seen)
+    counts["not_modified_pages"] = cache.not_modified
+    return counts
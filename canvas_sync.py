@@ -1,56 +1,359 @@
 # canvas_sync.py
-import os, requests, datetime
+import os, datetime, queue, threading, time
+from collections import namedtuple
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from dueparse import due_timestamp
+import perf
+# `requests` is imported on first use: it is the slowest import in the app and
+# nothing needs it until the user actually syncs.
 
 BASE_URL = os.getenv("CANVAS_BASE_URL")  # e.g. https://yourcampus.instructure.com
 TOKEN    = os.getenv("CANVAS_TOKEN")    # get your token thru setting page in your canvas
 
+PER_PAGE = 100
+MAX_WORKERS = 4          # parallel page fetches per client
+WINDOW_DAYS = 7          # planner range is split into windows of this size
+MAX_RETRIES = 5          # for throttled (403/429) and 5xx responses
+PAGE_QUEUE = 8           # fetched-but-unconsumed pages held while streaming
+
+
+class _RateLimiter:
+    """
+    Adaptive pacing from Canvas' X-Rate-Limit-Remaining header. Canvas uses a
+    leaky bucket (~700 units when full); as it drains we add a growing delay
+    before each request instead of waiting to be rejected.
+    """
+    LOW_WATER = 300.0
+    MAX_DELAY = 2.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._delay = 0.0
+
+    def wait(self):
+        with self._lock:
+            delay = self._delay
+        if delay:
+            time.sleep(delay)
+
+    def update(self, remaining):
+        if remaining is None:
+            return
+        try:
+            remaining = float(remaining)
+        except ValueError:
+            return
+        with self._lock:
+            if remaining >= self.LOW_WATER:
+                self._delay = 0.0
+            else:
+                self._delay = self.MAX_DELAY * (self.LOW_WATER - remaining) / self.LOW_WATER
+
+    def backoff(self, attempt, retry_after=None):
+        if retry_after:
+            try:
+                time.sleep(float(retry_after))
+                return
+            except ValueError:
+                pass
+        time.sleep(min(30.0, 0.5 * 2 ** attempt))
+
+
+class SyncCancelled(Exception):
+    """Raised between page requests once the caller's cancel event is set."""
+
+
+class _AnySet:
+    """is_set() of several optional Events, for iter_pages(cancel=...)."""
+
+    def __init__(self, *events):
+        self.events = [e for e in events if e is not None]
+
+    def is_set(self):
+        return any(e.is_set() for e in self.events)
+
+
+class PageCache:
+    """
+    ETag / Last-Modified validators per page URL for conditional requests.
+    `entries` are the validators from the previous sync; `seen` collects the
+    ones still in use this run (what should be persisted afterwards).
+    """
+
+    def __init__(self, entries=None):
+        self.entries = dict(entries or {})   # {url: (etag, last_modified, next_url)}
+        self.seen = {}
+        self.not_modified = 0                # pages skipped with a 304
+
+    def headers(self, url):
+        etag, last_modified, _next = self.entries.get(url, (None, None, None))
+        h = {}
+        if etag:
+            h["If-None-Match"] = etag
+        if last_modified:
+            h["If-Modified-Since"] = last_modified
+        return h
+
+
+def _is_throttled(r):
+    return r.status_code == 429 or (
+        r.status_code == 403 and "rate limit exceeded" in r.text.lower()
+    )
+
+
+class CanvasClient:
+    """
+    Talks to one Canvas instance with one pooled requests.Session. Follows
+    `Link: rel="next"` pagination and fetches independent pages in parallel.
+    `gate` is held around every HTTP request; a Semaphore shared by several
+    clients caps how many requests they have in flight against one host.
+    """
+
+    def __init__(self, base_url=None, token=None, max_workers=MAX_WORKERS, timeout=20,
+                 gate=None):
+        self.base_url = (base_url or BASE_URL or "").rstrip("/")
+        self.token = token or TOKEN
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.gate = gate if gate is not None else nullcontext()
+        self.limiter = _RateLimiter()
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @property
+    def session(self):
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers["Authorization"] = f"Bearer {self.token}"
+                self._session = s
+            return self._session
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    @perf.timed("canvas.http_get")
+    def _get(self, url, params=None, headers=None):
+        """One GET with rate-limit pacing and retries; returns the Response."""
+        if not self.base_url or not self.token:
+            raise RuntimeError("Set CANVAS_BASE_URL and CANVAS_TOKEN env vars.")
+        for attempt in range(MAX_RETRIES + 1):
+            self.limiter.wait()
+            with self.gate:
+                r = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            self.limiter.update(r.headers.get("X-Rate-Limit-Remaining"))
+            if attempt < MAX_RETRIES and (_is_throttled(r) or r.status_code >= 500):
+                self.limiter.backoff(attempt, r.headers.get("Retry-After"))
+                continue
+            r.raise_for_status()
+            return r
+
+    def iter_pages(self, path, params=None, cache=None, cancel=None):
+        """
+        Yield the JSON body of each page, following rel="next" links.
+        With a PageCache, requests are conditional and pages the server
+        answers with 304 Not Modified are skipped (not yielded).
+        `cancel` (a threading.Event) is checked before every request.
+        """
+        url = f"{self.base_url}{path}"
+        if params:
+            url += "?" + urlencode(params, doseq=True)
+        while url:
+            if cancel is not None and cancel.is_set():
+                raise SyncCancelled()
+            r = self._get(url, headers=cache.headers(url) if cache else None)
+            if r.status_code == 304:
+                entry = cache.entries.get(url) if cache is not None else None
+                if entry is not None:
+                    cache.seen[url] = entry
+                    cache.not_modified += 1
+                    url = entry[2]
+                    continue
+                # not our validators (e.g. a proxy's, or a stale cache):
+                # there is no page to reuse, so ask again unconditionally
+                r = self._get(url, headers={"Cache-Control": "no-cache"})
+                if r.status_code == 304:
+                    raise RuntimeError(f"Canvas answered 304 to an unconditional request: {url}")
+            nxt = r.links.get("next", {}).get("url")
+            if cache is not None:
+                cache.seen[url] = (r.headers.get("ETag"), r.headers.get("Last-Modified"), nxt)
+            yield r.json()
+            url = nxt
+
+    def get_all(self, path, params=None, cache=None, cancel=None, on_page=None):
+        """All pages of a list endpoint concatenated (a dict body is returned as-is)."""
+        out = []
+        for page in self.iter_pages(path, params, cache, cancel):
+            if not isinstance(page, list):
+                return page
+            out.extend(page)
+            if on_page is not None:
+                on_page(len(page))
+        return out
+
+    def list_courses(self):
+        # Only active, enrolled courses
+        return self.get_all("/api/v1/courses",
+                            params={"enrollment_state": "active", "per_page": PER_PAGE})
+
+    def fetch_planner_items(self, start=None, end=None, window_days=WINDOW_DAYS, cache=None,
+                            cancel=None, on_page=None):
+        """
+        Pulls upcoming items shown in Canvas Planner (assignments, quizzes, etc).
+        The whole list at once; see iter_planner_items() for the streaming form.
+        """
+        return list(self.iter_planner_items(start, end, window_days, cache, cancel, on_page))
+
+    def iter_planner_items(self, start=None, end=None, window_days=WINDOW_DAYS, cache=None,
+                           cancel=None, on_page=None):
+        """
+        Yield planner items page by page as they arrive. The range is cut into
+        windows that are paged through in parallel; workers hand pages over
+        through a bounded queue, so at most PAGE_QUEUE pages wait in memory
+        however long the range is. With a PageCache only pages that changed
+        since the last sync are yielded. on_page(n_items) is called (from
+        worker threads) as pages arrive. Closing the generator early stops
+        the workers after their current request.
+        """
+        if start is None:
+            start = datetime.datetime.utcnow()
+        if end is None:
+            end = start + datetime.timedelta(days=30)
+
+        windows = []
+        step = datetime.timedelta(days=window_days)
+        w_start = start
+        while w_start < end:
+            w_end = min(w_start + step, end)
+            windows.append((w_start, w_end))
+            w_start = w_end
+
+        pages = queue.Queue(maxsize=PAGE_QUEUE)
+        stop = threading.Event()
+        done = object()
+
+        def put(msg):
+            while not stop.is_set():
+                try:
+                    pages.put(msg, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def fetch(window):
+            w_start, w_end = window
+            params = {
+                "start_date": w_start.isoformat() + "Z",
+                "end_date": w_end.isoformat() + "Z",
+                "per_page": PER_PAGE,
+            }
+            try:
+                for page in self.iter_pages("/api/v1/planner/items", params, cache,
+                                            _AnySet(cancel, stop)):
+                    if not isinstance(page, list):
+                        raise ValueError(f"unexpected planner response: {page!r:.200}")
+                    if on_page is not None:
+                        on_page(len(page))
+                    put(page)
+            except SyncCancelled:
+                if not stop.is_set():
+                    put(SyncCancelled())
+            except Exception as e:
+                put(e)
+            finally:
+                put(done)
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            for w in windows:
+                pool.submit(fetch, w)
+            # an item sitting exactly on a window edge can come back twice;
+            # only the (type, id) keys are remembered to drop the repeat
+            seen = set()
+            remaining = len(windows)
+            while remaining:
+                page = pages.get()
+                if page is done:
+                    remaining -= 1
+                    continue
+                if isinstance(page, BaseException):
+                    raise page
+                for it in page:
+                    key = (it.get("plannable_type"), it.get("plannable_id"))
+                    if key != (None, None) and key in seen:
+                        continue
+                    seen.add(key)
+                    yield it
+        finally:
+            stop.set()
+            pool.shutdown(wait=False)
+
+
+_default_client = None
+
+def default_client():
+    """Shared client built from CANVAS_BASE_URL / CANVAS_TOKEN."""
+    global _default_client
+    if _default_client is None:
+        _default_client = CanvasClient()
+    return _default_client
+
+@perf.timed("canvas._api_get")
 def _api_get(path, params=None):
-    if not BASE_URL or not TOKEN:
-        raise RuntimeError("Set CANVAS_BASE_URL and CANVAS_TOKEN env vars.")
-    headers = {"Authorization": f"Bearer {TOKEN}"}
-    url = f"{BASE_URL}{path}"
-    r = requests.get(url, headers=headers, params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    return default_client().get_all(path, params=params)
 
 def list_courses():
-    # Only active, enrolled courses
-    return _api_get("/api/v1/courses", params={"enrollment_state":"active","per_page":100})
+    return default_client().list_courses()
 
 def fetch_planner_items(start=None, end=None):
     """
     Pulls upcoming items shown in Canvas Planner (assignments, quizzes, etc).
     """
-    if start is None:
-        start = datetime.datetime.utcnow()
-    if end is None:
-        end = start + datetime.timedelta(days=30)
+    return default_client().fetch_planner_items(start, end)
+
+# Compact form of one planner item: a tuple, so no per-item __dict__.
+# canvas_id is "<plannable_type>:<plannable_id>" - stable across renames.
+PlannerTask = namedtuple("PlannerTask", "task due due_ts course canvas_id updated_at")
 
-    params = {
-        "start_date": start.isoformat() + "Z",
-        "end_date": end.isoformat() + "Z",
-        "per_page": 100
-    }
-    return _api_get("/api/v1/planner/items", params=params)
 
+def to_task(it):
+    """One Canvas planner item -> PlannerTask."""
+    plannable = it.get("plannable") or {}
+    title = plannable.get("title") or it.get("title") or "Untitled"
+    due = plannable.get("due_at") or it.get("plannable_date")
+    canvas_id = None
+    if it.get("plannable_id") is not None:
+        canvas_id = f"{it.get('plannable_type')}:{it['plannable_id']}"
+    course_name = it.get("context_name") if it.get("context_type") == "Course" else None
+    return PlannerTask(title, due, due_timestamp(due), course_name, canvas_id,
+                       plannable.get("updated_at"))
+
+
+def iter_tasks(planner_items):
+    """Lazily convert an iterable of planner items (e.g. iter_planner_items())."""
+    n = 0
+    for it in planner_items:
+        n += 1
+        yield to_task(it)
+    perf.count("canvas.items_converted", n)
+
+
+@perf.timed("canvas.to_local_tasks")
 def to_local_tasks(planner_items):
     """
     Convert Canvas planner items to your app's task dicts:
-      { task, due, done, course }
+      { task, due, due_ts, done, course, canvas_id, updated_at }
+    (done is always False: completion is tracked locally).
     """
-    tasks = []
-    for it in planner_items:
-        # Common fields
-        title = it.get("plannable", {}).get("title") or it.get("title") or "Untitled"
-        due = it.get("plannable", {}).get("due_at") or it.get("plannable_date")
-        course_name = None
-        if it.get("context_type") == "Course":
-            course_name = it.get("context_name")
-
-        tasks.append({
-            "task": title,
-            "due": due,          # ISO string; you can format later
-            "done": False,       # you control completion locally
-            "course": course_name
-        })
-    return tasks
+    fields = PlannerTask._fields
+    return [dict(zip(fields, t), done=False) for t in iter_tasks(planner_items)]
@@ -1,39 +1,360 @@
-import sqlite3, hashlib, os
+import logging, re, sqlite3, threading, time, unicodedata
+import auth
+import notify
+import perf
+from dueparse import due_timestamp
 
 DB_FILE = "planner.db"
+log = logging.getLogger("planner.db")
+
+# --- connection manager ---
+# One long-lived connection per thread (sqlite3 connections can't be shared
+# across threads by default). WAL lets readers run while a writer commits.
+PRAGMAS = (
+    # must come before anything writes the header of a new database;
+    # archive.py converts older files once
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",   # safe with WAL, far fewer fsyncs
+    "PRAGMA cache_size=-8000",     # ~8 MB page cache
+    "PRAGMA mmap_size=67108864",   # 64 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+)
+BUSY_TIMEOUT = 10.0       # seconds to wait on a locked database
+STATEMENT_CACHE = 128     # prepared statements kept per connection
+
+_local = threading.local()
+_all_conns = []
+_all_lock = threading.Lock()
+_generation = 0   # bumped by close_all() so threads reopen instead of reusing
+
+def _count_statement(_sql):
+    perf.count("db.statements")
+
+def _connect(path):
+    # check_same_thread=False only so close_all() may close it; each
+    # connection is still used by the thread that opened it
+    c = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                        cached_statements=STATEMENT_CACHE)
+    for p in PRAGMAS:
+        c.execute(p)
+    if perf.ENABLED:
+        c.set_trace_callback(_count_statement)
+    with _all_lock:
+        _all_conns.append(c)
+    return c
 
 def conn():
-    return sqlite3.connect(DB_FILE)
+    """Return this thread's connection to DB_FILE, opening it on first use.
 
-def init_db():
-    with conn() as c:
-        c.execute("""
-        CREATE TABLE IF NOT EXISTS users(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            salt BLOB NOT NULL
-        );
-        """)
+    Use it as `with conn() as c:` - the block commits (or rolls back) but the
+    connection stays open for the next call.
+    """
+    c = getattr(_local, "conn", None)
+    if c is None or _local.path != DB_FILE or _local.gen != _generation:
+        if c is not None:
+            close()
+        c = _connect(DB_FILE)
+        _local.conn, _local.path, _local.gen = c, DB_FILE, _generation
+    return c
+
+def close():
+    """Close the calling thread's connection (e.g. when a worker thread exits)."""
+    c = getattr(_local, "conn", None)
+    if c is None:
+        return
+    _local.conn = None
+    with _all_lock:
+        if c in _all_conns:
+            _all_conns.remove(c)
+    c.close()
+
+def close_all():
+    """Close every pooled connection (at shutdown, or after swapping DB_FILE)."""
+    global _generation
+    with _all_lock:
+        conns, _all_conns[:] = list(_all_conns), []
+        _generation += 1
+    for c in conns:
+        c.close()
+    _local.conn = None
+
+# --- schema migrations ---
+# PRAGMA user_version records how many of MIGRATIONS have been applied, so an
+# existing planner.db is upgraded in place and a current one is left alone.
+
+def _m1_base(c):
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS users(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        salt BLOB NOT NULL
+    );
+    """)
+    c.execute("""
+    CREATE TABLE IF NOT EXISTS tasks(
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        due TEXT NOT NULL,
+        done INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    );
+    """)
+
+def _m2_unique_tasks(c):
+    """One row per (user_id, title, due); older DBs may hold duplicates."""
+    c.execute("DROP INDEX IF EXISTS ux_tasks_user_title_due")
+    # keep the oldest copy of each duplicate, done if any copy was done
+    c.execute("""
+        UPDATE tasks SET done=1 WHERE id IN (
+            SELECT MIN(id) FROM tasks GROUP BY user_id, title, due HAVING MAX(done)=1
+        )""")
+    # the dropped copies are kept in merged_tasks, next to the id they merged into
+    dupes = """
+        SELECT t.id, t.user_id, t.title, t.due, t.done, k.kept_id FROM tasks t
+        JOIN (SELECT user_id, title, due, MIN(id) AS kept_id FROM tasks
+              GROUP BY user_id, title, due HAVING COUNT(*) > 1) k
+          ON t.user_id=k.user_id AND t.title=k.title AND t.due=k.due
+        WHERE t.id<>k.kept_id"""
+    if c.execute(f"SELECT EXISTS({dupes})").fetchone()[0]:
         c.execute("""
-        CREATE TABLE IF NOT EXISTS tasks(
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+        CREATE TABLE IF NOT EXISTS merged_tasks(
+            id INTEGER PRIMARY KEY,
             user_id INTEGER NOT NULL,
             title TEXT NOT NULL,
             due TEXT NOT NULL,
-            done INTEGER NOT NULL DEFAULT 0,
-            FOREIGN KEY(user_id) REFERENCES users(id)
-        );
-        """)
+            done INTEGER NOT NULL,
+            kept_id INTEGER NOT NULL
+        )""")
+        c.execute(f"INSERT OR REPLACE INTO merged_tasks {dupes}")
+        merged = c.execute("DELETE FROM tasks WHERE id IN (SELECT id FROM merged_tasks)").rowcount
+        log.warning("merged %d duplicate tasks (same user, title and due date) "
+                    "into the oldest copy of each; the removed rows are in merged_tasks",
+                    merged)
+    c.execute("CREATE UNIQUE INDEX ux_tasks_user_title_due ON tasks(user_id, title, due)")
+
+def _m3_due_ts(c):
+    """Sortable UTC epoch column for due dates, plus per-user indexes."""
+    c.execute("ALTER TABLE tasks ADD COLUMN due_ts INTEGER")
+    rows = c.execute("SELECT id, due FROM tasks").fetchall()
+    c.executemany("UPDATE tasks SET due_ts=? WHERE id=?",
+                  [(due_timestamp(due), tid) for tid, due in rows])
+    c.execute("CREATE INDEX ix_tasks_user_done_due ON tasks(user_id, done, due_ts)")
+    c.execute("CREATE INDEX ix_tasks_user_done_id ON tasks(user_id, done, id)")
+
+def _m4_canvas_sync(c):
+    """Stable Canvas ids on tasks, plus per-user incremental sync state."""
+    c.execute("ALTER TABLE tasks ADD COLUMN canvas_id TEXT")
+    c.execute("ALTER TABLE tasks ADD COLUMN canvas_updated_at TEXT")
+    c.execute("""
+        CREATE UNIQUE INDEX ux_tasks_user_canvas ON tasks(user_id, canvas_id)
+        WHERE canvas_id IS NOT NULL""")
+    c.execute("""
+    CREATE TABLE sync_state(
+        user_id INTEGER PRIMARY KEY,
+        last_sync INTEGER NOT NULL,
+        window_start TEXT NOT NULL,
+        window_end TEXT NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    );
+    """)
+    c.execute("""
+    CREATE TABLE sync_pages(
+        user_id INTEGER NOT NULL,
+        url TEXT NOT NULL,
+        etag TEXT,
+        last_modified TEXT,
+        next_url TEXT,
+        PRIMARY KEY(user_id, url)
+    );
+    """)
 
-# --- password hashing helpers (PBKDF2) ---
-def _hash_password(password: str, salt: bytes) -> str:
-    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, 120_000)
-    return dk.hex()
+def _m5_reminders(c):
+    """Reminder thresholds already delivered, so restarts don't repeat them."""
+    c.execute("""
+    CREATE TABLE reminders_fired(
+        task_id INTEGER NOT NULL,
+        threshold INTEGER NOT NULL,    -- seconds before due
+        fired_at INTEGER NOT NULL,
+        PRIMARY KEY(task_id, threshold)
+    ) WITHOUT ROWID;
+    """)
+    # a deleted task, or a new due date, starts with a clean slate
+    c.execute("""
+        CREATE TRIGGER tr_tasks_delete_reminders AFTER DELETE ON tasks BEGIN
+            DELETE FROM reminders_fired WHERE task_id=OLD.id;
+        END""")
+    c.execute("""
+        CREATE TRIGGER tr_tasks_due_reminders AFTER UPDATE OF due ON tasks
+        WHEN OLD.due IS NOT NEW.due BEGIN
+            DELETE FROM reminders_fired WHERE task_id=NEW.id;
+        END""")
 
+def _m6_search(c):
+    """
+    FTS5 index over task titles, kept in step with tasks by triggers. Builds
+    of SQLite without FTS5 skip it and search_tasks() falls back to LIKE.
+    """
+    try:
+        c.execute("""
+            CREATE VIRTUAL TABLE tasks_fts USING fts5(
+                title, content='tasks', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )""")
+    except sqlite3.OperationalError as e:
+        if "fts5" not in str(e):
+            raise
+        return
+    c.execute("INSERT INTO tasks_fts(tasks_fts) VALUES('rebuild')")
+    c.execute("""
+        CREATE TRIGGER tr_tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts(rowid, title) VALUES(NEW.id, NEW.title);
+        END""")
+    c.execute("""
+        CREATE TRIGGER tr_tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title) VALUES('delete', OLD.id, OLD.title);
+        END""")
+    c.execute("""
+        CREATE TRIGGER tr_tasks_fts_update AFTER UPDATE OF title ON tasks
+        WHEN OLD.title IS NOT NEW.title BEGIN
+            INSERT INTO tasks_fts(tasks_fts, rowid, title) VALUES('delete', OLD.id, OLD.title);
+            INSERT INTO tasks_fts(rowid, title) VALUES(NEW.id, NEW.title);
+        END""")
+
+def _m7_task_versions(c):
+    """Per-user change counter, bumped by every write to a user's tasks."""
+    c.execute("""
+    CREATE TABLE task_versions(
+        user_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    """)
+    for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+        c.execute(f"""
+            CREATE TRIGGER tr_tasks_{event.lower()}_version AFTER {event} ON tasks BEGIN
+                INSERT INTO task_versions(user_id, version) VALUES({row}.user_id, 1)
+                ON CONFLICT(user_id) DO UPDATE SET version=version+1;
+            END""")
+
+def _m8_archive(c):
+    """Completion times, and the cold table archive.py moves old tasks to."""
+    c.execute("ALTER TABLE tasks ADD COLUMN done_at INTEGER")
+    # finished before completion times were kept: count them from now
+    c.execute("UPDATE tasks SET done_at=CAST(strftime('%s','now') AS INTEGER) WHERE done=1")
+    c.execute("CREATE INDEX ix_tasks_done_at ON tasks(done_at) WHERE done=1")
+    c.execute("CREATE INDEX ix_tasks_due_ts ON tasks(due_ts)")
+    c.execute("""
+    CREATE TABLE archived_tasks(
+        id INTEGER PRIMARY KEY,        -- the id it had in tasks
+        user_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        due TEXT NOT NULL,
+        due_ts INTEGER,
+        done INTEGER NOT NULL,
+        done_at INTEGER,
+        canvas_id TEXT,
+        canvas_updated_at TEXT,
+        archived_at INTEGER NOT NULL
+    );
+    """)
+    c.execute("CREATE INDEX ix_archived_user_id ON archived_tasks(user_id, id)")
+    c.execute("CREATE INDEX ix_archived_user_title_due ON archived_tasks(user_id, title, due)")
+    c.execute("""
+        CREATE INDEX ix_archived_user_canvas ON archived_tasks(user_id, canvas_id)
+        WHERE canvas_id IS NOT NULL""")
+
+def _m9_canvas_credentials(c):
+    """Per-user Canvas instance + access token, for batch_sync.py."""
+    c.execute("""
+    CREATE TABLE canvas_credentials(
+        user_id INTEGER PRIMARY KEY,
+        base_url TEXT NOT NULL,
+        token TEXT NOT NULL,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    );
+    """)
+
+def _m10_task_changes(c):
+    """
+    Per-row change stamps and delete tombstones, so a client can ask what
+    changed since the version it holds (server.py: GET /api/tasks?since=).
+    row_version is the user's task_versions value after the row's last write;
+    the stamping UPDATE leaves row_version different, so it doesn't bump again.
+    """
+    for event in ("insert", "update", "delete"):
+        c.execute(f"DROP TRIGGER tr_tasks_{event}_version")
+    c.execute("ALTER TABLE tasks ADD COLUMN row_version INTEGER NOT NULL DEFAULT 0")
+    c.execute("""
+        UPDATE tasks SET row_version=COALESCE(
+            (SELECT version FROM task_versions v WHERE v.user_id=tasks.user_id), 0)""")
+    c.execute("CREATE INDEX ix_tasks_user_row_version ON tasks(user_id, row_version)")
+    # deletes up to `floor` were pruned (archive.py); older clients reload in full
+    c.execute("ALTER TABLE task_versions ADD COLUMN floor INTEGER NOT NULL DEFAULT 0")
+    c.execute("""
+    CREATE TABLE task_tombstones(
+        task_id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        deleted_at INTEGER NOT NULL
+    );
+    """)
+    c.execute("CREATE INDEX ix_tombstones_user_version ON task_tombstones(user_id, version)")
+    bump = """
+        INSERT INTO task_versions(user_id, version) VALUES({row}.user_id, 1)
+        ON CONFLICT(user_id) DO UPDATE SET version=version+1;"""
+    stamp = """
+        UPDATE tasks SET row_version=(SELECT version FROM task_versions WHERE user_id=NEW.user_id)
+        WHERE id=NEW.id;"""
+    c.execute(f"""
+        CREATE TRIGGER tr_tasks_insert_version AFTER INSERT ON tasks BEGIN
+            {bump.format(row="NEW")}
+            {stamp}
+        END""")
+    c.execute(f"""
+        CREATE TRIGGER tr_tasks_update_version AFTER UPDATE ON tasks
+        WHEN NEW.row_version IS OLD.row_version BEGIN
+            {bump.format(row="NEW")}
+            {stamp}
+        END""")
+    c.execute(f"""
+        CREATE TRIGGER tr_tasks_delete_version AFTER DELETE ON tasks BEGIN
+            {bump.format(row="OLD")}
+            INSERT OR REPLACE INTO task_tombstones(task_id, user_id, version, deleted_at)
+            VALUES(OLD.id, OLD.user_id,
+                   (SELECT version FROM task_versions WHERE user_id=OLD.user_id),
+                   CAST(strftime('%s','now') AS INTEGER));
+        END""")
+
+MIGRATIONS = [_m1_base, _m2_unique_tasks, _m3_due_ts, _m4_canvas_sync, _m5_reminders,
+              _m6_search, _m7_task_versions, _m8_archive, _m9_canvas_credentials,
+              _m10_task_changes]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+def schema_version(c=None):
+    return (c or conn()).execute("PRAGMA user_version").fetchone()[0]
+
+@perf.timed("db.init_db")
+def init_db():
+    """Apply any pending migrations, each in its own transaction."""
+    c = conn()
+    if schema_version(c) == SCHEMA_VERSION:
+        return
+    c.execute("BEGIN IMMEDIATE")  # one process migrates at a time
+    try:
+        for n in range(schema_version(c), SCHEMA_VERSION):
+            MIGRATIONS[n](c)
+            c.execute(f"PRAGMA user_version={n + 1}")
+        c.commit()
+    except Exception:
+        c.rollback()
+        raise
+
+# --- users (hashing lives in auth.py) ---
+@perf.timed("db.create_user")
 def create_user(username: str, password: str) -> bool:
-    salt = os.urandom(16)
-    pwh = _hash_password(password, salt)
+    pwh, salt = auth.hash_password(password)
     try:
         with conn() as c:
             c.execute("INSERT INTO users(username, password_hash, salt) VALUES(?,?,?)",
@@ -42,18 +363,74 @@ def create_user(username: str, password: str) -> bool:
     except sqlite3.IntegrityError:
         return False  # username already exists
 
+@perf.timed("db.verify_user")
 def verify_user(username: str, password: str):
+    """
+    Return the user id, or None for bad credentials. Raises
+    auth.LoginThrottled (without hashing anything) while the username is
+    locked out after repeated failures. Hashes made with outdated settings
+    are upgraded on success.
+    """
+    auth.limiter.check(username)
     with conn() as c:
         row = c.execute("SELECT id, password_hash, salt FROM users WHERE username=?",
                         (username,)).fetchone()
     if not row:
+        auth.burn_dummy_check(password)  # same cost as a wrong password
+        auth.limiter.failed(username)
         return None
     uid, pwh, salt = row
-    if _hash_password(password, salt) == pwh:
-        return uid
-    return None
+    ok, needs_rehash = auth.check_password(password, pwh, salt)
+    if not ok:
+        auth.limiter.failed(username)
+        return None
+    auth.limiter.succeeded(username)
+    if needs_rehash:
+        new_pwh, new_salt = auth.hash_password(password)
+        with conn() as c:
+            c.execute("UPDATE users SET password_hash=?, salt=? WHERE id=?",
+                      (new_pwh, new_salt, uid))
+    return uid
+
+@perf.timed("db.get_or_create_local_user")
+def get_or_create_local_user(username: str):
+    """
+    (user_id, created) for a password-less account used by local front ends
+    (the CLI). It has no usable password, so it cannot be logged into.
+    """
+    with conn() as c:
+        cur = c.execute(
+            "INSERT INTO users(username, password_hash, salt) VALUES(?,?,?) "
+            "ON CONFLICT(username) DO NOTHING",
+            (username, auth.UNUSABLE_PASSWORD, b""))
+        if cur.rowcount:
+            return cur.lastrowid, True
+        return c.execute("SELECT id FROM users WHERE username=?", (username,)).fetchone()[0], False
 
 # --- task ops ---
+# Existing (user_id, title, due) keys are filtered out by the SELECT (on
+# ux_tasks_user_title_due) rather than left to ON CONFLICT: a conflicting
+# insert still uses up an AUTOINCREMENT id, so every re-sync would leave
+# gaps in the task ids the GUI shows.
+_NEW_TASK = "NOT EXISTS (SELECT 1 FROM tasks WHERE user_id=?1 AND title=?2 AND due=?3)"
+_INSERT_TASK = f"""
+    INSERT INTO tasks(user_id, title, due, due_ts, done)
+    SELECT ?1, ?2, ?3, ?4, 0 WHERE {_NEW_TASK}
+    ON CONFLICT(user_id, title, due) DO NOTHING
+"""
+# imports (bulk, Canvas) also skip tasks that were archived, so finished
+# coursework isn't brought back by the next sync
+_IMPORT_TASK = f"""
+    INSERT INTO tasks(user_id, title, due, due_ts, done)
+    SELECT ?1, ?2, ?3, ?4, 0 WHERE {_NEW_TASK} AND NOT EXISTS (
+        SELECT 1 FROM archived_tasks WHERE user_id=?1 AND title=?2 AND due=?3)
+    ON CONFLICT(user_id, title, due) DO NOTHING
+"""
+_REFRESH_DUE_TS = """
+    UPDATE tasks SET due_ts=? WHERE user_id=? AND title=? AND due=? AND due_ts IS NOT ?
+"""
+
+@perf.timed("db.list_tasks")
 def list_tasks(user_id: int):
     with conn() as c:
         return c.execute(
@@ -61,29 +438,549 @@ def list_tasks(user_id: int):
             (user_id,)
         ).fetchall()
 
+@perf.timed("db.task_version")
+def task_version(user_id: int):
+    """The user's change counter; it moves on every insert/update/delete of their tasks."""
+    with conn() as c:
+        row = c.execute("SELECT version FROM task_versions WHERE user_id=?",
+                        (user_id,)).fetchone()
+    return row[0] if row else 0
+
+@perf.timed("db.load_tasks")
+def load_tasks(user_id: int):
+    """
+    (version, rows) read from one snapshot, so the rows are exactly those of
+    that version. Rows: (id, title, due, done, due_ts) ordered by done, id.
+    """
+    c = conn()
+    with c:
+        c.execute("BEGIN")
+        row = c.execute("SELECT version FROM task_versions WHERE user_id=?",
+                        (user_id,)).fetchone()
+        rows = c.execute(
+            "SELECT id, title, due, done, due_ts FROM tasks WHERE user_id=? ORDER BY done, id",
+            (user_id,)
+        ).fetchall()
+    return (row[0] if row else 0), rows
+
+@perf.timed("db.task_changes")
+def task_changes(user_id: int, since: int):
+    """
+    What happened to the user's tasks after version `since`, read from one
+    snapshot: (version, changed, deleted) with list_tasks() rows written
+    since then and the ids deleted since then. changed and deleted are None
+    when `since` can't be answered with a delta (unknown, or older than the
+    pruned tombstones): the caller has to reload everything.
+    """
+    c = conn()
+    with c:
+        c.execute("BEGIN")
+        row = c.execute("SELECT version, floor FROM task_versions WHERE user_id=?",
+                        (user_id,)).fetchone()
+        version, floor = row or (0, 0)
+        if since == version:
+            return version, [], []
+        if since <= 0 or since < floor or since > version:
+            return version, None, None
+        changed = c.execute(
+            "SELECT id, title, due, done FROM tasks WHERE user_id=? AND row_version>? "
+            "ORDER BY done, id", (user_id, since)).fetchall()
+        deleted = [tid for (tid,) in c.execute(
+            "SELECT task_id FROM task_tombstones WHERE user_id=? AND version>?",
+            (user_id, since))]
+    return version, changed, deleted
+
+@perf.timed("db.prune_tombstones")
+def prune_tombstones(deleted_before: int):
+    """
+    Forget deletes older than `deleted_before` (epoch seconds), raising each
+    affected user's floor past them. Returns the number removed.
+    """
+    with conn() as c:
+        c.execute("""
+            UPDATE task_versions SET floor=MAX(floor, (
+                SELECT MAX(version) FROM task_tombstones t
+                WHERE t.user_id=task_versions.user_id AND t.deleted_at<?1))
+            WHERE user_id IN (SELECT user_id FROM task_tombstones WHERE deleted_at<?1)""",
+                  (deleted_before,))
+        return c.execute("DELETE FROM task_tombstones WHERE deleted_at<?",
+                         (deleted_before,)).rowcount
+
+@perf.timed("db.add_task")
 def add_task(user_id: int, title: str, due: str):
+    """
+    Insert a task; returns (id, created). A task with the same title and due
+    date already exists when created is False, and id is that task's.
+    """
     with conn() as c:
-        c.execute("INSERT INTO tasks(user_id, title, due, done) VALUES(?,?,?,0)",
-                  (user_id, title, due))
+        cur = c.execute(_INSERT_TASK, (user_id, title, due, due_timestamp(due)))
+        if not cur.rowcount:
+            return c.execute(
+                "SELECT id FROM tasks WHERE user_id=? AND title=? AND due=?",
+                (user_id, title, due)
+            ).fetchone()[0], False
+    notify.changed()
+    return cur.lastrowid, True
 
+@perf.timed("db.mark_done")
 def mark_done(user_id: int, task_id: int):
+    """True if the task exists (for this user)."""
     with conn() as c:
-        c.execute("UPDATE tasks SET done=1 WHERE id=? AND user_id=?", (task_id, user_id))
+        matched = c.execute(
+            "UPDATE tasks SET done=1, done_at=COALESCE(done_at, ?) WHERE id=? AND user_id=?",
+            (int(time.time()), task_id, user_id)).rowcount > 0
+    if matched:
+        notify.changed()
+    return matched
+
+@perf.timed("db.mark_undone")
+def mark_undone(user_id: int, task_id: int):
+    """True if the task exists (for this user)."""
+    with conn() as c:
+        matched = c.execute("UPDATE tasks SET done=0, done_at=NULL WHERE id=? AND user_id=?",
+                            (task_id, user_id)).rowcount > 0
+    if matched:
+        notify.changed()
+    return matched
+
+@perf.timed("db.delete_task")
 def delete_task(user_id: int, task_id: int):
+    """True if the task existed (for this user)."""
     with conn() as c:
-        c.execute(
+        matched = c.execute(
             "DELETE FROM tasks WHERE user_id=? AND id=?",
             (user_id, task_id)
-        )
+        ).rowcount > 0
+    if matched:
+        notify.changed()
+    return matched
+@perf.timed("db.add_task_if_not_exists")
 def add_task_if_not_exists(user_id: int, title: str, due: str):
-    """Insert a task only if a task with same title+due for this user does not exist."""
+    """Insert a task only if no task (live or archived) with same title+due exists for this user."""
     with conn() as c:
-        row = c.execute(
-            "SELECT id FROM tasks WHERE user_id=? AND title=? AND due=?",
-            (user_id, title, due)
+        inserted = c.execute(_IMPORT_TASK, (user_id, title, due, due_timestamp(due))).rowcount
+    if inserted:
+        notify.changed()
+
+@perf.timed("db.upsert_tasks")
+def upsert_tasks(user_id: int, rows):
+    """
+    Write an iterable of (title, due) rows in a single transaction.
+    Duplicates are resolved by the UNIQUE(user_id, title, due) index, so there
+    is no read-before-write; archived tasks count as unchanged. Returns exact counts:
+      {"inserted": n, "updated": n, "unchanged": n}
+    An existing row only counts as updated when its due_ts had to be refreshed.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    with conn() as c:
+        for title, due in rows:
+            ts = due_timestamp(due)
+            if c.execute(_IMPORT_TASK, (user_id, title, due, ts)).rowcount:
+                counts["inserted"] += 1
+            elif c.execute(_REFRESH_DUE_TS, (ts, user_id, title, due, ts)).rowcount:
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+    if counts["inserted"] or counts["updated"]:
+        notify.changed()
+    return counts
+
+# --- due-date queries (served by ix_tasks_user_done_due) ---
+def epoch(t):
+    """Epoch seconds for None (now), a datetime, or a number."""
+    if t is None:
+        return int(time.time())
+    if hasattr(t, "timestamp"):
+        return int(t.timestamp())
+    return int(t)
+
+@perf.timed("db.next_due")
+def next_due(user_id: int, now=None):
+    """Closest undone task due after `now`: (id, title, due, due_ts) or None."""
+    with conn() as c:
+        return c.execute(
+            "SELECT id, title, due, due_ts FROM tasks "
+            "WHERE user_id=? AND done=0 AND due_ts>? ORDER BY due_ts LIMIT 1",
+            (user_id, epoch(now))
         ).fetchone()
-        if row is None:
-            c.execute(
-                "INSERT INTO tasks(user_id, title, due, done) VALUES(?,?,?,0)",
-                (user_id, title, due)
-            )
+
+@perf.timed("db.due_between")
+def due_between(user_id: int, start, end, include_done: bool = False):
+    """
+    Tasks due in [start, end) ordered by due time. start/end may be epoch
+    seconds or datetimes. Rows: (id, title, due, done, due_ts).
+    """
+    done_values = (0, 1) if include_done else (0,)
+    marks = ",".join("?" * len(done_values))
+    with conn() as c:
+        return c.execute(
+            "SELECT id, title, due, done, due_ts FROM tasks "
+            f"WHERE user_id=? AND done IN ({marks}) AND due_ts>=? AND due_ts<? "
+            "ORDER BY due_ts",
+            (user_id, *done_values, epoch(start), epoch(end))
+        ).fetchall()
+
+# --- Canvas incremental sync ---
+CANVAS_CHUNK = 500   # rows per transaction in upsert_canvas_tasks
+
+def chunked(rows, size):
+    """Lists of up to `size` items from any iterable."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+@perf.timed("db.upsert_canvas_tasks")
+def upsert_canvas_tasks(user_id: int, rows):
+    """
+    Write Canvas rows (canvas_id, updated_at, title, due), consumed lazily in
+    chunks of CANVAS_CHUNK rows with one transaction each, so a long stream
+    never has to be held in memory.
+    Rows are matched on their stable canvas_id, so a renamed assignment is
+    updated in place; a row whose updated_at/title/due are unchanged is not
+    written at all. A task imported before canvas ids were stored (same
+    title+due, no canvas_id) is adopted rather than duplicated, and a row
+    whose task was archived is left there (counted as unchanged).
+    Returns {"inserted": n, "updated": n, "unchanged": n}.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    for chunk in chunked(rows, CANVAS_CHUNK):
+        _upsert_canvas_chunk(user_id, chunk, counts)
+    if counts["inserted"] or counts["updated"]:
+        notify.changed()
+    return counts
+
+def _upsert_canvas_chunk(user_id, rows, counts):
+    cids = list({r[0] for r in rows if r[0] is not None})
+    with conn() as c:
+        known, archived = {}, set()
+        if cids:
+            marks = ",".join("?" * len(cids))
+            known = {
+                cid: (upd, title, due)
+                for cid, upd, title, due in c.execute(
+                    "SELECT canvas_id, canvas_updated_at, title, due FROM tasks "
+                    f"WHERE user_id=? AND canvas_id IN ({marks})", (user_id, *cids))
+            }
+            archived = {cid for (cid,) in c.execute(
+                "SELECT canvas_id FROM archived_tasks "
+                f"WHERE user_id=? AND canvas_id IN ({marks})", (user_id, *cids))}
+        for cid, updated_at, title, due in rows:
+            ts = due_timestamp(due)
+            if cid is None:  # no Canvas id: plain title+due dedup
+                cur = c.execute(_IMPORT_TASK, (user_id, title, due, ts))
+                counts["inserted" if cur.rowcount else "unchanged"] += 1
+                continue
+            if cid in archived:
+                counts["unchanged"] += 1
+                continue
+            old = known.get(cid)
+            if old is not None:
+                if old == (updated_at, title, due):
+                    counts["unchanged"] += 1
+                    continue
+                cur = c.execute(
+                    "UPDATE OR IGNORE tasks SET title=?, due=?, due_ts=?, canvas_updated_at=? "
+                    "WHERE user_id=? AND canvas_id=?",
+                    (title, due, ts, updated_at, user_id, cid))
+            else:
+                cur = c.execute(
+                    "INSERT INTO tasks(user_id, title, due, due_ts, done, canvas_id, canvas_updated_at) "
+                    f"SELECT ?1, ?2, ?3, ?4, 0, ?5, ?6 WHERE {_NEW_TASK} AND NOT EXISTS ("
+                    "SELECT 1 FROM archived_tasks WHERE user_id=?1 AND title=?2 AND due=?3) "
+                    "ON CONFLICT DO NOTHING",
+                    (user_id, title, due, ts, cid, updated_at))
+                if cur.rowcount:
+                    counts["inserted"] += 1
+                    known[cid] = (updated_at, title, due)
+                    continue
+                cur = c.execute(
+                    "UPDATE tasks SET canvas_id=?, canvas_updated_at=? "
+                    "WHERE user_id=? AND title=? AND due=? AND canvas_id IS NULL",
+                    (cid, updated_at, user_id, title, due))
+            if cur.rowcount:
+                counts["updated"] += 1
+                known[cid] = (updated_at, title, due)
+            else:
+                counts["unchanged"] += 1
+
+@perf.timed("db.get_sync_state")
+def get_sync_state(user_id: int):
+    """(last_sync, window_start, window_end) of the user's last sync, or None."""
+    with conn() as c:
+        return c.execute(
+            "SELECT last_sync, window_start, window_end FROM sync_state WHERE user_id=?",
+            (user_id,)
+        ).fetchone()
+
+@perf.timed("db.load_page_cache")
+def load_page_cache(user_id: int):
+    """{url: (etag, last_modified, next_url)} stored by the last sync."""
+    with conn() as c:
+        return {
+            url: (etag, lm, nxt)
+            for url, etag, lm, nxt in c.execute(
+                "SELECT url, etag, last_modified, next_url FROM sync_pages WHERE user_id=?",
+                (user_id,))
+        }
+
+@perf.timed("db.save_sync_state")
+def save_sync_state(user_id: int, last_sync: int, window_start: str, window_end: str, pages):
+    """Persist the sync cursor and replace the user's page validators."""
+    with conn() as c:
+        c.execute(
+            "INSERT INTO sync_state(user_id, last_sync, window_start, window_end) VALUES(?,?,?,?) "
+            "ON CONFLICT(user_id) DO UPDATE SET last_sync=excluded.last_sync, "
+            "window_start=excluded.window_start, window_end=excluded.window_end",
+            (user_id, last_sync, window_start, window_end))
+        c.execute("DELETE FROM sync_pages WHERE user_id=?", (user_id,))
+        c.executemany(
+            "INSERT INTO sync_pages(user_id, url, etag, last_modified, next_url) VALUES(?,?,?,?,?)",
+            [(user_id, url, etag, lm, nxt) for url, (etag, lm, nxt) in pages.items()])
+
+# --- Canvas credentials ---
+# Tokens are stored as given (they have to be sent to Canvas), so planner.db
+# should be readable only by the account that runs the planner.
+@perf.timed("db.find_user")
+def find_user(username: str):
+    """User id for a username, or None."""
+    with conn() as c:
+        row = c.execute("SELECT id FROM users WHERE username=?", (username,)).fetchone()
+    return row[0] if row else None
+
+@perf.timed("db.set_canvas_credentials")
+def set_canvas_credentials(user_id: int, base_url: str, token: str):
+    with conn() as c:
+        c.execute(
+            "INSERT INTO canvas_credentials(user_id, base_url, token) VALUES(?,?,?) "
+            "ON CONFLICT(user_id) DO UPDATE SET base_url=excluded.base_url, token=excluded.token",
+            (user_id, base_url.rstrip("/"), token))
+
+@perf.timed("db.delete_canvas_credentials")
+def delete_canvas_credentials(user_id: int):
+    """True if the user had credentials stored."""
+    with conn() as c:
+        return c.execute("DELETE FROM canvas_credentials WHERE user_id=?",
+                         (user_id,)).rowcount > 0
+
+@perf.timed("db.canvas_credentials")
+def canvas_credentials(user_id: int):
+    """(base_url, token) stored for the user, or None."""
+    with conn() as c:
+        return c.execute("SELECT base_url, token FROM canvas_credentials WHERE user_id=?",
+                         (user_id,)).fetchone()
+
+@perf.timed("db.all_canvas_credentials")
+def all_canvas_credentials():
+    """[(user_id, username, base_url, token)] for every user with credentials."""
+    with conn() as c:
+        return c.execute(
+            "SELECT u.id, u.username, k.base_url, k.token FROM canvas_credentials k "
+            "JOIN users u ON u.id=k.user_id ORDER BY u.id"
+        ).fetchall()
+
+# --- reminders ---
+@perf.timed("db.fired_reminders")
+def fired_reminders(user_id: int):
+    """{task_id: {threshold_seconds, ...}} already delivered for undone tasks."""
+    out = {}
+    with conn() as c:
+        for tid, secs in c.execute(
+                "SELECT r.task_id, r.threshold FROM reminders_fired r "
+                "JOIN tasks t ON t.id=r.task_id WHERE t.user_id=? AND t.done=0",
+                (user_id,)):
+            out.setdefault(tid, set()).add(secs)
+    return out
+
+@perf.timed("db.record_reminders")
+def record_reminders(user_id: int, fired, fired_at=None):
+    """
+    Persist (task_id, threshold_seconds) pairs for the user's tasks and return
+    the pairs that were not recorded yet. Whoever records a pair first (the
+    GUI or reminder_daemon.py) is the one that delivers it.
+    """
+    fired = list(fired)
+    if not fired:
+        return []
+    fired_at = epoch(fired_at)
+    new = []
+    with conn() as c:
+        for tid, secs in fired:
+            if c.execute(
+                    "INSERT INTO reminders_fired(task_id, threshold, fired_at) "
+                    "SELECT id, ?, ? FROM tasks WHERE id=? AND user_id=? "
+                    "ON CONFLICT DO NOTHING",
+                    (secs, fired_at, tid, user_id)).rowcount:
+                new.append((tid, secs))
+    return new
+
+@perf.timed("db.upcoming_reminders")
+def upcoming_reminders(start, end):
+    """
+    Undone tasks of every user due in (start, end], read from one snapshot
+    (served by ix_tasks_due_ts): (rows, fired, next_ts) with rows
+    (id, user_id, username, title, due), fired {task_id: {threshold_seconds, ...}} for
+    those tasks, and next_ts the first due_ts after `end` (None if none).
+    """
+    lo, hi = epoch(start), epoch(end)
+    c = conn()
+    with c:
+        c.execute("BEGIN")
+        rows = c.execute(
+            "SELECT t.id, t.user_id, u.username, t.title, t.due FROM tasks t "
+            "JOIN users u ON u.id=t.user_id "
+            "WHERE t.due_ts>? AND t.due_ts<=? AND t.done=0 ORDER BY t.due_ts",
+            (lo, hi)).fetchall()
+        fired = {}
+        for tid, secs in c.execute(
+                "SELECT r.task_id, r.threshold FROM tasks t "
+                "JOIN reminders_fired r ON r.task_id=t.id "
+                "WHERE t.due_ts>? AND t.due_ts<=? AND t.done=0", (lo, hi)):
+            fired.setdefault(tid, set()).add(secs)
+        row = c.execute("SELECT MIN(due_ts) FROM tasks WHERE due_ts>? AND done=0",
+                        (hi,)).fetchone()
+    return rows, fired, row[0]
+
+def data_version(c=None):
+    """
+    PRAGMA data_version of this thread's connection; it changes whenever
+    another connection commits to the database file.
+    """
+    return (c or conn()).execute("PRAGMA data_version").fetchone()[0]
+
+# --- archive (archive.py runs it) ---
+ARCHIVE_BATCH = 500   # tasks moved per transaction
+HISTORY_PAGE = 100    # rows per archived_tasks() page
+
+_ARCHIVE_COLUMNS = ("id, user_id, title, due, due_ts, done, done_at, canvas_id, "
+                    "canvas_updated_at")
+
+@perf.timed("db.archive_batch")
+def archive_batch(done_before: int, due_before: int, limit=ARCHIVE_BATCH, now=None):
+    """
+    Move up to `limit` tasks - done before `done_before`, or due before
+    `due_before` - into archived_tasks in one transaction. Epoch seconds;
+    either cutoff may be None to skip that rule. Returns the number moved.
+    """
+    rules, args = [], []
+    if done_before is not None:
+        rules.append("(done=1 AND done_at<?)")
+        args.append(done_before)
+    if due_before is not None:
+        rules.append("due_ts<?")
+        args.append(due_before)
+    if not rules:
+        return 0
+    c = conn()
+    with c:
+        c.execute("BEGIN IMMEDIATE")
+        ids = [tid for (tid,) in c.execute(
+            f"SELECT id FROM tasks WHERE {' OR '.join(rules)} LIMIT ?", (*args, limit))]
+        if not ids:
+            return 0
+        marks = ",".join("?" * len(ids))
+        c.execute(
+            f"INSERT OR REPLACE INTO archived_tasks({_ARCHIVE_COLUMNS}, archived_at) "
+            f"SELECT {_ARCHIVE_COLUMNS}, ? FROM tasks WHERE id IN ({marks})",
+            (epoch(now), *ids))
+        c.execute(f"DELETE FROM tasks WHERE id IN ({marks})", ids)
+    notify.changed()
+    return len(ids)
+
+@perf.timed("db.archived_tasks")
+def archived_tasks(user_id: int, before=None, limit=HISTORY_PAGE):
+    """
+    One page of the user's archive, newest task first:
+    (id, title, due, done, done_at, archived_at) rows. Pass the last id of a
+    page as `before` for the next one.
+    """
+    with conn() as c:
+        return c.execute(
+            "SELECT id, title, due, done, done_at, archived_at FROM archived_tasks "
+            "WHERE user_id=? AND id<? ORDER BY id DESC LIMIT ?",
+            (user_id, before if before is not None else 2 ** 63 - 1, limit)
+        ).fetchall()
+
+# --- search ---
+# Queries match like the FTS5 unicode61 tokenizer: case and accents are
+# ignored and every query word must start some word of the title, so "hw 7"
+# finds "Math: HW 7" and "hom" finds "Homework". search_terms() and
+# title_matches() give the same answer in Python, which lets a caller narrow
+# results it already holds instead of querying again.
+SEARCH_PAGE = 200   # rows per search_tasks() page
+_WORD = re.compile(r"[^\W_]+")
+_fts_tables = {}    # {DB_FILE: bool} whether migration 6 could create tasks_fts
+
+def search_terms(text: str):
+    """Lower-cased, accent-free words of `text`."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return _WORD.findall("".join(ch for ch in text if not unicodedata.combining(ch)))
+
+def title_matches(terms, title: str) -> bool:
+    words = search_terms(title)
+    return all(any(w.startswith(t) for w in words) for t in terms)
+
+def refines(terms, previous) -> bool:
+    """True if every match for `terms` also matches `previous` (e.g. "hw" -> "hw 7")."""
+    return all(any(t.startswith(p) for t in terms) for p in previous)
+
+def _has_fts(c):
+    has = _fts_tables.get(DB_FILE)
+    if has is None:
+        has = _fts_tables[DB_FILE] = c.execute(
+            "SELECT 1 FROM sqlite_master WHERE name='tasks_fts'").fetchone() is not None
+    return has
+
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+@perf.timed("db.search_tasks")
+def search_tasks(user_id: int, query: str, course=None, done=None, due_range=None,
+                 after=None, limit=SEARCH_PAGE):
+    """
+    One page of the user's tasks matching `query`, as (id, title, due, done)
+    rows in list_tasks() order (done, id).
+      course     only "Course: ..." titles of that course
+      done       True / False, or None for both
+      due_range  (start, end) epoch seconds or datetimes, either may be None
+      after      (done, id) of the last row of the previous page
+    A short page (fewer than `limit` rows) is the last one.
+    """
+    terms = search_terms(query or "")
+    where, args = ["t.user_id=?"], [user_id]
+    if course:
+        where.append("t.title LIKE ? ESCAPE '\\'")
+        args.append(_like_escape(course) + ": %")
+    if done is not None:
+        where.append("t.done=?")
+        args.append(1 if done else 0)
+    if due_range is not None:
+        start, end = due_range
+        if start is not None:
+            where.append("t.due_ts>=?")
+            args.append(epoch(start))
+        if end is not None:
+            where.append("t.due_ts<?")
+            args.append(epoch(end))
+    if after is not None:
+        where.append("(t.done, t.id) > (?, ?)")
+        args.extend(after)
+    with conn() as c:
+        if terms and _has_fts(c):
+            # the FTS lookup runs once as a rowid set; rows are then walked in
+            # (done, id) order on ix_tasks_user_done_id, stopping at `limit`
+            where.append("t.id IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)")
+            args.append(" ".join(f'"{t}"*' for t in terms))
+        elif terms:  # no FTS5: substring match, looser than the word rule
+            for t in terms:
+                where.append("t.title LIKE ? ESCAPE '\\'")
+                args.append(f"%{_like_escape(t)}%")
+        return c.execute(
+            "SELECT t.id, t.title, t.due, t.done FROM tasks t "
+            f"WHERE {' AND '.join(where)} ORDER BY t.done, t.id LIMIT ?",
+            (*args, limit)
+        ).fetchall()
@@ -0,0 +1,153 @@
+# dueparse.py
+# Shared due-date parsing for the GUI, the CLI and Canvas sync.
+#
+# Every supported shape has a precompiled regex, so a string is dispatched to
+# exactly one builder instead of trying formats until one stops raising.
+# Results are memoized: the same Canvas "...Z" strings are seen over and over.
+import datetime
+import functools
+import re
+
+import perf
+
+_UTC = datetime.timezone.utc
+
+# Canvas ISO with 'Z' (UTC), e.g. "2025-12-10T07:59:00Z"
+_CANVAS_Z = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2})(?::(\d{2}))?Z"
+)
+# ISO string that carries its own offset, e.g. "2025-12-10T07:59:00-08:00"
+_ISO_OFFSET = re.compile(r"\d{4}-\d{2}-\d{2}[T ][\d:.]+(?:Z|[+-]\d{2}:?\d{2}(?::\d{2})?)")
+# Manual local formats the user might type (no timezone info)
+_YMD_HM = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2}) (\d{1,2}):(\d{1,2})")
+_YMD = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+_MDY = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})")
+_MDY_SHORT = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{2})")
+
+
+def _local_naive(aware: datetime.datetime) -> datetime.datetime:
+    # fromtimestamp() asks the C library for the local offset *at that
+    # instant*, so a December due date converts with the winter offset even
+    # when parsed in October - cached results stay right across DST changes.
+    return datetime.datetime.fromtimestamp(aware.timestamp())
+
+
+def _from_canvas_z(m):
+    y, mo, d, h, mi, sec = m.groups()
+    aware = datetime.datetime(int(y), int(mo), int(d), int(h), int(mi),
+                              int(sec or 0), tzinfo=_UTC)
+    return _local_naive(aware)
+
+
+def _from_iso_offset(m):
+    s = m.string
+    if s.endswith("Z"):
+        # fromisoformat can't handle 'Z' directly in older Python
+        s = s[:-1] + "+00:00"
+    return _local_naive(datetime.datetime.fromisoformat(s))
+
+
+def _from_ymd_hm(m):
+    y, mo, d, h, mi = map(int, m.groups())
+    return datetime.datetime(y, mo, d, h, mi)
+
+
+def _from_ymd(m):
+    y, mo, d = map(int, m.groups())
+    return datetime.datetime(y, mo, d)
+
+
+def _from_mdy(m):
+    mo, d, y = map(int, m.groups())
+    return datetime.datetime(y, mo, d)
+
+
+def _from_mdy_short(m):
+    mo, d, y = map(int, m.groups())
+    # same pivot as strptime's %y: 69-99 -> 19xx, 00-68 -> 20xx
+    return datetime.datetime(y + (1900 if y >= 69 else 2000), mo, d)
+
+
+# checked in order; the first regex that fully matches picks the builder
+_DISPATCH = (
+    (_CANVAS_Z.fullmatch, _from_canvas_z),
+    (_ISO_OFFSET.fullmatch, _from_iso_offset),
+    (_YMD_HM.fullmatch, _from_ymd_hm),
+    (_YMD.fullmatch, _from_ymd),
+    (_MDY.fullmatch, _from_mdy),
+    (_MDY_SHORT.fullmatch, _from_mdy_short),
+)
+
+
+@functools.lru_cache(maxsize=8192)
+def _parse(s: str):
+    perf.count("dueparse.parsed")   # cache misses only
+    for match, build in _DISPATCH:
+        m = match(s)
+        if m is not None:
+            try:
+                return build(m)
+            except ValueError:
+                return None  # right shape, impossible value (e.g. 02/30)
+    return None
+
+
+def parse_due(due_str: str):
+    """Best-effort parse for due date strings, converting Canvas UTC to local time.
+
+    Returns a naive local datetime, or None if the string isn't a date.
+    """
+    if not due_str:
+        return None
+    return _parse(due_str.strip())
+
+
+@functools.lru_cache(maxsize=8192)
+def _timestamp(s: str):
+    m = _CANVAS_Z.fullmatch(s)
+    if m is not None:
+        # already UTC: skip the local-time round trip
+        y, mo, d, h, mi, sec = m.groups()
+        try:
+            return int(datetime.datetime(int(y), int(mo), int(d), int(h), int(mi),
+                                         int(sec or 0), tzinfo=_UTC).timestamp())
+        except ValueError:
+            return None
+    dt = _parse(s)
+    if dt is None:
+        return None
+    return int(dt.timestamp())  # naive local time -> epoch
+
+
+def due_timestamp(due_str: str):
+    """UTC epoch seconds for a due string (None if it can't be parsed)."""
+    if not due_str:
+        return None
+    return _timestamp(due_str.strip())
+
+
+def parse_many(due_strs):
+    """parse_due() over an iterable (e.g. a whole Canvas sync) -> list.
+
+    Each distinct string is parsed once, however many times it repeats.
+    """
+    seen = {}
+    out = []
+    append = out.append
+    for s in due_strs:
+        dt = seen.get(s, seen)
+        if dt is seen:
+            dt = seen[s] = parse_due(s)
+        append(dt)
+    return out
+
+
+def timestamps_many(due_strs):
+    """due_timestamp() over an iterable -> list."""
+    return [due_timestamp(s) for s in due_strs]
+
+
+def clear_cache():
+    """Forget memoized results (call after changing the system time zone)."""
+    _parse.cache_clear()
+    _timestamp.cache_clear()
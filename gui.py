@@ -1,17 +1,31 @@
 import tkinter as tk
-from tkinter import messagebox, filedialog, colorchooser
+from tkinter import messagebox
 import datetime
+import time
+import perf
+import archive
+import notify
 from db import (
     init_db,
     create_user,
     verify_user,
-    list_tasks,
-    add_task,
-    mark_done,
-    add_task_if_not_exists,
-    delete_task,
+    close_all,
 )
-from canvas_sync import fetch_planner_items, to_local_tasks
+from db import HISTORY_PAGE, SEARCH_PAGE, search_terms, title_matches, refines
+from storage import open_storage
+from canvas_import import sync_user
+from canvas_sync import SyncCancelled
+from background import BackgroundExecutor, Cancelled
+from auth import LoginThrottled
+from task_view import TaskListView
+from toast import ToastQueue
+from scheduler import DeadlineScheduler, describe
+from dueparse import parse_due
+
+# longest single Tk timer we arm; a far-away reminder simply re-arms itself
+MAX_TIMER_MS = 6 * 3600 * 1000
+# pause after the last keystroke before the search box queries
+SEARCH_DEBOUNCE_MS = 250
 
 
 # --- Login window ---
@@ -31,31 +45,60 @@ class LoginWindow(tk.Tk):
 
         btns = tk.Frame(self)
         btns.pack(pady=12)
-        tk.Button(btns, text="Login", width=10, command=self.do_login).grid(
-            row=0, column=0, padx=5
-        )
-        tk.Button(btns, text="Register", width=10, command=self.do_register).grid(
-            row=0, column=1, padx=5
-        )
+        self.login_btn = tk.Button(btns, text="Login", width=10, command=self.do_login)
+        self.login_btn.grid(row=0, column=0, padx=5)
+        self.register_btn = tk.Button(btns, text="Register", width=10, command=self.do_register)
+        self.register_btn.grid(row=0, column=1, padx=5)
+
+        self.status = tk.Label(self, text="", font=("Arial", 9))
+        self.status.pack()
+
+        # password hashing is slow on purpose; keep it off the Tk thread
+        self.bg = BackgroundExecutor(self, max_workers=1)
+
+    def _busy(self, message):
+        state = tk.DISABLED if message else tk.NORMAL
+        self.login_btn.config(state=state)
+        self.register_btn.config(state=state)
+        self.status.config(text=message)
+
+    def _auth_error(self, e):
+        self._busy("")
+        if isinstance(e, LoginThrottled):
+            messagebox.showerror("Login failed", str(e))
+        else:
+            messagebox.showerror("Error", f"Could not reach the database:\n{e}")
 
     def do_register(self):
         user, pw = self.u.get().strip(), self.p.get()
         if not user or not pw:
             messagebox.showwarning("Missing", "Enter username and password.")
             return
-        if create_user(user, pw):
-            messagebox.showinfo("Success", "Account created. You can log in now.")
-        else:
-            messagebox.showerror("Oops", "Username already exists.")
+
+        def created(ok):
+            self._busy("")
+            if ok:
+                messagebox.showinfo("Success", "Account created. You can log in now.")
+            else:
+                messagebox.showerror("Oops", "Username already exists.")
+
+        self._busy("Creating account...")
+        self.bg.run(create_user, user, pw, on_done=created, on_error=self._auth_error)
 
     def do_login(self):
         user, pw = self.u.get().strip(), self.p.get()
-        uid = verify_user(user, pw)
-        if uid is None:
-            messagebox.showerror("Login failed", "Invalid credentials.")
-            return
-        self.destroy()
-        PlannerWindow(uid).mainloop()
+
+        def verified(uid):
+            self._busy("")
+            if uid is None:
+                messagebox.showerror("Login failed", "Invalid credentials.")
+                return
+            self.bg.shutdown()
+            self.destroy()
+            PlannerWindow(uid).mainloop()
+
+        self._busy("Checking...")
+        self.bg.run(verify_user, user, pw, on_done=verified, on_error=self._auth_error)
 
 
 # --- Planner window (per-user) ---
@@ -63,10 +106,36 @@ class PlannerWindow(tk.Tk):
     def __init__(self, user_id: int):
         super().__init__()
         self.user_id = user_id
+        # task storage (sqlite or json, from PLANNER_BACKEND)
+        self.store = open_storage(user_id)
         self.title("Homework Planner 📝")
         self.geometry("520x520")
-        # NEW: remember notifications so we don't spam
-        self.notification_state = {}  # {task_id: set([threshold_seconds, ...])}
+        # deadline events (countdown + reminders), built once from the DB
+        self.scheduler = DeadlineScheduler(self._parse_due_datetime)
+        self._reminder_timer = None
+        self._caught_up = False     # missed reminders are computed once per session
+        self.toasts = ToastQueue(self)
+        # reminders a reminder_daemon.py (--sink socket) delivers to this window,
+        # read by a Tk file handler only when one arrives; None when another
+        # planner window already holds the port, or on Windows (no file handlers)
+        self._inbox = None
+        if hasattr(self.tk, "createfilehandler"):
+            self._inbox = notify.listen(notify.GUI_PORT)
+        if self._inbox is not None:
+            self.tk.createfilehandler(self._inbox, tk.READABLE, self._read_inbox)
+        # network + DB work runs here, off the Tk thread
+        self.bg = BackgroundExecutor(self)
+        self._refresh_gen = 0
+        self._shown_gen = 0         # last refresh whose rows are on screen
+        self._sync_job = None
+        # search box: the applied query, and the cursor of its next page
+        self._search_query = ""
+        self._search_terms = []
+        self._search_after = None
+        self._search_timer = None
+        self._perf_statements = 0   # db statement count at the last tick
+        self._perf_window = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # --- background state ---
         self.bg_color = "#f0f0f0"  # default window color
@@ -92,6 +161,12 @@ class PlannerWindow(tk.Tk):
             label="Clear Background Image", command=self.clear_bg_image
         )
         menubar.add_cascade(label="Appearance", menu=appearance_menu)
+        if perf.ENABLED:
+            debug_menu = tk.Menu(menubar, tearoff=0)
+            debug_menu.add_command(label="Performance Stats...", command=self.show_perf_stats)
+            debug_menu.add_command(label="Dump Stats Now", command=perf.dump)
+            debug_menu.add_command(label="Reset Stats", command=perf.registry.reset)
+            menubar.add_cascade(label="Debug", menu=debug_menu)
         self.config(menu=menubar)
 
         # --- Clock + countdown area ---
@@ -125,17 +200,42 @@ class PlannerWindow(tk.Tk):
 
         tk.Button(self, text="Add Task", command=self.on_add).pack(pady=6)
 
-        # Canvas Sync Button
-        tk.Button(self, text="Sync from Canvas", command=self.on_sync).pack(pady=4)
+        # Canvas Sync Button (+ progress / cancel while a sync runs)
+        sync_bar = tk.Frame(self, bg=self.bg_color)
+        sync_bar.pack(pady=4)
+        self.sync_btn = tk.Button(sync_bar, text="Sync from Canvas", command=self.on_sync)
+        self.sync_btn.grid(row=0, column=0, padx=4)
+        self.cancel_sync_btn = tk.Button(
+            sync_bar, text="Cancel", command=self.on_cancel_sync, state=tk.DISABLED
+        )
+        self.cancel_sync_btn.grid(row=0, column=1, padx=4)
+        self.sync_status = tk.Label(self, text="", font=("Arial", 9), bg=self.bg_color)
+        self.sync_status.pack()
+
+        # --- Search (filters the list as you type) ---
+        search_bar = tk.Frame(self, bg=self.bg_color)
+        search_bar.pack(pady=(6, 0))
+        tk.Label(search_bar, text="Search", bg=self.bg_color).grid(row=0, column=0)
+        self.search_e = tk.Entry(search_bar, width=30)
+        self.search_e.grid(row=0, column=1, padx=6)
+        self.search_e.bind("<KeyRelease>", self._on_search_typed)
+        self.search_e.bind("<Escape>", self._clear_search)
+        self.more_btn = tk.Button(search_bar, text="More", command=self.on_more_results,
+                                  state=tk.DISABLED)
+        self.more_btn.grid(row=0, column=2)
+        self.search_status = tk.Label(self, text="", font=("Arial", 9), bg=self.bg_color)
+        self.search_status.pack()
 
         # --- List of tasks ---
-        self.listbox = tk.Listbox(self, width=60, height=16)
-        self.listbox.pack(pady=8)
+        self.task_list = TaskListView(self, width=60, height=16)
+        self.task_list.pack(pady=8)
 
         tk.Button(self, text="Mark Complete", command=self.on_done).pack(pady=4)
         tk.Button(self, text="Remove Task", command=self.on_remove).pack(pady=4)
+        tk.Button(self, text="Show History", command=self.show_history).pack(pady=4)
+        self._history_window = None
 
-        self.refresh()
+        self.refresh(reschedule=True)
         self.update_clock_and_countdown()  # start the ticking
 
     # ---------- Appearance / Background ----------
@@ -143,6 +243,8 @@ class PlannerWindow(tk.Tk):
 
     def change_bg_color(self):
         """Let the user pick a background color."""
+        from tkinter import colorchooser  # imported on first use (startup time)
+
         color = colorchooser.askcolor(initialcolor=self.bg_color)[1]
         if not color:
             return
@@ -158,6 +260,8 @@ class PlannerWindow(tk.Tk):
 
     def change_bg_image(self):
         """Let the user choose an image file as wallpaper."""
+        from tkinter import filedialog  # imported on first use (startup time)
+
         path = filedialog.askopenfilename(
             title="Choose background image",
             filetypes=[
@@ -189,53 +293,19 @@ class PlannerWindow(tk.Tk):
 
     # ---------- Clock + countdown ----------
 
+    @perf.timed("gui.tick")
     def update_clock_and_countdown(self):
-        """Update the running clock and countdown every second and fire reminders."""
+        """Update the running clock and countdown every second (no DB access)."""
         now = datetime.datetime.now()
         # Clock display (full date + time)
         self.clock_label.config(text=now.strftime("Time: %Y-%m-%d %H:%M:%S"))
 
-        # thresholds in seconds: (seconds_before_due, label)
-        thresholds = [
-            (24 * 3600, "1 day"),
-            (12 * 3600, "12 hours"),
-            (6 * 3600, "6 hours"),
-            (3 * 3600, "3 hours"),
-            (1 * 3600, "1 hour"),
-        ]
-
-        # Find closest upcoming due date for countdown
-        rows = list_tasks(self.user_id)
-
-        next_task_title = None
-        next_due_dt = None
-
-        for tid, title, due, done in rows:
-            if done:
-                continue
-            if not due or due.lower() == "no due date":
-                continue
-
-            dt = self._parse_due_datetime(due)
-            if dt is None:
-                continue
-
-            delta = dt - now
-            seconds_left = int(delta.total_seconds())
-            if seconds_left <= 0:
-                continue  # already past
-
-            # 1) Use this for the "closest due" countdown
-            if next_due_dt is None or dt < next_due_dt:
-                next_due_dt = dt
-                next_task_title = title
-
-            # 2) Check if we should pop a reminder for this task
-            self._check_notifications_for_task(tid, title, dt, seconds_left, thresholds)
-
-        if next_due_dt is None:
+        # Closest upcoming due date is the top of the scheduler's heap
+        nxt = self.scheduler.next_due(now)
+        if nxt is None:
             self.countdown_label.config(text="Next due: (no upcoming tasks)")
         else:
+            _tid, next_task_title, next_due_dt = nxt
             delta = next_due_dt - now
             total_seconds = int(delta.total_seconds())
             days = total_seconds // (24 * 3600)
@@ -248,71 +318,182 @@ class PlannerWindow(tk.Tk):
                 text=f"Next due: {next_task_title} in {days}d {hours:02}h {minutes:02}m {seconds:02}s"
             )
 
-        # schedule this function again in 1000 ms
-        self.after(1000, self.update_clock_and_countdown)
+        if perf.ENABLED:
+            n = perf.registry.counter("db.statements")
+            perf.observe("gui.db_statements_per_tick", n - self._perf_statements)
+            self._perf_statements = n
+
+        # schedule this function again on the next second boundary
+        self.after(1000 - now.microsecond // 1000, self.update_clock_and_countdown)
+
+    def _arm_reminder_timer(self):
+        """(Re)arm a single Tk timer for the exact time of the next reminder."""
+        if self._reminder_timer is not None:
+            self.after_cancel(self._reminder_timer)
+            self._reminder_timer = None
 
-    def _check_notifications_for_task(self, tid, title, due_dt, seconds_left, thresholds):
+        fire_dt = self.scheduler.next_event_time()
+        if fire_dt is None:
+            return
+        delay = (fire_dt - datetime.datetime.now()).total_seconds()
+        delay_ms = min(max(0, int(delay * 1000)), MAX_TIMER_MS)
+        self._reminder_timer = self.after(delay_ms, self._fire_reminders)
+
+    def _fire_reminders(self):
         """
-        Show a reminder popup when a task is around 1d / 12h / 6h / 3h / 1h left.
-        Each threshold fires only once per task.
+        Toast a reminder when a task is around 1d / 12h / 6h / 3h / 1h left.
+        Each threshold fires only once per task (persisted across restarts);
+        reminders that come due together are shown as one digest.
+        A threshold is recorded before it is shown, and only the ones this
+        window recorded first are shown: a reminder_daemon.py watching the
+        same database may have delivered the others already.
         """
-        fired = self.notification_state.setdefault(tid, set())
-
-        for secs, label in thresholds:
-            # "Window" of about 1 minute around the threshold
-            if secs - 60 <= seconds_left <= secs + 60 and secs not in fired:
-                fired.add(secs)
-                messagebox.showinfo(
-                    "Deadline reminder",
-                    f'"{title}" is due in about {label}.\n'
-                    f"Due at: {due_dt.strftime('%Y-%m-%d %H:%M')}",
-                )
+        self._reminder_timer = None
+        events = self.scheduler.pop_due_events()
+        fired = self.scheduler.take_fired()
+        if fired:
+            def recorded(new):
+                new_tids = {tid for tid, _secs in new}
+                self._show_reminders([describe(title, due_dt, label)
+                                      for tid, title, due_dt, label in events
+                                      if tid in new_tids])
+
+            self.bg.run(self.store.record_reminders, fired, on_done=recorded,
+                        on_error=self._on_db_error)
+        self._arm_reminder_timer()
+
+    def _read_inbox(self, _sock, _mask):
+        """Show the daemon's reminders for this user, answering each message."""
+        for msg, sender in notify.receive(self._inbox):
+            mine = msg.get("user_id") == self.user_id
+            if mine:
+                self._show_reminders(msg.get("lines") or [])
+            notify.reply(self._inbox, msg, sender, mine)
+
+    def _show_reminders(self, lines):
+        if len(lines) == 1:
+            self.toasts.push("Deadline reminder", lines)
+        elif lines:
+            self.toasts.push(f"{len(lines)} deadlines coming up", lines)
+
+    def _save_fired(self):
+        """Persist the thresholds the scheduler marked fired, off the Tk thread."""
+        fired = self.scheduler.take_fired()
+        if fired:
+            self.bg.run(self.store.record_reminders, fired, on_error=self._on_db_error)
 
     def _parse_due_datetime(self, due_str: str):
         """Best-effort parse for due date strings, converting Canvas UTC to local time."""
-        s = due_str.strip()
-
-        # Local timezone (whatever your OS is set to, e.g. PST/PDT)
-        local_tz = datetime.datetime.now().astimezone().tzinfo
-
-        # Case 1: Canvas ISO with 'Z' (UTC), e.g. "2025-12-10T07:59:00Z"
-        if s.endswith("Z"):
-            try:
-                # fromisoformat can't handle 'Z' directly in older Python,
-                # so replace it with +00:00 (UTC)
-                aware_utc = datetime.datetime.fromisoformat(s.replace("Z", "+00:00"))
-                local_dt = aware_utc.astimezone(local_tz)
-                # Return naive local datetime (no tzinfo) so we can compare
-                return local_dt.replace(tzinfo=None)
-            except Exception:
-                pass
-
-        # Case 2: string already has an offset like "+00:00" or "-08:00"
-        # fromisoformat will give us an aware datetime; convert to local
-        try:
-            dt = datetime.datetime.fromisoformat(s)
-            if dt.tzinfo is not None:
-                local_dt = dt.astimezone(local_tz)
-                return local_dt.replace(tzinfo=None)
-        except Exception:
-            pass
-
-        # Case 3: Manual local formats the user might type (no timezone info)
-        for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y"):
-            try:
-                return datetime.datetime.strptime(s, fmt)
-            except Exception:
-                continue
-
-        return None
+        return parse_due(due_str)
+
     # ---------- Task management ----------
 
-    def refresh(self):
-        self.listbox.delete(0, tk.END)
-        rows = list_tasks(self.user_id)
-        for tid, title, due, done in rows:
-            status = "✅" if done else "⏳"
-            self.listbox.insert(tk.END, f"[{tid}] {title} (Due: {due}) {status}")
+    def refresh(self, reschedule=False):
+        """Reload rows on a worker; the task list (and scheduler) update when they arrive."""
+        self._refresh_gen += 1
+        gen = self._refresh_gen
+        started = time.perf_counter()
+        store, query, searching = self.store, self._search_query, bool(self._search_terms)
+
+        def load():
+            # while searching the list shows the first page of matches; the
+            # scheduler still needs every task (and the persisted reminders)
+            rows = store.list() if reschedule or not searching else None
+            found = store.search(query) if searching else None
+            return rows, found, store.fired_reminders() if reschedule else None
+
+        self.bg.run(
+            load,
+            on_done=lambda res: self._show_rows(*res, gen, reschedule, started),
+            on_error=self._on_db_error,
+        )
+
+    def _show_rows(self, rows, found, fired, gen, reschedule, started):
+        if gen != self._refresh_gen:
+            return  # a newer refresh is on its way
+        self._shown_gen = gen
+        with perf.span("gui.render"):
+            # applies only the differences
+            self.task_list.set_rows(rows if found is None else found)
+        self._search_page_loaded(found)
+        if reschedule:
+            # the first load of a session catches up on reminders missed
+            # while the app was closed; they fire at once, as one digest
+            self.scheduler.load(rows, fired=fired, catch_up=not self._caught_up)
+            self._caught_up = True
+            self._save_fired()
+            self._arm_reminder_timer()
+        perf.observe("gui.refresh", (time.perf_counter() - started) * 1000)
+
+    # ---------- Search ----------
+
+    def _on_search_typed(self, _event=None):
+        """Debounce: query once typing pauses for SEARCH_DEBOUNCE_MS."""
+        if self._search_timer is not None:
+            self.after_cancel(self._search_timer)
+        self._search_timer = self.after(SEARCH_DEBOUNCE_MS, self._apply_search)
+
+    def _clear_search(self, _event=None):
+        self.search_e.delete(0, tk.END)
+        self._on_search_typed()
+
+    def _apply_search(self):
+        self._search_timer = None
+        query = self.search_e.get().strip()
+        terms = search_terms(query)
+        previous = self._search_terms
+        self._search_query = query
+        if terms == previous:
+            return  # only spacing or punctuation changed
+        self._search_terms = terms
+        if (terms and previous and refines(terms, previous) and self._search_after is None
+                and self._shown_gen == self._refresh_gen):
+            # the query only got narrower and every match of the old one is
+            # on screen: filter those rows instead of asking the database
+            with perf.span("gui.search_local"):
+                self.task_list.set_rows(
+                    [r for r in self.task_list.rows() if title_matches(terms, r[1])])
+            self._show_search_status(more=False)
+            return
+        self.refresh()
+
+    def _search_page_loaded(self, found):
+        """Remember where the next page starts; None when it was the last one."""
+        if found is not None and len(found) == SEARCH_PAGE:
+            self._search_after = (found[-1][3], found[-1][0])
+        else:
+            self._search_after = None
+        self._show_search_status(more=self._search_after is not None)
+
+    def _show_search_status(self, more):
+        if not self._search_terms:
+            text = ""
+        elif more:
+            text = f"{len(self.task_list)}+ matches"
+        else:
+            text = f"{len(self.task_list) or 'No'} match{'' if len(self.task_list) == 1 else 'es'}"
+        self.search_status.config(text=text)
+        self.more_btn.config(state=tk.NORMAL if more else tk.DISABLED)
+
+    def on_more_results(self):
+        """Append the next page of search results."""
+        if self._search_after is None:
+            return
+        gen, store = self._refresh_gen, self.store
+        query, after = self._search_query, self._search_after
+        self.more_btn.config(state=tk.DISABLED)
+
+        def loaded(found):
+            if gen != self._refresh_gen:
+                return
+            self.task_list.extend(found)
+            self._search_page_loaded(found)
+
+        self.bg.run(lambda: store.search(query, after=after),
+                    on_done=loaded, on_error=self._on_db_error)
+
+    def _on_db_error(self, e):
+        messagebox.showerror("Database Error", f"Could not update tasks:\n{e}")
 
     def on_add(self):
         title = self.task_e.get().strip()
@@ -320,75 +501,209 @@ class PlannerWindow(tk.Tk):
         if not title or not due:
             messagebox.showwarning("Missing", "Please enter both Task and Due.")
             return
-        add_task(self.user_id, title, due)
         self.task_e.delete(0, tk.END)
         self.due_e.delete(0, tk.END)
-        self.refresh()
+
+        def added(result):
+            tid, created = result
+            if not created:
+                # the existing task is already listed and, unless it is done,
+                # already scheduled; re-adding it would revive a done one
+                messagebox.showinfo("Already added", f'"{title}" due {due} is already in your list.')
+                return
+            if title_matches(self._search_terms, title):
+                self.task_list.upsert(tid, title, due, 0)
+            self.scheduler.add(tid, title, due)
+            self._save_fired()
+            self._arm_reminder_timer()
+
+        self.bg.run(self.store.add, title, due,
+                    on_done=added, on_error=self._on_db_error)
+
+    def _selected_task(self, empty_message):
+        tid = self.task_list.selected_id()
+        if tid is None:
+            messagebox.showinfo("Info", empty_message)
+        return tid
+
+    def _task_gone(self, tid):
+        """A task was removed: drop its row and its reminder events."""
+        self.task_list.remove(tid)
+        self.scheduler.remove(tid)
+        self._arm_reminder_timer()
 
     def on_done(self):
-        sel = self.listbox.curselection()
-        if not sel:
-            messagebox.showinfo("Info", "Select a task first.")
+        tid = self._selected_task("Select a task first.")
+        if tid is None:
             return
 
-        line = self.listbox.get(sel[0])
-        try:
-            tid = int(line.split("]")[0].strip("["))
-        except Exception:
-            messagebox.showerror("Error", "Could not parse task id.")
-            return
+        def completed(_):
+            self.task_list.update(tid, done=1)
+            self.scheduler.remove(tid)
+            self._arm_reminder_timer()
 
-        mark_done(self.user_id, tid)
-        self.refresh()
+        self.bg.run(self.store.complete, tid,
+                    on_done=completed, on_error=self._on_db_error)
 
     def on_remove(self):
         """Remove the selected task permanently."""
-        sel = self.listbox.curselection()
-        if not sel:
-            messagebox.showinfo("Info", "Select a task to remove.")
-            return
-
-        line = self.listbox.get(sel[0])
-        try:
-            tid = int(line.split("]")[0].strip("["))
-        except Exception:
-            messagebox.showerror("Error", "Could not parse task id.")
+        tid = self._selected_task("Select a task to remove.")
+        if tid is None:
             return
 
+        title, due, done = self.task_list.get(tid)
         confirm = messagebox.askyesno(
             "Confirm Delete",
-            f"Are you sure you want to delete this task?\n\n{line}"
+            f"Are you sure you want to delete this task?\n\n{title} (Due: {due})"
         )
         if confirm:
-            delete_task(self.user_id, tid)
-            self.refresh()
+            self.bg.run(self.store.delete, tid,
+                        on_done=lambda _: self._task_gone(tid), on_error=self._on_db_error)
+
+    # ---------- Canvas sync (background) ----------
 
     def on_sync(self):
-        """Sync tasks from Canvas into this user's task list."""
-        try:
-            items = fetch_planner_items()
-            canvas_tasks = to_local_tasks(items)
-
-            imported = 0
-            for t in canvas_tasks:
-                course = t.get("course") or ""
-                base_title = t.get("task") or "Untitled"
-                title = f"{course}: {base_title}" if course else base_title
-                due = t.get("due") or "No due date"
-
-                add_task_if_not_exists(self.user_id, title, due)
-                imported += 1
-
-            self.refresh()
-            messagebox.showinfo(
-                "Canvas Sync", f"Imported/updated about {imported} Canvas items."
-            )
-        except Exception as e:
-            messagebox.showerror(
-                "Canvas Sync Error", f"Could not sync from Canvas:\n{e}"
-            )
+        """Sync tasks from Canvas into this user's task list, on a worker thread."""
+        if self._sync_job is not None:
+            return
+        self.sync_btn.config(state=tk.DISABLED)
+        self.cancel_sync_btn.config(state=tk.NORMAL)
+        self.sync_status.config(text="Starting sync...")
+        uid, store = self.user_id, self.store
+        self._sync_job = self.bg.start_job(
+            lambda job: sync_user(uid, store=store, cancel=job.cancel_event,
+                                  progress=job.progress),
+            on_done=self._on_sync_done,
+            on_error=self._on_sync_error,
+            on_progress=lambda message: self.sync_status.config(text=message),
+        )
 
+    def on_cancel_sync(self):
+        if self._sync_job is not None:
+            self._sync_job.cancel()
+            self.sync_status.config(text="Cancelling...")
+
+    def _sync_finished(self, status):
+        self._sync_job = None
+        self.sync_btn.config(state=tk.NORMAL)
+        self.cancel_sync_btn.config(state=tk.DISABLED)
+        self.sync_status.config(text=status)
+
+    def _on_sync_done(self, counts):
+        self._sync_finished("Last sync: " + datetime.datetime.now().strftime("%H:%M:%S"))
+        self.refresh(reschedule=True)
+        messagebox.showinfo(
+            "Canvas Sync",
+            f"Imported {counts['inserted']} new, updated {counts['updated']}, "
+            f"{counts['unchanged']} unchanged Canvas items.",
+        )
 
-if __name__ == "__main__":
+    def _on_sync_error(self, e):
+        if isinstance(e, (SyncCancelled, Cancelled)):
+            self._sync_finished("Sync cancelled.")
+            return
+        self._sync_finished("Sync failed.")
+        messagebox.showerror(
+            "Canvas Sync Error", f"Could not sync from Canvas:\n{e}"
+        )
+
+    # ---------- History (archived tasks) ----------
+
+    def show_history(self):
+        """Page through tasks archive.py moved out of the list, newest first."""
+        if self._history_window is not None:
+            self._history_window.lift()
+            return
+        win = self._history_window = tk.Toplevel(self)
+        win.title("Task History")
+        frame = tk.Frame(win)
+        frame.pack(fill=tk.BOTH, expand=True, padx=6, pady=6)
+        lb = tk.Listbox(frame, width=70, height=20, activestyle="none")
+        lb.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        bar = tk.Scrollbar(frame, orient=tk.VERTICAL, command=lb.yview)
+        bar.pack(side=tk.RIGHT, fill=tk.Y)
+        lb.config(yscrollcommand=bar.set)
+        more = tk.Button(win, text="Load More", state=tk.DISABLED)
+        more.pack(pady=4)
+        store = self.store
+        state = {"before": None}
+
+        def loaded(rows):
+            if self._history_window is not win:
+                return
+            for _tid, title, due, done, done_at, _archived_at in rows:
+                if not done:
+                    status = "not completed"
+                elif done_at:
+                    status = datetime.datetime.fromtimestamp(done_at).strftime("done %Y-%m-%d")
+                else:
+                    status = "done"
+                lb.insert(tk.END, f"{title} (Due: {due}) - {status}")
+            if rows:
+                state["before"] = rows[-1][0]
+            elif lb.size() == 0:
+                lb.insert(tk.END, "No archived tasks yet.")
+            more.config(state=tk.NORMAL if len(rows) == HISTORY_PAGE else tk.DISABLED)
+
+        def load_page():
+            more.config(state=tk.DISABLED)
+            self.bg.run(store.history, state["before"], on_done=loaded,
+                        on_error=self._on_db_error)
+
+        def closed():
+            self._history_window = None
+            win.destroy()
+
+        more.config(command=load_page)
+        win.protocol("WM_DELETE_WINDOW", closed)
+        load_page()
+
+    # ---------- Debug ----------
+
+    def show_perf_stats(self):
+        """Live view of perf timers and counters (only with PLANNER_PERF=1)."""
+        if self._perf_window is not None:
+            self._perf_window.lift()
+            return
+        win = self._perf_window = tk.Toplevel(self)
+        win.title("Performance Stats")
+        text = tk.Text(win, width=76, height=24, font=("Courier", 9))
+        text.pack(fill=tk.BOTH, expand=True)
+
+        def update():
+            if self._perf_window is not win:
+                return
+            text.delete("1.0", tk.END)
+            text.insert(tk.END, perf.format_report())
+            win.after(1000, update)
+
+        def closed():
+            self._perf_window = None
+            win.destroy()
+
+        win.protocol("WM_DELETE_WINDOW", closed)
+        update()
+
+    def on_close(self):
+        self.toasts.clear()
+        if self._inbox is not None:
+            self.tk.deletefilehandler(self._inbox)
+            self._inbox.close()
+        self.bg.shutdown()
+        self.store.close()
+        self.destroy()
+
+
+def main():
+    # paint the login window first; the (usually no-op) schema check follows
+    app = LoginWindow()
+    app.update()
     init_db()
-    LoginWindow().mainloop()
+    archive.start()    # moves old finished tasks out of the list, in the background
+    perf.start_dump()  # no-op unless PLANNER_PERF=1
+    app.mainloop()
+    close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+# jsonl_store.py
+# Append-only JSON-lines task store for the CLI (planner.py / main.py).
+#
+# Every change is one appended line, so a write costs the same no matter how
+# much history there is:
+#   {"op": "add", "id": 3, "task": "Essay", "due": "10/10", "due_ts": null}
+#   {"op": "done", "id": 3}
+#   {"op": "update", "id": 3, "due": "10/12", "due_ts": null}
+#   {"op": "delete", "id": 3}
+# A torn last line (crash mid-append) is simply ignored on read. When the log
+# holds many more lines than live tasks it is compacted into a snapshot (one
+# "add" line per task, with "done" folded in), written to a temp file and
+# atomically renamed over the log.
+import json
+import os
+import tempfile
+
+from dueparse import due_timestamp
+
+LOG_FILE = "tasks.jsonl"
+LEGACY_FILE = "data.json"
+
+
+def _fsync_dir(path):
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class TaskLog:
+    COMPACT_RATIO = 2.0   # compact when lines > ratio * live tasks ...
+    COMPACT_MIN = 256     # ... and there are at least this many lines
+
+    def __init__(self, path=LOG_FILE, legacy_path=LEGACY_FILE):
+        self.path = path
+        if not os.path.exists(path) and legacy_path and os.path.exists(legacy_path):
+            import_legacy(legacy_path, path)
+        self._repair_tail()
+        self._lines = 0
+        self._live = 0
+        self._next_id = 1
+        for rec in _records(path):   # one streaming pass for the counters
+            self._lines += 1
+            if rec["op"] == "add":
+                self._live += 1
+                self._next_id = max(self._next_id, rec["id"] + 1)
+            elif rec["op"] == "delete":
+                self._live -= 1
+
+    def _repair_tail(self):
+        """End a torn last line so the next append starts on a fresh line."""
+        try:
+            with open(self.path, "rb+") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    return
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+        except FileNotFoundError:
+            pass
+
+    # ---------- reading ----------
+
+    def iter_tasks(self):
+        """
+        Lazily yield tasks in insertion order:
+          {"id", "task", "due", "due_ts", "done"} (+ any extra stored fields)
+        Only the changes made since the last compaction are held in memory.
+        """
+        return iter_log(self.path)
+
+    # ---------- writing ----------
+
+    def _append(self, *recs):
+        """Append records with a single write + fsync."""
+        if not recs:
+            return
+        data = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in recs)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._lines += len(recs)
+
+    def new_record(self, task, due, **extra):
+        """Build (but don't write) an "add" record with a fresh id."""
+        rec = {"op": "add", "id": self._next_id, "task": task, "due": due,
+               "due_ts": due_timestamp(due), **extra}
+        self._next_id += 1
+        return rec
+
+    def write(self, recs):
+        """Append a batch of records built with new_record()/update ops at once."""
+        recs = list(recs)
+        self._append(*recs)
+        self._live += sum(1 for r in recs if r["op"] == "add")
+        self._live -= sum(1 for r in recs if r["op"] == "delete")
+        self.maybe_compact()
+
+    def add(self, task, due, **extra):
+        """Append a new task and return its id."""
+        rec = self.new_record(task, due, **extra)
+        self.write([rec])
+        return rec["id"]
+
+    def mark_done(self, task_id):
+        self.write([{"op": "done", "id": task_id}])
+
+    def update(self, task_id, **fields):
+        if "due" in fields:
+            fields["due_ts"] = due_timestamp(fields["due"])
+        self.write([{"op": "update", "id": task_id, **fields}])
+
+    def delete(self, task_id):
+        self.write([{"op": "delete", "id": task_id}])
+
+    def maybe_compact(self):
+        if self._lines >= self.COMPACT_MIN and self._lines > self.COMPACT_RATIO * self._live:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the log as a snapshot, atomically (temp file + rename)."""
+        n = write_snapshot(self.path, self.iter_tasks())
+        self._lines = self._live = n
+
+
+def _records(path):
+    """Stream decoded log lines, skipping blank or torn ones."""
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn write from a crash
+            if isinstance(rec, dict) and "op" in rec and "id" in rec:
+                yield rec
+
+
+def iter_log(path):
+    """The tasks of the log at `path`, read-only (see TaskLog.iter_tasks)."""
+    done_ids, deleted, updates = set(), set(), {}
+    for rec in _records(path):
+        op = rec["op"]
+        if op == "done":
+            done_ids.add(rec["id"])
+        elif op == "delete":
+            deleted.add(rec["id"])
+        elif op == "update":
+            fields = dict(rec)
+            del fields["op"]
+            updates.setdefault(rec["id"], {}).update(fields)
+    for rec in _records(path):
+        if rec["op"] != "add" or rec["id"] in deleted:
+            continue
+        t = {"task": "", "due": "", "due_ts": None}
+        t.update(rec)
+        del t["op"]
+        t.update(updates.get(rec["id"], ()))
+        t["done"] = bool(t.get("done")) or rec["id"] in done_ids
+        yield t
+
+
+def read_tasks(path=LOG_FILE, legacy_path=LEGACY_FILE):
+    """
+    Tasks of the log at `path`, or of the old data.json when there is no log
+    yet, without writing anything: no legacy import, no tail repair.
+    """
+    if os.path.exists(path) or not legacy_path:
+        return iter_log(path)
+    return read_legacy(legacy_path)
+
+
+def write_snapshot(path, tasks):
+    """Atomically replace `path` with one "add" line per task; returns the count."""
+    d = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".tasks-", suffix=".tmp", dir=d)
+    n = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for t in tasks:
+                rec = {"op": "add"}
+                rec.update((k, v) for k, v in t.items() if v is not None)
+                rec.setdefault("due_ts", None)
+                if not rec.get("done"):
+                    rec.pop("done", None)
+                f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+                n += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return n
+
+
+def read_legacy(json_path=LEGACY_FILE):
+    """Tasks of the old data.json list format, shaped like iter_log() ones."""
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        old = json.loads(content) if content else []
+    except (FileNotFoundError, json.JSONDecodeError):
+        old = []
+    tid = 0
+    for t in old:
+        if not isinstance(t, dict) or not t.get("task"):
+            continue  # skip empty placeholder entries
+        tid += 1
+        due = t.get("due", "")
+        yield {"id": tid, "task": t["task"], "due": due,
+               "due_ts": t.get("due_ts", due_timestamp(due)),
+               "done": bool(t.get("done"))}
+
+
+def import_legacy(json_path=LEGACY_FILE, log_path=LOG_FILE):
+    """
+    One-shot import of the old data.json list format into a fresh log.
+    The JSON file is left untouched. Returns the number of tasks imported.
+    """
+    return write_snapshot(log_path, read_legacy(json_path))
@@ -0,0 +1,129 @@
+# notify.py
+# Best-effort local IPC over UDP on 127.0.0.1:
+#   - "tasks changed" pings from db.py writes, so reminder_daemon.py wakes up
+#     at once instead of at its next PRAGMA data_version check;
+#   - reminder messages from the daemon to a running GUI (its "socket" sink),
+#     which answers each one, so the daemon knows whether it was shown.
+#
+#   PLANNER_NOTIFY=1           send a ping after each task write (off by default)
+#   PLANNER_NOTIFY_PORT=47631  port the daemon listens on for pings
+#   PLANNER_GUI_PORT=47632     port a GUI listens on for reminders
+#
+# Datagrams that nobody receives are simply dropped. A message that doesn't
+# fit in one datagram is refused (and logged) rather than cut short.
+import itertools
+import json
+import logging
+import os
+import socket
+import time
+
+ENABLED = os.getenv("PLANNER_NOTIFY", "") not in ("", "0")
+HOST = "127.0.0.1"
+PORT = int(os.getenv("PLANNER_NOTIFY_PORT", "47631"))
+GUI_PORT = int(os.getenv("PLANNER_GUI_PORT", "47632"))
+MAX_DATAGRAM = 60000
+ACK_TIMEOUT = 1.0      # seconds deliver() waits for the listener's answer
+
+log = logging.getLogger("planner.notify")
+_sock = None
+_ids = itertools.count(1)
+
+
+def _sender():
+    global _sock
+    if _sock is None:
+        _sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    return _sock
+
+
+def _encode(obj):
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def fits(obj):
+    """True if `obj` can be sent with deliver() as one datagram."""
+    return len(_encode(obj)) + 32 <= MAX_DATAGRAM   # room for deliver()'s "id"
+
+
+def deliver(obj, port, timeout=ACK_TIMEOUT):
+    """
+    Send one JSON message and wait for the listener's answer (see reply()).
+    True only if a listener took it; False if nobody is listening, it said
+    no, it didn't answer in time, or the message is too big to send.
+    """
+    msg_id = next(_ids)
+    data = _encode({**obj, "id": msg_id})
+    if len(data) > MAX_DATAGRAM:
+        log.warning("not delivering a %d byte message to port %d (limit %d)",
+                    len(data), port, MAX_DATAGRAM)
+        return False
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect((HOST, port))   # so a closed port fails the recv at once
+        s.send(data)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            s.settimeout(remaining)
+            try:
+                answer = json.loads(s.recv(MAX_DATAGRAM))
+            except ValueError:
+                continue
+            if isinstance(answer, dict) and answer.get("id") == msg_id:
+                return bool(answer.get("ok"))
+    except OSError:   # refused (nobody listening) or timed out
+        return False
+    finally:
+        s.close()
+
+
+def changed():
+    """Tell a listening daemon that tasks were written (no-op unless enabled)."""
+    if ENABLED:
+        try:
+            _sender().sendto(b"{}", (HOST, PORT))
+        except OSError:
+            pass
+
+
+def listen(port):
+    """Non-blocking UDP socket bound to a local port, or None if it is taken."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.bind((HOST, port))
+    except OSError:
+        s.close()
+        return None
+    s.setblocking(False)
+    return s
+
+
+def receive(sock):
+    """
+    Every message waiting on a listen() socket, as (message, sender) pairs
+    (undecodable ones skipped).
+    """
+    out = []
+    while True:
+        try:
+            data, sender = sock.recvfrom(MAX_DATAGRAM)
+        except OSError:
+            return out
+        try:
+            msg = json.loads(data)
+        except ValueError:
+            continue
+        if isinstance(msg, dict):
+            out.append((msg, sender))
+
+
+def reply(sock, msg, sender, ok):
+    """Answer a message sent with deliver(): ok=True if it was taken."""
+    if "id" in msg:
+        try:
+            sock.sendto(_encode({"id": msg["id"], "ok": ok}), sender)
+        except OSError:
+            pass
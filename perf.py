@@ -0,0 +1,197 @@
+# perf.py
+# Opt-in hot-path instrumentation: timers with p50/p95/p99, plain counters,
+# and a periodic JSON-lines dump for offline analysis.
+#
+#   PLANNER_PERF=1              turn it on (off by default)
+#   PLANNER_PERF_LOG=perf.jsonl where start_dump() appends snapshots
+#   PLANNER_PERF_INTERVAL=60    seconds between snapshots
+#
+# Switched off, @timed returns the function itself, span() hands back one
+# shared no-op context manager and count()/observe() return immediately, so
+# instrumented code runs at its normal speed.
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+ENABLED = os.getenv("PLANNER_PERF", "") not in ("", "0")
+LOG_FILE = os.getenv("PLANNER_PERF_LOG", "perf.jsonl")
+DUMP_INTERVAL = float(os.getenv("PLANNER_PERF_INTERVAL", "60"))
+WINDOW = 4096   # samples kept per histogram for the percentiles
+
+
+class Histogram:
+    """count/total/max over all samples; percentiles over the last WINDOW."""
+
+    __slots__ = ("count", "total", "max", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=WINDOW)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.recent.append(value)
+
+    def summary(self):
+        s = sorted(self.recent)
+
+        def pct(p):
+            return s[min(len(s) - 1, int(p / 100 * len(s)))] if s else 0.0
+
+        return {"count": self.count, "total": round(self.total, 3),
+                "mean": round(self.total / self.count, 3) if self.count else 0.0,
+                "p50": round(pct(50), 3), "p95": round(pct(95), 3),
+                "p99": round(pct(99), 3), "max": round(self.max, 3)}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}   # {name: Histogram}
+        self.counters = {}     # {name: int}
+
+    def observe(self, name, value):
+        with self._lock:
+            h = self.histograms.get(name)
+            if h is None:
+                h = self.histograms[name] = Histogram()
+            h.add(value)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def counter(self, name):
+        return self.counters.get(name, 0)
+
+    def snapshot(self):
+        """{"histograms": {name: summary}, "counters": {name: n}}"""
+        with self._lock:
+            return {"histograms": {k: h.summary() for k, h in sorted(self.histograms.items())},
+                    "counters": dict(sorted(self.counters.items()))}
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+
+registry = Registry()
+
+
+# ---------- recording API ----------
+
+def timed(name=None):
+    """Decorator: record each call's wall time (ms) under `name`."""
+    def deco(fn):
+        if not ENABLED:
+            return fn
+        label = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                registry.observe(label, (time.perf_counter() - t0) * 1000)
+        return wrapper
+    return deco
+
+
+class _Span:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        registry.observe(self.name, (time.perf_counter() - self.t0) * 1000)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Context manager timing a block (ms) under `name`."""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def count(name, n=1):
+    if ENABLED:
+        registry.incr(name, n)
+
+
+def observe(name, value):
+    """Record a non-time sample, e.g. queries per tick."""
+    if ENABLED:
+        registry.observe(name, value)
+
+
+# ---------- reporting ----------
+
+def format_report(snap=None):
+    """Human-readable table of a snapshot (for the debug window)."""
+    snap = snap or registry.snapshot()
+    lines = [f"{'timer / sample':<36}{'count':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"]
+    for name, h in snap["histograms"].items():
+        lines.append(f"{name:<36}{h['count']:>8}{h['p50']:>9.2f}{h['p95']:>9.2f}"
+                     f"{h['p99']:>9.2f}{h['max']:>9.2f}")
+    if snap["counters"]:
+        lines += ["", f"{'counter':<36}{'value':>8}"]
+        lines += [f"{name:<36}{n:>8}" for name, n in snap["counters"].items()]
+    lines += ["", "times in ms"]
+    return "\n".join(lines)
+
+
+def dump(path=None):
+    """Append one timestamped snapshot line to the JSON-lines log."""
+    if not ENABLED:
+        return
+    rec = {"ts": time.time(), "pid": os.getpid(), **registry.snapshot()}
+    with open(path or LOG_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(rec, separators=(",", ":")) + "\n")
+
+
+_dumper = None
+
+
+def start_dump(path=None, interval=None):
+    """Dump every `interval` seconds on a daemon thread, and once at exit."""
+    global _dumper
+    if not ENABLED or _dumper is not None:
+        return
+    interval = interval or DUMP_INTERVAL
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            dump(path)
+
+    _dumper = threading.Thread(target=loop, name="planner-perf-dump", daemon=True)
+    _dumper.start()
+    atexit.register(lambda: (stop.set(), dump(path)))
@@ -1,41 +1,43 @@
-import json
-FILE = "data.json"
+import itertools
+from jsonl_store import LEGACY_FILE
+from storage import open_storage
+FILE = LEGACY_FILE  # old whole-file format; imported by the storage on first run
 
-def load_data():
-    try:
-        with open(FILE, "r") as f:
-            content = f.read().strip()
-            if not content:
-                return []  # handle empty file
-            return json.loads(content)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
+_store = None
+
+def store():
+    """The CLI's task storage (backend from PLANNER_BACKEND), opened on first use."""
+    global _store
+    if _store is None:
+        _store = open_storage()
+    return _store
 
-def save_data(tasks):
-    with open(FILE, "w") as f:
-        json.dump(tasks, f, indent=2)
+def load_data():
+    """All tasks as a list of dicts (prefer store().iter_rows(), which streams)."""
+    return [{"id": tid, "task": title, "due": due, "done": bool(done)}
+            for tid, title, due, done in store().iter_rows()]
 
 def add_task():
     task = input("Enter your homework: ")
     due = input("Due date (e.g. 10/10): ")
-    tasks = load_data()
-    tasks.append({"task": task, "due": due, "done": False})
-    save_data(tasks)
-    print("Task added!")
+    _tid, created = store().add(task, due)
+    print("Task added!" if created else "That task is already in your list.")
 
 def view_tasks():
-    tasks = load_data()
-    if not tasks:
+    empty = True
+    for i, (_tid, title, due, done) in enumerate(store().iter_rows()):
+        empty = False
+        status = "Done" if done else "Pending"
+        print(f"{i+1}. {title} (Due: {due}) {status}")
+    if empty:
         print("No tasks yet!")
-        return
-    for i, t in enumerate(tasks):
-        status = "Done" if t["done"] else "Pending"
-        print(f"{i+1}. {t['task']} (Due: {t['due']}) {status}")
 
 def mark_complete():
     view_tasks()
-    tasks = load_data()
     num = int(input("Enter task number to mark complete: "))
-    tasks[num-1]["done"] = True
-    save_data(tasks)
+    row = next(itertools.islice(store().iter_rows(), num - 1, None), None) if num > 0 else None
+    if row is None:
+        print("No such task.")
+        return
+    store().complete(row[0])
     print("Task completed!")
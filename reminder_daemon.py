@@ -0,0 +1,283 @@
+# reminder_daemon.py
+# Deadline reminders for every user of planner.db, without a Tk window.
+#
+#   python reminder_daemon.py [--sink stdout] [--sink log:FILE] [--sink socket[:PORT]]
+#                             [--poll SECONDS] [--once] [-v]
+#
+#   PLANNER_REMINDER_POLL=60   seconds between PRAGMA data_version checks
+#
+# Only undone tasks due before the longest threshold (plus HORIZON_SLACK)
+# are loaded (db.upcoming_reminders, on ix_tasks_due_ts), so memory follows
+# the deadlines of the next day, not the size of the tasks table.
+# Between reminders the process blocks in one select() until the next
+# threshold, the moment the next task outside the window needs loading, a
+# "tasks changed" ping (notify.py) or stop().
+# Writers only ping with PLANNER_NOTIFY=1, which is off by default. Without
+# it a new or edited task is noticed at the next PRAGMA data_version check
+# (a single read every POLL seconds), so its first reminder can come up to
+# POLL seconds late; lower --poll, or set PLANNER_NOTIFY=1 for the writers,
+# when that matters. Either way the window is reloaded only when the
+# database actually changed.
+#
+# A threshold is recorded in reminders_fired before it is delivered, and
+# only the process that recorded it first delivers it, so a planner window
+# open on the same database never repeats what the daemon already sent.
+# Since a recorded reminder is never offered again, one that no sink took
+# is written to stdout rather than lost.
+#
+# Sinks get (user_id, username, lines) and return True once delivered:
+# "stdout", "log:PATH" (appended) and "socket[:PORT]" (the user's running
+# planner window, see notify.GUI_PORT; False when none is open). Register
+# more in SINKS as name -> factory(arg) returning such a callable.
+import argparse
+import datetime
+import logging
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+import db
+import notify
+from dueparse import parse_due
+from scheduler import GRACE_SECONDS, THRESHOLDS, DeadlineScheduler, describe
+
+POLL = float(os.getenv("PLANNER_REMINDER_POLL", "60"))
+LONGEST = max(secs for secs, _label in THRESHOLDS)
+HORIZON_SLACK = 3600   # the window reaches this far past the longest threshold
+
+log = logging.getLogger("planner.reminders")
+
+
+# ---------- sinks ----------
+
+def _stamp():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class StdoutSink:
+    def __call__(self, user_id, username, lines):
+        for line in lines:
+            print(f"{_stamp()} {username}: {line}", flush=True)
+        return True
+
+
+class LogSink:
+    def __init__(self, path):
+        if not path:
+            raise ValueError("log sink needs a path (log:FILE)")
+        self.path = path
+
+    def __call__(self, user_id, username, lines):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(f"{_stamp()} {username}: {line}\n" for line in lines)
+        return True
+
+
+class SocketSink:
+    """Hands reminders to the planner window listening on `port` (if any)."""
+
+    def __init__(self, port=None):
+        self.port = int(port) if port else notify.GUI_PORT
+
+    def __call__(self, user_id, username, lines):
+        # as many datagrams as it takes; False unless the window took them all
+        batch = []
+        for line in lines:
+            if batch and not notify.fits({"user_id": user_id, "lines": batch + [line]}):
+                if not notify.deliver({"user_id": user_id, "lines": batch}, self.port):
+                    return False
+                batch = []
+            batch.append(line)
+        return notify.deliver({"user_id": user_id, "lines": batch}, self.port)
+
+
+SINKS = {
+    "stdout": lambda arg: StdoutSink(),
+    "log": LogSink,
+    "socket": SocketSink,
+}
+
+
+def make_sink(spec):
+    """A sink from "name" or "name:arg"."""
+    name, _, arg = spec.partition(":")
+    if name not in SINKS:
+        raise ValueError(f"unknown sink {name!r} (one of: {', '.join(sorted(SINKS))})")
+    return SINKS[name](arg)
+
+
+# ---------- daemon ----------
+
+class ReminderDaemon:
+    def __init__(self, sinks, horizon=LONGEST + HORIZON_SLACK, poll=POLL, log=None,
+                 fallback=None):
+        self.sinks = sinks
+        self.fallback = fallback or StdoutSink()   # for reminders no sink took
+        self.horizon = horizon
+        self.poll = poll
+        self.log = log or (lambda message: None)
+        self.scheduler = DeadlineScheduler(parse_due)
+        self.owners = {}          # {task_id: (user_id, username)} for the loaded window
+        self.reload_at = None     # epoch when the next task outside the window comes in
+        self.delivered = 0
+        self._stopping = threading.Event()
+        self._wake = None         # write end of run()'s socketpair, while it runs
+
+    def reload(self, now=None, catch_up=False):
+        """
+        Rebuild the schedule from the tasks due in the window. With catch_up
+        (start-up) the most urgent missed threshold of each task is delivered,
+        like the GUI does when it opens.
+        """
+        now = time.time() if now is None else now
+        rows, fired, next_ts = db.upcoming_reminders(now, now + self.horizon)
+        self.scheduler = DeadlineScheduler(parse_due)
+        self.scheduler.load([(tid, title, due, 0) for tid, _uid, _name, title, due in rows],
+                            now=datetime.datetime.fromtimestamp(now), fired=fired,
+                            catch_up=catch_up)
+        self.owners = {tid: (uid, name) for tid, uid, name, _title, _due in rows}
+        self._record(self.scheduler.take_fired(), now)
+        # a task due after the window gets its first reminder LONGEST before it
+        self.reload_at = None if next_ts is None else next_ts - LONGEST - GRACE_SECONDS
+        self.log(f"loaded {len(rows)} upcoming tasks")
+
+    def _record(self, fired, now):
+        """Record (task_id, secs) pairs; returns the ids of tasks with a new one."""
+        by_user = {}
+        for tid, secs in fired:
+            if tid in self.owners:
+                by_user.setdefault(self.owners[tid][0], []).append((tid, secs))
+        new = set()
+        for user_id, pairs in by_user.items():
+            new.update(tid for tid, _secs in db.record_reminders(user_id, pairs, now))
+        return new
+
+    def fire(self, now=None):
+        """Deliver the reminders whose time has come; returns how many."""
+        now = time.time() if now is None else now
+        events = self.scheduler.pop_due_events(datetime.datetime.fromtimestamp(now))
+        fired = self.scheduler.take_fired()
+        if not fired:
+            return 0
+        new = self._record(fired, now)
+        by_user = {}
+        for tid, title, due_dt, label in events:
+            if tid in new:   # otherwise a planner window recorded it first
+                by_user.setdefault(self.owners[tid], []).append(describe(title, due_dt, label))
+        count = 0
+        for (user_id, username), lines in by_user.items():
+            delivered = False
+            for sink in self.sinks:
+                try:
+                    delivered = bool(sink(user_id, username, lines)) or delivered
+                except Exception:  # one broken sink must not stop the others
+                    log.exception("sink %r failed", sink)
+            if not delivered:
+                log.warning("no sink took %d reminders for %s; using the fallback",
+                            len(lines), username)
+                try:
+                    self.fallback(user_id, username, lines)
+                except Exception:
+                    log.exception("fallback sink %r failed", self.fallback)
+            count += len(lines)
+        self.delivered += count
+        return count
+
+    def next_wake(self, now):
+        """Epoch time of the next thing to do (at most `poll` away)."""
+        wake = now + self.poll
+        nxt = self.scheduler.next_event_time()
+        if nxt is not None:
+            wake = min(wake, nxt.timestamp())
+        if self.reload_at is not None:
+            wake = min(wake, self.reload_at)
+        return max(now, wake)
+
+    def stop(self):
+        """Make run() return at once; safe to call from any thread."""
+        self._stopping.set()
+        wake = self._wake
+        if wake is not None:
+            try:
+                wake.send(b"\0")
+            except OSError:   # already full, or run() just closed it
+                pass
+
+    def run(self):
+        """Deliver reminders until stop() is called."""
+        woken, self._wake = socket.socketpair()
+        woken.setblocking(False)
+        self._wake.setblocking(False)
+        sock = notify.listen(notify.PORT)
+        if sock is None:
+            self.log(f"port {notify.PORT} is taken; relying on data_version polling")
+        watched = [woken] if sock is None else [woken, sock]
+        try:
+            version = db.data_version()
+            self.reload(catch_up=True)
+            self.fire()
+            while not self._stopping.is_set():
+                timeout = self.next_wake(time.time()) - time.time()
+                ready = select.select(watched, [], [], max(0.0, timeout))[0]
+                if woken in ready:
+                    break
+                if sock in ready:
+                    notify.receive(sock)   # one reload covers every ping queued
+                now = time.time()
+                current = db.data_version()
+                if current != version or (self.reload_at is not None and now >= self.reload_at):
+                    version = current
+                    self.reload(now)
+                self.fire(now)
+        finally:
+            wake, self._wake = self._wake, None
+            wake.close()
+            woken.close()
+            if sock is not None:
+                sock.close()
+            db.close()
+
+
+def _terminate(_signum, _frame):
+    # a service manager stops us with SIGTERM; leave the same way as Ctrl-C
+    raise KeyboardInterrupt
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Deliver deadline reminders for every user, headless.")
+    ap.add_argument("--sink", action="append", metavar="NAME[:ARG]",
+                    help="stdout (default), log:FILE or socket[:PORT]; repeatable")
+    ap.add_argument("--poll", type=float, default=POLL,
+                    help=f"seconds between data_version checks (default {POLL:g})")
+    ap.add_argument("--once", action="store_true",
+                    help="deliver what is due now and exit (for cron)")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+    try:
+        sinks = [make_sink(spec) for spec in args.sink or ["stdout"]]
+    except ValueError as e:
+        sys.exit(str(e))
+
+    db.init_db()
+    log = (lambda message: print(f"{_stamp()} {message}", file=sys.stderr)) if args.verbose else None
+    daemon = ReminderDaemon(sinks, poll=args.poll, log=log)
+    if args.once:
+        daemon.reload(catch_up=True)
+        daemon.fire()
+        db.close_all()
+        return
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
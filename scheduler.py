@@ -0,0 +1,196 @@
+# scheduler.py
+import datetime
+import heapq
+import itertools
+
+# thresholds in seconds: (seconds_before_due, label)
+THRESHOLDS = [
+    (24 * 3600, "1 day"),
+    (12 * 3600, "12 hours"),
+    (6 * 3600, "6 hours"),
+    (3 * 3600, "3 hours"),
+    (1 * 3600, "1 hour"),
+]
+
+# a reminder later than this (app closed, machine asleep) is a catch-up: it
+# is labelled with the time actually left, and only the most urgent missed
+# threshold of a task is delivered
+GRACE_SECONDS = 60
+
+
+def humanize(seconds):
+    """Rough "time left" label: "1 day 3 hours", "2 hours 5 minutes", "40 minutes"."""
+    seconds = max(0, int(seconds))
+    units = (("day", 86400), ("hour", 3600), ("minute", 60))
+    for i, (unit, size) in enumerate(units):
+        n, rest = divmod(seconds, size)
+        if n:
+            parts = [f"{n} {unit}{'s' if n != 1 else ''}"]
+            if i + 1 < len(units):
+                sub_unit, sub_size = units[i + 1]
+                m = rest // sub_size
+                if m:
+                    parts.append(f"{m} {sub_unit}{'s' if m != 1 else ''}")
+            return " ".join(parts)
+    return "less than a minute"
+
+
+def describe(title, due_dt, label):
+    """One reminder line, as the GUI toasts it and reminder_daemon.py delivers it."""
+    return f'"{title}" is due in about {label} ({due_dt.strftime("%Y-%m-%d %H:%M")})'
+
+
+class DeadlineScheduler:
+    """
+    Keeps precomputed deadline events in two min-heaps so nothing has to be
+    re-parsed or re-queried on every clock tick:
+      - due heap:      (due_dt, seq, task_id)            -> "next due" countdown
+      - reminder heap: (fire_dt, seq, task_id, secs)     -> reminder timers
+    Entries are invalidated lazily: each task carries a generation number and
+    heap entries from an older generation are skipped when they reach the top.
+
+    `fired` ({task_id: {threshold_seconds}}) is meant to be persisted: load()
+    accepts the stored sets, and take_fired() hands over the (task_id,
+    threshold) pairs marked since the last call so they can be written back.
+    """
+
+    def __init__(self, parse_due, thresholds=THRESHOLDS):
+        self._parse_due = parse_due
+        self._thresholds = thresholds
+        self._labels = dict(thresholds)
+        self._tasks = {}          # {task_id: (title, due_dt, generation)}
+        self._due_heap = []
+        self._event_heap = []
+        self._seq = itertools.count()
+        self.fired = {}           # {task_id: set([threshold_seconds, ...])}
+        self._new_fired = []      # [(task_id, threshold_seconds)] not yet taken
+
+    # ---------- building / incremental updates ----------
+
+    def load(self, rows, now=None, fired=None, catch_up=False):
+        """
+        (Re)build from list_tasks() rows: (id, title, due, done).
+        `fired` replaces the fired sets (e.g. from storage). With catch_up,
+        thresholds missed while the app was closed come due right away
+        (see add()); otherwise they are marked fired silently.
+        """
+        self._tasks.clear()
+        self._due_heap.clear()
+        self._event_heap.clear()
+        if fired is not None:
+            self.fired = {tid: set(secs) for tid, secs in fired.items()}
+        now = now or datetime.datetime.now()
+        for tid, title, due, done in rows:
+            if not done:
+                self.add(tid, title, due, now=now, catch_up=catch_up)
+
+    def add(self, task_id, title, due, now=None, catch_up=False):
+        """
+        Add or replace one task's events. Thresholds already more than
+        GRACE_SECONDS in the past are marked fired; with catch_up the most
+        urgent of them is queued to fire immediately instead.
+        """
+        self.remove(task_id)
+        if not due or due.lower() == "no due date":
+            return
+        due_dt = self._parse_due(due)
+        if due_dt is None:
+            return
+        now = now or datetime.datetime.now()
+        if due_dt <= now:
+            return  # already past
+
+        gen = next(self._seq)
+        self._tasks[task_id] = (title, due_dt, gen)
+        heapq.heappush(self._due_heap, (due_dt, gen, task_id))
+
+        fired = self.fired.get(task_id, ())
+        missed = []
+        for secs, _label in self._thresholds:
+            fire_dt = due_dt - datetime.timedelta(seconds=secs)
+            if secs in fired:
+                continue
+            if (now - fire_dt).total_seconds() > GRACE_SECONDS:
+                missed.append(secs)  # threshold window already passed
+                continue
+            heapq.heappush(self._event_heap, (fire_dt, gen, task_id, secs))
+        if missed:
+            if catch_up:
+                urgent = min(missed)
+                missed.remove(urgent)
+                fire_dt = due_dt - datetime.timedelta(seconds=urgent)  # past: fires now
+                heapq.heappush(self._event_heap, (fire_dt, gen, task_id, urgent))
+            for secs in missed:
+                self._mark(task_id, secs)
+
+    def _mark(self, task_id, secs):
+        self.fired.setdefault(task_id, set()).add(secs)
+        self._new_fired.append((task_id, secs))
+
+    def take_fired(self):
+        """(task_id, threshold_seconds) pairs marked fired since the last call."""
+        out, self._new_fired = self._new_fired, []
+        return out
+
+    def remove(self, task_id):
+        """Forget a task (done / deleted). Heap entries die lazily."""
+        self._tasks.pop(task_id, None)
+
+    def _live(self, gen, task_id):
+        entry = self._tasks.get(task_id)
+        return entry is not None and entry[2] == gen
+
+    # ---------- queries ----------
+
+    def next_due(self, now=None):
+        """Return (task_id, title, due_dt) of the closest upcoming task, or None."""
+        now = now or datetime.datetime.now()
+        heap = self._due_heap
+        while heap:
+            due_dt, gen, task_id = heap[0]
+            if due_dt > now and self._live(gen, task_id):
+                return task_id, self._tasks[task_id][0], due_dt
+            heapq.heappop(heap)
+            if due_dt <= now and self._live(gen, task_id):
+                del self._tasks[task_id]
+        return None
+
+    def next_event_time(self):
+        """fire time of the next pending reminder, or None."""
+        heap = self._event_heap
+        while heap:
+            fire_dt, gen, task_id, _secs = heap[0]
+            if self._live(gen, task_id):
+                return fire_dt
+            heapq.heappop(heap)
+        return None
+
+    def pop_due_events(self, now=None):
+        """
+        Pop every reminder whose time has come, at most one per task (the
+        most urgent threshold; the others are marked fired with it).
+        Returns a list of (task_id, title, due_dt, label), soonest due first.
+        A late reminder's label is the time actually left, not the threshold.
+        """
+        now = now or datetime.datetime.now()
+        urgent = {}   # {task_id: (secs, fire_dt)}
+        heap = self._event_heap
+        while heap and heap[0][0] <= now:
+            fire_dt, gen, task_id, secs = heapq.heappop(heap)
+            if not self._live(gen, task_id) or secs in self.fired.get(task_id, ()):
+                continue
+            self._mark(task_id, secs)
+            if task_id not in urgent or secs < urgent[task_id][0]:
+                urgent[task_id] = (secs, fire_dt)
+        out = []
+        for task_id, (secs, fire_dt) in urgent.items():
+            title, due_dt, _gen = self._tasks[task_id]
+            if due_dt <= now:
+                continue
+            if (now - fire_dt).total_seconds() > GRACE_SECONDS:
+                label = humanize((due_dt - now).total_seconds())
+            else:
+                label = self._labels[secs]
+            out.append((task_id, title, due_dt, label))
+        out.sort(key=lambda e: e[2])
+        return out
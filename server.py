@@ -0,0 +1,399 @@
+# server.py
+# Local multi-user server: serves index.html and a JSON API over db.py.
+#
+#   python server.py [--host 127.0.0.1] [--port 8000] [--workers 16]
+#
+#   POST   /api/register        {"username", "password"}     -> 201
+#   POST   /api/login           {"username", "password"}     -> {"token", "user_id"}
+#   POST   /api/logout
+#   GET    /api/tasks                                         -> [{"id", "title", "due", "done"}]
+#   GET    /api/tasks?since=<version>  -> {"version", "changed": [task], "deleted": [id]}
+#                                         or {"version", "full": true, "tasks": [task]}
+#   POST   /api/tasks           {"title", "due"}              -> 201 task
+#   PATCH  /api/tasks/<id>      {"done": true|false}          -> task id + done
+#   DELETE /api/tasks/<id>                                    -> 204
+#
+# Authenticated calls send "Authorization: Bearer <token>". GET /api/tasks
+# carries an ETag; a matching If-None-Match gets a bodiless 304.
+# With ?since= the client passes the "version" of its last answer and gets
+# back only the tasks written and the ids deleted after it (db.task_changes),
+# a 304 if nothing happened, or the full list when the version is 0 (a
+# first load, always answered with a 200 even for a user with no tasks yet),
+# unknown (e.g. from before a server restart) or older than the pruned
+# tombstones.
+# Task reads and writes go through task_cache. The list ETag is the user's
+# change counter (task_versions), so a 304 costs one primary-key read and
+# no rows are loaded or serialized.
+# Requests are handled by a fixed pool of worker threads. Each worker keeps
+# its own SQLite connection (db.conn()), so the pool is also the DB
+# connection pool; one request is served per connection.
+import argparse
+import hashlib
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import archive
+import db
+from auth import LoginThrottled
+from task_cache import cache
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(ROOT, "index.html")
+WORKERS = 16
+SESSION_TTL = 12 * 3600    # seconds a login token stays valid without use
+MAX_BODY = 64 * 1024
+# changes on every start, so a recreated planner.db can't match old ETags
+ETAG_SALT = secrets.token_hex(4)
+
+
+class Sessions:
+    """In-memory login tokens: {token: (user_id, expires)}."""
+
+    def __init__(self, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tokens = {}
+
+    def create(self, user_id):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._tokens[token] = (user_id, time.monotonic() + self.ttl)
+            if len(self._tokens) > 10_000:
+                self._prune()
+        return token
+
+    def user(self, token):
+        """User id for a live token (its expiry slides forward), else None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is None:
+                return None
+            if entry[1] < now:
+                del self._tokens[token]
+                return None
+            self._tokens[token] = (entry[0], now + self.ttl)
+            return entry[0]
+
+    def drop(self, token):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def _prune(self):
+        now = time.monotonic()
+        for token, (_uid, expires) in list(self._tokens.items()):
+            if expires < now:
+                del self._tokens[token]
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+def _etag(body: bytes):
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _version_etag(user_id, version):
+    return f'"{ETAG_SALT}-{user_id}-{version}"'
+
+
+def _version_token(version):
+    """A ?since= value; salted like the ETags, so it dies with the process."""
+    return f"{ETAG_SALT}.{version}"
+
+
+def _parse_version(token):
+    """The version in a _version_token(); 0 (reload everything) if it isn't ours."""
+    salt, _, version = token.partition(".")
+    return int(version) if salt == ETAG_SALT and version.isdigit() else 0
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def task_json(row):
+    tid, title, due, done = row
+    return {"id": tid, "title": title, "due": due, "done": bool(done)}
+
+
+class PlannerHandler(BaseHTTPRequestHandler):
+    server_version = "HomeworkPlanner/1.0"
+
+    ROUTES = [
+        ("POST", re.compile(r"/api/register$"), "register"),
+        ("POST", re.compile(r"/api/login$"), "login"),
+        ("POST", re.compile(r"/api/logout$"), "logout"),
+        ("GET", re.compile(r"/api/tasks$"), "list_tasks"),
+        ("POST", re.compile(r"/api/tasks$"), "add_task"),
+        ("PATCH", re.compile(r"/api/tasks/(\d+)$"), "update_task"),
+        ("DELETE", re.compile(r"/api/tasks/(\d+)$"), "delete_task"),
+        ("GET", re.compile(r"/(index\.html)?$"), "index"),
+    ]
+
+    # ---------- dispatch ----------
+
+    def _dispatch(self, method):
+        path = self.path.split("?", 1)[0]
+        allowed = []
+        for m, pattern, name in self.ROUTES:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            if m != method:
+                allowed.append(m)
+                continue
+            try:
+                getattr(self, "api_" + name)(*match.groups())
+            except ApiError as e:
+                self._send_json(e.status, {"error": str(e)}, e.headers)
+            except Exception as e:  # don't leak tracebacks to clients
+                self.log_error("%s %s failed: %r", method, path, e)
+                self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal error"})
+            return
+        if allowed:
+            self._send_json(HTTPStatus.METHOD_NOT_ALLOWED, {"error": "method not allowed"},
+                            {"Allow": ", ".join(allowed)})
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": "not found"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    # ---------- helpers ----------
+
+    def _send(self, status, body=b"", content_type=None, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        if status != HTTPStatus.NOT_MODIFIED and status != HTTPStatus.NO_CONTENT:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _send_json(self, status, obj, headers=None):
+        body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+        self._send(status, body, "application/json", headers)
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "bad Content-Length")
+        if length > MAX_BODY:
+            raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, UnicodeDecodeError):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "body must be JSON")
+        if not isinstance(data, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+        return data
+
+    def _token(self):
+        auth = self.headers.get("Authorization", "")
+        return auth[7:].strip() if auth.startswith("Bearer ") else None
+
+    def _user(self):
+        uid = self.server.sessions.user(self._token() or "")
+        if uid is None:
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "login required",
+                           {"WWW-Authenticate": "Bearer"})
+        return uid
+
+    @staticmethod
+    def _text(data, key, limit=500):
+        value = data.get(key)
+        if not isinstance(value, str) or not value.strip():
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"'{key}' is required")
+        if len(value) > limit:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"'{key}' is too long")
+        return value.strip()
+
+    # ---------- endpoints ----------
+
+    def api_index(self, _name=None):
+        body, etag = self.server.index()
+        if _etag_matches(self.headers.get("If-None-Match"), etag):
+            self._send(HTTPStatus.NOT_MODIFIED, headers={"ETag": etag})
+            return
+        self._send(HTTPStatus.OK, body, "text/html; charset=utf-8",
+                   {"ETag": etag, "Cache-Control": "no-cache"})
+
+    def api_register(self):
+        data = self._read_json()
+        username, password = self._text(data, "username", 100), self._text(data, "password")
+        if not db.create_user(username, password):
+            raise ApiError(HTTPStatus.CONFLICT, "username already exists")
+        self._send_json(HTTPStatus.CREATED, {"username": username})
+
+    def api_login(self):
+        data = self._read_json()
+        username, password = self._text(data, "username", 100), self._text(data, "password")
+        try:
+            uid = db.verify_user(username, password)
+        except LoginThrottled as e:
+            raise ApiError(HTTPStatus.TOO_MANY_REQUESTS, str(e),
+                           {"Retry-After": str(int(e.retry_after) + 1)})
+        if uid is None:
+            raise ApiError(HTTPStatus.UNAUTHORIZED, "invalid username or password")
+        self._send_json(HTTPStatus.OK, {"token": self.server.sessions.create(uid),
+                                        "user_id": uid})
+
+    def api_logout(self):
+        token = self._token()
+        if token:
+            self.server.sessions.drop(token)
+        self._send(HTTPStatus.NO_CONTENT)
+
+    def api_list_tasks(self):
+        uid = self._user()
+        since = parse_qs(urlsplit(self.path).query).get("since")
+        if since:
+            self._send_task_changes(uid, _parse_version(since[0]))
+            return
+        inm = self.headers.get("If-None-Match")
+        if inm:
+            etag = _version_etag(uid, db.task_version(uid))
+            if _etag_matches(inm, etag):
+                self._send(HTTPStatus.NOT_MODIFIED,
+                           headers={"ETag": etag, "Cache-Control": "no-cache"})
+                return
+        version, rows = cache.get(uid)
+        body = json.dumps([task_json(r) for r in rows], separators=(",", ":")).encode("utf-8")
+        self._send(HTTPStatus.OK, body, "application/json",
+                   {"ETag": _version_etag(uid, version), "Cache-Control": "no-cache"})
+
+    def _send_task_changes(self, uid, since):
+        headers = {"Cache-Control": "no-cache"}
+        version, changed, deleted = db.task_changes(uid, since)
+        if changed is None or since == 0:
+            version, rows = cache.get(uid)
+            self._send_json(HTTPStatus.OK, {"version": _version_token(version), "full": True,
+                                            "tasks": [task_json(r) for r in rows]}, headers)
+        elif version == since:
+            self._send(HTTPStatus.NOT_MODIFIED, headers=headers)
+        else:
+            self._send_json(HTTPStatus.OK, {"version": _version_token(version),
+                                            "changed": [task_json(r) for r in changed],
+                                            "deleted": deleted}, headers)
+
+    def api_add_task(self):
+        uid = self._user()
+        data = self._read_json()
+        title, due = self._text(data, "title"), self._text(data, "due", 100)
+        tid, created = cache.add_task(uid, title, due)
+        if not created:
+            raise ApiError(HTTPStatus.CONFLICT, "that task already exists")
+        self._send_json(HTTPStatus.CREATED, {"id": tid, "title": title, "due": due, "done": False})
+
+    def api_update_task(self, task_id):
+        uid = self._user()
+        data = self._read_json()
+        if not isinstance(data.get("done"), bool):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "'done' must be true or false")
+        update = cache.mark_done if data["done"] else cache.mark_undone
+        if not update(uid, int(task_id)):
+            raise ApiError(HTTPStatus.NOT_FOUND, "no such task")
+        self._send_json(HTTPStatus.OK, {"id": int(task_id), "done": data["done"]})
+
+    def api_delete_task(self, task_id):
+        uid = self._user()
+        if not cache.delete_task(uid, int(task_id)):
+            raise ApiError(HTTPStatus.NOT_FOUND, "no such task")
+        self._send(HTTPStatus.NO_CONTENT)
+
+
+class PlannerServer(HTTPServer):
+    """HTTPServer whose requests run on a fixed ThreadPoolExecutor."""
+
+    request_queue_size = 128   # listen() backlog while all workers are busy
+
+    def __init__(self, address, handler=PlannerHandler, workers=WORKERS, verbose=False):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="planner-http")
+        self.sessions = Sessions()
+        self.verbose = verbose
+        self._index = (None, None, None)   # (mtime, body, etag)
+        self._index_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._work, request, client_address)
+
+    def _work(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def index(self):
+        """(body, etag) of index.html, reread only when the file changes."""
+        mtime = os.stat(INDEX_FILE).st_mtime_ns
+        with self._index_lock:
+            if self._index[0] != mtime:
+                with open(INDEX_FILE, "rb") as f:
+                    body = f.read()
+                self._index = (mtime, body, _etag(body))
+            return self._index[1], self._index[2]
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+        db.close_all()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serve index.html and the planner API.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--verbose", action="store_true", help="log every request")
+    args = ap.parse_args()
+
+    db.init_db()
+    archive.start()
+    server = PlannerServer((args.host, args.port), workers=args.workers, verbose=args.verbose)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}/ ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+# storage.py
+# One task-storage interface shared by the GUI (gui.py) and the CLI
+# (planner.py / main.py), with a SQLite and a JSON-lines implementation.
+#
+#   PLANNER_BACKEND=sqlite   planner.db through db.py (default)
+#   PLANNER_BACKEND=json     append-only log through jsonl_store.py
+#   PLANNER_JSON_PATH=...    log file for the json backend
+#   PLANNER_USER=...         account the CLI uses on the sqlite backend
+#
+# Both backends return the same row shapes as db.py and apply the same rules:
+# (title, due) duplicates are never stored twice, Canvas rows are matched on
+# their canvas_id, and bulk writes go out as one transaction / one append.
+import os
+import threading
+
+import db
+from dueparse import due_timestamp
+from jsonl_store import LEGACY_FILE, LOG_FILE, TaskLog, read_tasks
+from task_cache import cache
+
+BACKENDS = ("sqlite", "json")
+CLI_USER = "cli"
+
+
+class Storage:
+    """
+    Task storage for one user. Rows:
+      list() / iter_rows()  -> (id, title, due, done), ordered by done, id
+      search()              -> one page of those rows (see db.search_tasks)
+      history()             -> one page of archived tasks (see db.archived_tasks)
+      due_between()         -> (id, title, due, done, due_ts), ordered by due_ts
+      next_due()            -> (id, title, due, due_ts) or None
+    bulk_upsert() takes (title, due) rows, upsert_canvas() takes
+    (canvas_id, updated_at, title, due) rows; both return
+    {"inserted", "updated", "unchanged"} counts.
+    fired_reminders() / record_reminders() persist the reminder thresholds
+    already delivered ({task_id: {seconds}} / [(task_id, seconds)]); a task's
+    set is cleared when its due date changes. record_reminders() returns the
+    pairs that were new, i.e. the reminders still to be shown.
+    """
+
+    backend = None
+
+    def list(self):
+        raise NotImplementedError
+
+    def iter_rows(self):
+        return iter(self.list())
+
+    def add(self, title, due):
+        """
+        Add a task; returns (id, created). created is False when a task with
+        the same title and due date already exists (id is that task's).
+        """
+        raise NotImplementedError
+
+    def complete(self, task_id):
+        raise NotImplementedError
+
+    def delete(self, task_id):
+        raise NotImplementedError
+
+    def bulk_upsert(self, rows):
+        raise NotImplementedError
+
+    def upsert_canvas(self, rows):
+        raise NotImplementedError
+
+    def search(self, query, course=None, done=None, due_range=None, after=None,
+               limit=db.SEARCH_PAGE):
+        raise NotImplementedError
+
+    def history(self, before=None, limit=db.HISTORY_PAGE):
+        """Archived tasks, newest first; backends without an archive have none."""
+        return []
+
+    def due_between(self, start, end, include_done=False):
+        raise NotImplementedError
+
+    def next_due(self, now=None):
+        raise NotImplementedError
+
+    def fired_reminders(self):
+        raise NotImplementedError
+
+    def record_reminders(self, fired):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage(Storage):
+    """db.py storage; reads and single-task writes go through task_cache."""
+
+    backend = "sqlite"
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    def list(self):
+        return cache.list_tasks(self.user_id)
+
+    def add(self, title, due):
+        return cache.add_task(self.user_id, title, due)
+
+    def complete(self, task_id):
+        cache.mark_done(self.user_id, task_id)
+
+    def delete(self, task_id):
+        cache.delete_task(self.user_id, task_id)
+
+    def bulk_upsert(self, rows):
+        return db.upsert_tasks(self.user_id, rows)
+
+    def upsert_canvas(self, rows):
+        return db.upsert_canvas_tasks(self.user_id, rows)
+
+    def search(self, query, course=None, done=None, due_range=None, after=None,
+               limit=db.SEARCH_PAGE):
+        return db.search_tasks(self.user_id, query, course, done, due_range, after, limit)
+
+    def history(self, before=None, limit=db.HISTORY_PAGE):
+        return db.archived_tasks(self.user_id, before, limit)
+
+    def due_between(self, start, end, include_done=False):
+        return cache.due_between(self.user_id, start, end, include_done)
+
+    def next_due(self, now=None):
+        return cache.next_due(self.user_id, now)
+
+    def fired_reminders(self):
+        return db.fired_reminders(self.user_id)
+
+    def record_reminders(self, fired):
+        return db.record_reminders(self.user_id, fired)
+
+
+class JSONStorage(Storage):
+    """
+    TaskLog-backed storage. The (title, due) and canvas_id indexes are built
+    with one streaming pass on open and kept in memory (keys only, no task
+    bodies), so dedup never rereads the log; every batch is a single append.
+    Safe to call from background threads.
+    """
+
+    backend = "json"
+
+    def __init__(self, path=LOG_FILE, legacy_path=None):
+        self.log = TaskLog(path, legacy_path=legacy_path)
+        self._lock = threading.Lock()
+        self._reindex()
+
+    def _reindex(self):
+        self._ids = {}        # {(title, due): id}
+        self._keys = {}       # {id: (title, due)}
+        self._canvas = {}     # {canvas_id: (id, updated_at)}
+        self._canvas_of = {}  # {id: canvas_id}
+        self._done = set()
+        self._reminded = {}   # {id: {threshold_seconds}}
+        for t in self.log.iter_tasks():
+            self._index(t["id"], t["task"], t["due"], t.get("canvas_id"),
+                        t.get("canvas_updated_at"))
+            if t["done"]:
+                self._done.add(t["id"])
+            if t.get("reminded"):
+                self._reminded[t["id"]] = set(t["reminded"])
+
+    def _index(self, tid, title, due, canvas_id=None, updated_at=None):
+        old = self._keys.get(tid)
+        if old is not None and self._ids.get(old) == tid:
+            del self._ids[old]
+        self._ids.setdefault((title, due), tid)
+        self._keys[tid] = (title, due)
+        if canvas_id is not None:
+            self._canvas[canvas_id] = (tid, updated_at)
+            self._canvas_of[tid] = canvas_id
+
+    def _unindex(self, tid):
+        key = self._keys.pop(tid, None)
+        if key is not None and self._ids.get(key) == tid:
+            del self._ids[key]
+        cid = self._canvas_of.pop(tid, None)
+        if cid is not None:
+            del self._canvas[cid]
+        self._done.discard(tid)
+        self._reminded.pop(tid, None)
+
+    def _write(self, batch):
+        """Append a batch at once; on failure the indexes are rebuilt from disk."""
+        if not batch:
+            return
+        try:
+            self.log.write(batch)
+        except BaseException:
+            self._reindex()
+            raise
+
+    def iter_rows(self):
+        """Stream rows in insertion order without loading the whole log."""
+        for t in self.log.iter_tasks():
+            yield (t["id"], t["task"], t["due"], int(t["done"]))
+
+    def list(self):
+        return sorted(self.iter_rows(), key=lambda r: (r[3], r[0]))
+
+    def add(self, title, due):
+        with self._lock:
+            tid = self._ids.get((title, due))
+            if tid is not None:
+                return tid, False
+            tid = self.log.add(title, due)
+            self._index(tid, title, due)
+            return tid, True
+
+    def complete(self, task_id):
+        with self._lock:
+            if task_id in self._keys and task_id not in self._done:
+                self.log.mark_done(task_id)
+                self._done.add(task_id)
+
+    def delete(self, task_id):
+        with self._lock:
+            if task_id in self._keys:
+                self.log.delete(task_id)
+                self._unindex(task_id)
+
+    def bulk_upsert(self, rows):
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        with self._lock:
+            batch = []
+            for title, due in rows:
+                if (title, due) in self._ids:
+                    counts["unchanged"] += 1
+                    continue
+                rec = self.log.new_record(title, due)
+                batch.append(rec)
+                self._index(rec["id"], title, due)
+                counts["inserted"] += 1
+            self._write(batch)
+        return counts
+
+    def upsert_canvas(self, rows):
+        """Same matching rules as db.upsert_canvas_tasks()."""
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        with self._lock:
+            batch = []
+            for cid, updated_at, title, due in rows:
+                key = (title, due)
+                known = self._canvas.get(cid) if cid is not None else None
+                if known is not None:
+                    tid, old_updated = known
+                    if (old_updated, self._keys[tid]) == (updated_at, key):
+                        counts["unchanged"] += 1
+                        continue
+                    if self._ids.get(key, tid) != tid:
+                        counts["unchanged"] += 1   # would collide with another task
+                        continue
+                    rec = {"op": "update", "id": tid, "task": title, "due": due,
+                           "due_ts": due_timestamp(due), "canvas_updated_at": updated_at}
+                    if self._keys[tid][1] != due and self._reminded.pop(tid, None):
+                        rec["reminded"] = []
+                    batch.append(rec)
+                    counts["updated"] += 1
+                elif key in self._ids:
+                    tid = self._ids[key]
+                    if cid is None or tid in self._canvas_of:
+                        counts["unchanged"] += 1
+                        continue
+                    # imported before canvas ids were stored: adopt it
+                    batch.append({"op": "update", "id": tid, "canvas_id": cid,
+                                  "canvas_updated_at": updated_at})
+                    counts["updated"] += 1
+                else:
+                    extra = {} if cid is None else {"canvas_id": cid,
+                                                    "canvas_updated_at": updated_at}
+                    rec = self.log.new_record(title, due, **extra)
+                    batch.append(rec)
+                    tid = rec["id"]
+                    counts["inserted"] += 1
+                self._index(tid, title, due, cid, updated_at)
+            self._write(batch)
+        return counts
+
+    def search(self, query, course=None, done=None, due_range=None, after=None,
+               limit=db.SEARCH_PAGE):
+        """Same matching rules as db.search_tasks(), over one pass of the log."""
+        terms = db.search_terms(query or "")
+        prefix = course.casefold() + ": " if course else None
+        lo = hi = None
+        if due_range is not None:
+            lo, hi = (None if t is None else db.epoch(t) for t in due_range)
+        rows = []
+        for t in self.log.iter_tasks():
+            key = (int(t["done"]), t["id"])
+            if after is not None and key <= tuple(after):
+                continue
+            if done is not None and bool(t["done"]) != bool(done):
+                continue
+            if prefix and not t["task"].casefold().startswith(prefix):
+                continue
+            ts = t["due_ts"]
+            if (lo is not None or hi is not None) and ts is None:
+                continue
+            if (lo is not None and ts < lo) or (hi is not None and ts >= hi):
+                continue
+            if terms and not db.title_matches(terms, t["task"]):
+                continue
+            rows.append((t["id"], t["task"], t["due"], key[0]))
+        rows.sort(key=lambda r: (r[3], r[0]))
+        return rows[:limit]
+
+    def due_between(self, start, end, include_done=False):
+        lo, hi = db.epoch(start), db.epoch(end)
+        rows = [
+            (t["id"], t["task"], t["due"], int(t["done"]), t["due_ts"])
+            for t in self.log.iter_tasks()
+            if t["due_ts"] is not None and lo <= t["due_ts"] < hi
+            and (include_done or not t["done"])
+        ]
+        rows.sort(key=lambda r: r[4])
+        return rows
+
+    def next_due(self, now=None):
+        now = db.epoch(now)
+        best = None
+        for t in self.log.iter_tasks():
+            ts = t["due_ts"]
+            if not t["done"] and ts is not None and ts > now and (best is None or ts < best[3]):
+                best = (t["id"], t["task"], t["due"], ts)
+        return best
+
+    def fired_reminders(self):
+        with self._lock:
+            return {tid: set(secs) for tid, secs in self._reminded.items()
+                    if tid not in self._done}
+
+    def record_reminders(self, fired):
+        with self._lock:
+            changed, new = {}, []
+            for tid, secs in fired:
+                known = self._reminded.get(tid, set())
+                if tid in self._keys and secs not in known:
+                    changed[tid] = self._reminded[tid] = known | {secs}
+                    new.append((tid, secs))
+            self._write([{"op": "update", "id": tid, "reminded": sorted(secs)}
+                         for tid, secs in changed.items()])
+            return new
+
+
+def open_storage(user_id=None, backend=None, json_path=None):
+    """
+    Storage for `user_id` (None = the CLI's local user) on the configured
+    backend. The json backend keeps one log per GUI user; the CLI's log
+    imports the old data.json on first use.
+    """
+    backend = backend or os.getenv("PLANNER_BACKEND", "sqlite")
+    if backend == "json":
+        path = json_path or os.getenv("PLANNER_JSON_PATH")
+        if path is None:
+            path = LOG_FILE if user_id is None else f"tasks-{user_id}.jsonl"
+        return JSONStorage(path, legacy_path=LEGACY_FILE if user_id is None else None)
+    if backend == "sqlite":
+        db.init_db()
+        if user_id is None:
+            user_id, created = db.get_or_create_local_user(os.getenv("PLANNER_USER", CLI_USER))
+            if created:
+                import_json_tasks(SQLiteStorage(user_id))
+        return SQLiteStorage(user_id)
+    raise ValueError(f"unknown storage backend {backend!r} (expected one of {BACKENDS})")
+
+
+def import_json_tasks(storage, path=LOG_FILE, legacy_path=LEGACY_FILE):
+    """
+    Copy the CLI's JSON tasks (if any) into `storage`; returns the count.
+    The JSON files are only read: no tasks.jsonl is created from data.json.
+    """
+    rows = [(t["task"], t["due"], t["done"]) for t in read_tasks(path, legacy_path)]
+    storage.bulk_upsert((title, due) for title, due, _done in rows)
+    for title, due, done in rows:
+        if done:
+            storage.complete(storage.add(title, due)[0])
+    return len(rows)
@@ -0,0 +1,226 @@
+# task_cache.py
+# Write-through, per-user cache of task rows in front of db.py.
+#
+#   PLANNER_CACHE_ROWS=50000   rows kept across all users (LRU by user)
+#
+# Every write to a user's tasks bumps their counter in task_versions (via
+# triggers, migration 7), whoever makes it: this process, another thread,
+# the CLI or another server. A cached set is served after one primary-key
+# read of that counter and reloaded only when it has moved. Writes made
+# through the cache patch the cached set in place instead; if the counter
+# moved by more than the write itself, someone else wrote too and the set
+# is dropped.
+import bisect
+import os
+import threading
+from collections import OrderedDict
+
+import db
+import perf
+from dueparse import due_timestamp
+
+MAX_ROWS = int(os.getenv("PLANNER_CACHE_ROWS", "50000"))
+
+
+class _UserTasks:
+    """One user's tasks: {id: (title, due, done, due_ts)} plus two sorted indexes."""
+
+    __slots__ = ("version", "tasks", "order", "by_due", "_rows")
+
+    def __init__(self, version, rows):
+        self.version = version
+        self.tasks = {tid: (title, due, done, ts) for tid, title, due, done, ts in rows}
+        self.order = sorted((t[2], tid) for tid, t in self.tasks.items())      # (done, id)
+        self.by_due = sorted((t[3], tid) for tid, t in self.tasks.items()
+                             if t[3] is not None)                                # (due_ts, id)
+        self._rows = None
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def rows(self):
+        """list_tasks() rows, (id, title, due, done) ordered by done, id."""
+        if self._rows is None:
+            tasks = self.tasks
+            self._rows = [(tid, *tasks[tid][:3]) for _done, tid in self.order]
+        return self._rows
+
+    def put(self, tid, title, due, done, ts):
+        self.drop(tid)
+        self.tasks[tid] = (title, due, done, ts)
+        bisect.insort(self.order, (done, tid))
+        if ts is not None:
+            bisect.insort(self.by_due, (ts, tid))
+        self._rows = None
+
+    def drop(self, tid):
+        old = self.tasks.pop(tid, None)
+        if old is None:
+            return None
+        del self.order[bisect.bisect_left(self.order, (old[2], tid))]
+        if old[3] is not None:
+            del self.by_due[bisect.bisect_left(self.by_due, (old[3], tid))]
+        self._rows = None
+        return old
+
+
+class TaskCache:
+    def __init__(self, max_rows=MAX_ROWS):
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._users = OrderedDict()   # {(DB_FILE, user_id): _UserTasks}, LRU first
+        self._size = 0                # cached rows over all users
+        self.hits = self.misses = self.stale = self.evictions = 0
+
+    # ---------- reads ----------
+
+    def _entry(self, user_id):
+        """Current _UserTasks for a user, reloading it if the DB has moved on."""
+        key = (db.DB_FILE, user_id)
+        version = db.task_version(user_id)
+        with self._lock:
+            entry = self._users.get(key)
+            if entry is not None and entry.version == version:
+                self._users.move_to_end(key)
+                self.hits += 1
+                perf.count("cache.hit")
+                return entry
+            if entry is not None:
+                self.stale += 1
+        perf.count("cache.miss")
+        version, rows = db.load_tasks(user_id)
+        entry = _UserTasks(version, rows)
+        with self._lock:
+            self.misses += 1
+            self._store(key, entry)
+        return entry
+
+    def get(self, user_id):
+        """(version, rows) with list_tasks() rows."""
+        entry = self._entry(user_id)
+        with self._lock:
+            return entry.version, list(entry.rows())
+
+    def list_tasks(self, user_id):
+        return self.get(user_id)[1]
+
+    def next_due(self, user_id, now=None):
+        """Same as db.next_due(), from the cached due-date index."""
+        entry = self._entry(user_id)
+        now = db.epoch(now)
+        with self._lock:
+            by_due = entry.by_due
+            for i in range(bisect.bisect_right(by_due, (now, float("inf"))), len(by_due)):
+                ts, tid = by_due[i]
+                title, due, done, _ts = entry.tasks[tid]
+                if not done:
+                    return tid, title, due, ts
+        return None
+
+    def due_between(self, user_id, start, end, include_done=False):
+        """Same as db.due_between(), from the cached due-date index."""
+        entry = self._entry(user_id)
+        lo, hi = db.epoch(start), db.epoch(end)
+        with self._lock:
+            by_due = entry.by_due
+            out = []
+            for i in range(bisect.bisect_left(by_due, (lo,)), len(by_due)):
+                ts, tid = by_due[i]
+                if ts >= hi:
+                    break
+                title, due, done, _ts = entry.tasks[tid]
+                if include_done or not done:
+                    out.append((tid, title, due, done, ts))
+            return out
+
+    # ---------- writes (write-through) ----------
+
+    def add_task(self, user_id, title, due):
+        """Same as db.add_task(): (id, created)."""
+        tid, created = db.add_task(user_id, title, due)
+        if created:
+            self._patch(user_id, lambda e: e.put(tid, title, due, 0, due_timestamp(due)),
+                        expected=lambda e: 1)
+        return tid, created
+
+    def _set_done(self, update, user_id, task_id, done):
+        matched = update(user_id, task_id)
+        if matched:
+            def apply(e):
+                old = e.tasks.get(task_id)
+                if old is not None:
+                    e.put(task_id, old[0], old[1], done, old[3])
+            self._patch(user_id, apply, expected=lambda e: 1)
+        return matched
+
+    def mark_done(self, user_id, task_id):
+        return self._set_done(db.mark_done, user_id, task_id, 1)
+
+    def mark_undone(self, user_id, task_id):
+        return self._set_done(db.mark_undone, user_id, task_id, 0)
+
+    def delete_task(self, user_id, task_id):
+        matched = db.delete_task(user_id, task_id)
+        if matched:
+            self._patch(user_id, lambda e: e.drop(task_id), expected=lambda e: 1)
+        return matched
+
+    def _patch(self, user_id, apply, expected):
+        """
+        Apply a write we just made to the cached set, if the counter moved by
+        exactly `expected(entry)` - i.e. nobody else wrote in between.
+        Bulk writes (sync, imports) don't come through here; they move the
+        counter and the next read reloads once.
+        """
+        key = (db.DB_FILE, user_id)
+        version = db.task_version(user_id)
+        with self._lock:
+            entry = self._users.get(key)
+            if entry is None or version == entry.version:
+                return   # not cached, or loaded after the write already
+            if version != entry.version + expected(entry):
+                self._evict(key)
+                return
+            before = len(entry)
+            apply(entry)
+            entry.version = version
+            self._size += len(entry) - before
+
+    # ---------- bookkeeping ----------
+
+    def _store(self, key, entry):
+        old = self._users.get(key)
+        if old is not None and old.version > entry.version:
+            return   # a concurrent load already stored something newer
+        self._evict(key)
+        self._users[key] = entry
+        self._size += len(entry)
+        # least recently used users go first; the newest one always stays
+        while self._size > self.max_rows and len(self._users) > 1:
+            self._evict(next(iter(self._users)))
+            self.evictions += 1
+
+    def _evict(self, key):
+        entry = self._users.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry)
+
+    def invalidate(self, user_id=None):
+        """Forget one user's tasks (or everything, e.g. after swapping DB_FILE)."""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+                self._size = 0
+            else:
+                self._evict((db.DB_FILE, user_id))
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "stale": self.stale,
+                    "evictions": self.evictions, "users": len(self._users),
+                    "rows": self._size, "max_rows": self.max_rows,
+                    "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0}
+
+
+cache = TaskCache()
@@ -0,0 +1,205 @@
+# task_view.py
+import bisect
+import tkinter as tk
+
+
+def format_row(tid, title, due, done):
+    status = "✅" if done else "⏳"
+    return f"[{tid}] {title} (Due: {due}) {status}"
+
+
+class TaskListView(tk.Frame):
+    """
+    Virtualized task list. The model is every task (id -> row, kept in the
+    same "ORDER BY done, id" order as db.list_tasks), but the Listbox only
+    ever holds the `height` rows currently in view, so thousands of tasks
+    cost nothing to redraw. Changes are applied as single-row diffs and
+    selection maps straight to task ids.
+    """
+
+    def __init__(self, master, width=60, height=16, **kw):
+        super().__init__(master, **kw)
+        self.height = height
+        self._rows = {}        # {task_id: (title, due, done)}
+        self._order = []       # sorted [(done, task_id), ...]
+        self._offset = 0       # model index of the first visible row
+        self._selected = None  # task id
+        self._shown = []       # strings currently in the Listbox
+
+        self.listbox = tk.Listbox(self, width=width, height=height,
+                                  exportselection=False, activestyle="none")
+        self.listbox.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+        self.listbox.bind("<MouseWheel>", self._on_wheel)
+        self.listbox.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.listbox.bind("<Button-5>", lambda e: self.scroll(3))
+        self.listbox.bind("<Up>", lambda e: self._move_selection(-1))
+        self.listbox.bind("<Down>", lambda e: self._move_selection(1))
+        self.listbox.bind("<Prior>", lambda e: self._move_selection(-self.height))
+        self.listbox.bind("<Next>", lambda e: self._move_selection(self.height))
+
+    # ---------- model ----------
+
+    def __len__(self):
+        return len(self._order)
+
+    def get(self, task_id):
+        """(title, due, done) for a task in the view, or None."""
+        return self._rows.get(task_id)
+
+    def set_rows(self, rows):
+        """Replace the contents with list_tasks() rows, applying only the differences."""
+        new = {tid: (title, due, done) for tid, title, due, done in rows}
+        changed = False
+        for tid in [t for t in self._rows if t not in new]:
+            changed |= self._remove(tid)
+        for tid, row in new.items():
+            if self._rows.get(tid) != row:
+                changed |= self._upsert(tid, *row)
+        if changed:
+            self._render()
+
+    def rows(self):
+        """Every row in the view, in display order: [(id, title, due, done)]."""
+        return [(tid, *self._rows[tid]) for _done, tid in self._order]
+
+    def extend(self, rows):
+        """Add (id, title, due, done) rows, e.g. the next page of search results."""
+        changed = False
+        for tid, title, due, done in rows:
+            changed |= self._upsert(tid, title, due, done)
+        if changed:
+            self._render()
+
+    def upsert(self, task_id, title, due, done=0):
+        """Insert or update one row."""
+        if self._upsert(task_id, title, due, done):
+            self._render()
+
+    def update(self, task_id, **fields):
+        """Change some fields of one row, e.g. update(tid, done=1)."""
+        old = self._rows.get(task_id)
+        if old is None:
+            return
+        title, due, done = old
+        self.upsert(task_id, fields.get("title", title), fields.get("due", due),
+                    fields.get("done", done))
+
+    def remove(self, task_id):
+        if self._remove(task_id):
+            self._render()
+
+    # Model-only changes; they return True if anything changed. _render()
+    # then redraws just the lines in view that differ, so a change far
+    # outside the window costs one scrollbar update.
+
+    def _upsert(self, task_id, title, due, done):
+        done = 1 if done else 0
+        old = self._rows.get(task_id)
+        if old == (title, due, done):
+            return False
+        if old is not None and old[2] != done:
+            self._remove(task_id)  # completion moves it to the done section
+            old = None
+        self._rows[task_id] = (title, due, done)
+        if old is None:
+            bisect.insort(self._order, (done, task_id))
+        return True
+
+    def _remove(self, task_id):
+        row = self._rows.pop(task_id, None)
+        if row is None:
+            return False
+        del self._order[bisect.bisect_left(self._order, (row[2], task_id))]
+        if self._selected == task_id:
+            self._selected = None
+        return True
+
+    # ---------- selection ----------
+
+    def selected_id(self):
+        """Id of the selected task (None if nothing is selected)."""
+        return self._selected
+
+    def _on_select(self, _event=None):
+        sel = self.listbox.curselection()
+        if sel:
+            i = self._offset + sel[0]
+            if i < len(self._order):
+                self._selected = self._order[i][1]
+
+    def _move_selection(self, step):
+        if not self._order:
+            return "break"
+        if self._selected is None or self._selected not in self._rows:
+            i = self._offset
+        else:
+            done = self._rows[self._selected][2]
+            i = bisect.bisect_left(self._order, (done, self._selected)) + step
+        i = max(0, min(len(self._order) - 1, i))
+        self._selected = self._order[i][1]
+        if i < self._offset:
+            self._offset = i
+        elif i >= self._offset + self.height:
+            self._offset = i - self.height + 1
+        self._render()
+        return "break"
+
+    # ---------- scrolling / rendering ----------
+
+    def scroll(self, rows):
+        self._set_offset(self._offset + rows)
+
+    def _on_wheel(self, event):
+        self.scroll(-1 if event.delta > 0 else 1)
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self._set_offset(int(float(args[1]) * len(self._order)))
+        elif args[0] == "scroll":
+            n = int(args[1])
+            self.scroll(n * self.height if args[2] == "pages" else n)
+
+    def _set_offset(self, offset):
+        offset = max(0, min(offset, len(self._order) - self.height))
+        if offset != self._offset:
+            self._offset = offset
+            self._render()
+
+    def _render(self):
+        """Format and draw only the rows in view."""
+        total = len(self._order)
+        self._offset = max(0, min(self._offset, total - self.height))
+        visible = self._order[self._offset:self._offset + self.height]
+
+        lines = [format_row(tid, *self._rows[tid]) for _done, tid in visible]
+        lb = self.listbox
+        lb.selection_clear(0, tk.END)
+        # touch only the Listbox lines whose text actually changed
+        for n, line in enumerate(lines):
+            if n >= len(self._shown):
+                lb.insert(tk.END, line)
+            elif self._shown[n] != line:
+                lb.delete(n)
+                lb.insert(n, line)
+        if len(self._shown) > len(lines):
+            lb.delete(len(lines), tk.END)
+        self._shown = lines
+
+        sel_index = None
+        for n, (_done, tid) in enumerate(visible):
+            if tid == self._selected:
+                sel_index = n
+        if sel_index is not None:
+            lb.selection_set(sel_index)
+            lb.activate(sel_index)
+
+        if total:
+            self.scrollbar.set(self._offset / total,
+                               min(1.0, (self._offset + len(visible)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
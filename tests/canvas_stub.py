@@ -0,0 +1,135 @@
+# tests/canvas_stub.py
+# A local Canvas stand-in for the CanvasClient tests, serving the JSON
+# fixtures in tests/fixtures/:
+#   /api/v1/courses        the static courses_page<N>.json pages, chained
+#                          with Link: rel="next" like Canvas does
+#   /api/v1/planner/items  planner_items.json filtered to start_date..end_date
+#                          (inclusive, as Canvas is) and cut into per_page pages
+# Every response carries an ETag; a matching If-None-Match gets a 304.
+# fail(status, times) makes the next requests fail first, to exercise retries
+# (a failing 304 is sent bare, whatever the request's validators).
+import datetime
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+TOKEN = "stub-token"
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _course_pages():
+    pages, n = [], 1
+    while os.path.exists(os.path.join(FIXTURES, f"courses_page{n}.json")):
+        pages.append(load_fixture(f"courses_page{n}.json"))
+        n += 1
+    return pages
+
+
+def _date(value):
+    return datetime.datetime.fromisoformat(value.rstrip("Z"))
+
+
+class CanvasStub:
+    def __init__(self):
+        self.course_pages = _course_pages()
+        self.planner_items = load_fixture("planner_items.json")
+        self.requests = []          # [(path, {param: value}, headers)] in arrival order
+        self._failures = []         # [(status, headers)] answered before real pages
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,),
+                                        daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def fail(self, status, times=1, headers=None):
+        """Answer the next `times` requests with `status` (e.g. 503, 429)."""
+        with self._lock:
+            self._failures += [(status, headers or {})] * times
+
+    def calls(self, path):
+        """Query parameters of every request made to `path`."""
+        return [params for p, params, _headers in self.requests if p == path]
+
+    # ---------- pages ----------
+
+    def _courses(self, params):
+        page = int(params.get("page", "1"))
+        body = self.course_pages[page - 1] if page <= len(self.course_pages) else []
+        nxt = page + 1 if page < len(self.course_pages) else None
+        return body, nxt
+
+    def _planner(self, params):
+        start, end = _date(params["start_date"]), _date(params["end_date"])
+        per_page = int(params.get("per_page", "10"))
+        page = int(params.get("page", "1"))
+        items = [it for it in self.planner_items
+                 if it["plannable_date"] and start <= _date(it["plannable_date"]) <= end]
+        body = items[(page - 1) * per_page:page * per_page]
+        nxt = page + 1 if page * per_page < len(items) else None
+        return body, nxt
+
+    def _handler(self):
+        stub = self
+        routes = {"/api/v1/courses": self._courses, "/api/v1/planner/items": self._planner}
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for k, v in headers:
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                with stub._lock:
+                    stub.requests.append((url.path, params, dict(self.headers)))
+                    failure = stub._failures.pop(0) if stub._failures else None
+                if self.headers.get("Authorization") != f"Bearer {TOKEN}":
+                    self._reply(401, b'{"errors":[{"message":"Invalid access token."}]}')
+                    return
+                if failure is not None:
+                    status, headers = failure
+                    body = b"" if status == 304 else b'{"errors":[{"message":"stub failure"}]}'
+                    self._reply(status, body, headers.items())
+                    return
+                route = routes.get(url.path)
+                if route is None:
+                    self._reply(404, b'{"errors":[{"message":"not found"}]}')
+                    return
+                body, nxt = route(params)
+                data = json.dumps(body).encode("utf-8")
+                etag = '"%s"' % hashlib.sha1(data).hexdigest()
+                headers = [("ETag", etag)]
+                if nxt is not None:
+                    query = urlencode({**params, "page": nxt})
+                    headers.append(("Link", f'<{stub.url}{url.path}?{query}>; rel="next"'))
+                if self.headers.get("If-None-Match") == etag:
+                    self._reply(304, headers=headers)
+                    return
+                headers.append(("Content-Type", "application/json"))
+                self._reply(200, data, headers)
+
+        return Handler
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import canvas_sync  # noqa: E402
+from canvas_stub import TOKEN, CanvasStub  # noqa: E402
+
+
+@pytest.fixture
+def canvas():
+    with CanvasStub() as stub:
+        yield stub
+
+
+@pytest.fixture
+def client(canvas):
+    c = canvas_sync.CanvasClient(canvas.url, TOKEN, max_workers=2, timeout=5)
+    yield c
+    c.close()
@@ -0,0 +1,122 @@
+import datetime
+
+import pytest
+import requests
+
+import canvas_sync
+from canvas_stub import load_fixture
+
+PLANNER = "/api/v1/planner/items"
+START = datetime.datetime(2026, 1, 5)
+END = datetime.datetime(2026, 1, 25)
+NO_WAIT = {"Retry-After": "0"}
+
+
+def _ids(items):
+    return [it["plannable_id"] for it in items]
+
+
+def _in_range(start, end):
+    return [it for it in load_fixture("planner_items.json")
+            if start <= datetime.datetime.fromisoformat(it["plannable_date"].rstrip("Z")) <= end]
+
+
+# ---------- pagination ----------
+
+def test_follows_link_header_across_pages(canvas, client):
+    courses = client.list_courses()
+    expected = [c for n in (1, 2, 3) for c in load_fixture(f"courses_page{n}.json")]
+    assert courses == expected
+    assert [p.get("page", "1") for p in canvas.calls("/api/v1/courses")] == ["1", "2", "3"]
+
+
+def test_sends_bearer_token(canvas, client):
+    client.list_courses()
+    assert all(h["Authorization"] == "Bearer stub-token" for _p, _q, h in canvas.requests)
+
+
+def test_planner_items_paged_within_each_window(canvas, client, monkeypatch):
+    monkeypatch.setattr(canvas_sync, "PER_PAGE", 2)
+    items = client.fetch_planner_items(START, END)
+    assert sorted(_ids(items)) == sorted(_ids(_in_range(START, END)))
+    assert len(canvas.calls(PLANNER)) > 3            # several pages per window
+    assert {q["per_page"] for q in canvas.calls(PLANNER)} == {"2"}
+
+
+# ---------- 7-day windows ----------
+
+def test_range_is_split_into_seven_day_windows(canvas, client):
+    client.fetch_planner_items(START, END)
+    windows = sorted((q["start_date"], q["end_date"]) for q in canvas.calls(PLANNER))
+    assert windows == [
+        ("2026-01-05T00:00:00Z", "2026-01-12T00:00:00Z"),
+        ("2026-01-12T00:00:00Z", "2026-01-19T00:00:00Z"),
+        ("2026-01-19T00:00:00Z", "2026-01-25T00:00:00Z"),
+    ]
+
+
+def test_item_on_a_window_edge_is_yielded_once(canvas, client):
+    items = client.fetch_planner_items(START, END)
+    edge = [it for it in items if it["plannable_date"] == "2026-01-12T00:00:00Z"]
+    assert len(edge) == 1
+    assert len(_ids(items)) == len(set(_ids(items)))
+
+
+def test_window_size_is_configurable(canvas, client):
+    client.fetch_planner_items(START, END, window_days=10)
+    assert len({q["start_date"] for q in canvas.calls(PLANNER)}) == 2
+
+
+# ---------- retries ----------
+
+def test_retries_server_errors(canvas, client):
+    canvas.fail(503, times=2, headers=NO_WAIT)
+    assert len(client.list_courses()) == 5
+    assert len(canvas.calls("/api/v1/courses")) == 3 + 2
+
+
+def test_retries_throttled_requests(canvas, client):
+    canvas.fail(429, times=1, headers=NO_WAIT)
+    assert len(client.list_courses()) == 5
+
+
+def test_gives_up_after_max_retries(canvas, client, monkeypatch):
+    monkeypatch.setattr(canvas_sync, "MAX_RETRIES", 1)
+    canvas.fail(503, times=5, headers=NO_WAIT)
+    with pytest.raises(requests.HTTPError):
+        client.list_courses()
+    assert len(canvas.requests) == 2
+
+
+def test_client_errors_are_not_retried(canvas, client):
+    with pytest.raises(requests.HTTPError):
+        client.get_all("/api/v1/nothing-here")
+    assert len(canvas.requests) == 1
+
+
+def test_planner_failure_reaches_the_caller(canvas, client, monkeypatch):
+    monkeypatch.setattr(canvas_sync, "MAX_RETRIES", 0)
+    canvas.fail(500, times=1)
+    with pytest.raises(requests.HTTPError):
+        client.fetch_planner_items(START, END)
+
+
+# ---------- conditional requests ----------
+
+def test_unchanged_pages_are_skipped(canvas, client):
+    first = canvas_sync.PageCache()
+    assert len(client.get_all("/api/v1/courses", cache=first)) == 5
+    again = canvas_sync.PageCache(first.seen)
+    assert client.get_all("/api/v1/courses", cache=again) == []
+    assert again.not_modified == 3
+    assert again.seen == first.seen
+
+
+@pytest.mark.parametrize("with_cache", [False, True])
+def test_304_without_a_cache_entry_refetches(canvas, client, with_cache):
+    cache = canvas_sync.PageCache() if with_cache else None
+    canvas.fail(304)
+    assert len(client.get_all("/api/v1/courses", cache=cache)) == 5
+    first, retry = canvas.requests[:2]
+    assert first[1] == retry[1]
+    assert retry[2].get("Cache-Control") == "no-cache"
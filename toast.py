@@ -0,0 +1,77 @@
+# toast.py
+import tkinter as tk
+
+
+class ToastQueue:
+    """
+    Non-modal notifications in the corner of a window. One toast is shown at
+    a time and closes by itself after SHOW_MS (or on click); anything pushed
+    meanwhile waits, and waiting notifications are merged into one digest so
+    a burst of reminders never stacks up windows. Nothing here blocks the Tk
+    event loop.
+    """
+
+    SHOW_MS = 8000
+    GAP_MS = 300        # pause between two toasts
+    MAX_LINES = 12      # a digest lists at most this many entries
+
+    def __init__(self, root):
+        self.root = root
+        self._pending = []    # [(title, [lines])]
+        self._current = None  # Toplevel on screen
+        self._timer = None
+
+    def push(self, title, lines):
+        """Queue one notification: a title and a list of message lines."""
+        self._pending.append((title, list(lines)))
+        if self._current is None and self._timer is None:
+            self._show_next()
+
+    def _take(self):
+        """Next notification; several waiting ones become a single digest."""
+        if len(self._pending) == 1:
+            return self._pending.pop()
+        lines = [line for _title, entry in self._pending for line in entry]
+        self._pending.clear()
+        return f"{len(lines)} reminders", lines
+
+    def _show_next(self):
+        self._timer = None
+        if not self._pending or not self.root.winfo_exists():
+            return
+        title, lines = self._take()
+        if len(lines) > self.MAX_LINES:
+            lines = lines[:self.MAX_LINES - 1] + [f"... and {len(lines) - self.MAX_LINES + 1} more"]
+
+        win = self._current = tk.Toplevel(self.root)
+        win.overrideredirect(True)
+        win.attributes("-topmost", True)
+        frame = tk.Frame(win, bg="#fff8dc", bd=1, relief=tk.SOLID, padx=10, pady=8)
+        frame.pack()
+        tk.Label(frame, text=title, font=("Arial", 10, "bold"), bg="#fff8dc",
+                 anchor="w", justify=tk.LEFT).pack(fill=tk.X)
+        tk.Label(frame, text="\n".join(lines), font=("Arial", 9), bg="#fff8dc",
+                 anchor="w", justify=tk.LEFT, wraplength=360).pack(fill=tk.X)
+        for w in (win, frame, *frame.winfo_children()):
+            w.bind("<Button-1>", lambda e: self._close())
+
+        # bottom-right corner of the parent window
+        win.update_idletasks()
+        x = self.root.winfo_rootx() + self.root.winfo_width() - win.winfo_reqwidth() - 12
+        y = self.root.winfo_rooty() + self.root.winfo_height() - win.winfo_reqheight() - 12
+        win.geometry(f"+{max(0, x)}+{max(0, y)}")
+        self._timer = self.root.after(self.SHOW_MS, self._close)
+
+    def _close(self):
+        if self._timer is not None:
+            self.root.after_cancel(self._timer)
+            self._timer = None
+        if self._current is not None:
+            self._current.destroy()
+            self._current = None
+        if self._pending:
+            self._timer = self.root.after(self.GAP_MS, self._show_next)
+
+    def clear(self):
+        self._pending.clear()
+        self._close()